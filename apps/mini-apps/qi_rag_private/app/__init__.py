@@ -0,0 +1 @@
+"""Tiered private RAG backend."""
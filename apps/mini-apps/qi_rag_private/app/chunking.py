@@ -0,0 +1,110 @@
+"""Offset-based text chunking.
+
+Chunks are described by ``(start, end)`` character offsets into the original
+text rather than rebuilt strings, so the splitter never materialises a list of
+all words and every chunk can be traced back to its exact source position for
+citations.  Units are either whitespace-separated words or the tokens of a
+tokenizer (normally the embedding model's), in which case ``chunk_size`` and
+``chunk_overlap`` are token counts that match what the model will see.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from typing import Any, Deque, Iterable, Iterator, Optional, Tuple
+
+Span = Tuple[int, int]
+
+_WORD_RE = re.compile(r"\S+")
+
+# Characters handed to the tokenizer at a time; blocks end on whitespace
+TOKENIZER_BLOCK_CHARS = 64 * 1024
+
+
+def word_spans(text: str) -> Iterator[Span]:
+    """Yield the offsets of whitespace-separated words."""
+    for match in _WORD_RE.finditer(text):
+        yield match.span()
+
+
+def token_spans(text: str, tokenizer: Any, block_chars: int = TOKENIZER_BLOCK_CHARS) -> Iterator[Span]:
+    """Yield the offsets of a fast Hugging Face tokenizer's tokens.
+
+    The text is tokenized in whitespace-aligned blocks so large documents are
+    never tokenized in one piece.
+    """
+    start = 0
+    while start < len(text):
+        end = min(start + block_chars, len(text))
+        if end < len(text):
+            cut = max(text.rfind(" ", start, end), text.rfind("\n", start, end))
+            if cut > start:
+                end = cut
+        encoding = tokenizer(text[start:end], add_special_tokens=False, return_offsets_mapping=True)
+        for token_start, token_end in encoding["offset_mapping"]:
+            if token_end > token_start:
+                yield start + token_start, start + token_end
+        start = end
+
+
+def window_spans(units: Iterable[Span], size: int, overlap: int) -> Iterator[Span]:
+    """Group unit offsets into windows of ``size`` units overlapping by ``overlap``.
+
+    Only the current window is held in memory.  The last window is emitted
+    only if it contains units not covered by the previous one.
+    """
+    if size <= 0 or not 0 <= overlap < size:
+        raise ValueError("chunk_size must be positive and chunk_overlap smaller than chunk_size")
+    window: Deque[Span] = deque()
+    fresh = 0
+    for unit in units:
+        window.append(unit)
+        fresh += 1
+        if len(window) == size:
+            yield window[0][0], window[-1][1]
+            for _ in range(size - overlap):
+                window.popleft()
+            fresh = 0
+    if fresh:
+        yield window[0][0], window[-1][1]
+
+
+def chunk_spans(text: str, chunk_size: int, chunk_overlap: int, tokenizer: Optional[Any] = None) -> Iterator[Span]:
+    """Yield the ``(start, end)`` offsets of the chunks of ``text``."""
+    units = word_spans(text) if tokenizer is None else token_spans(text, tokenizer)
+    return window_spans(units, chunk_size, chunk_overlap)
+
+
+def load_tokenizer(name: str, model_name: Optional[str] = None) -> Optional[Any]:
+    """Resolve the ``CHUNK_TOKENIZER`` setting.
+
+    ``words`` (or empty) selects word counting, ``embedder`` the tokenizer of
+    the embedding model ``model_name``, anything else is loaded as a Hugging
+    Face tokenizer name.  Returns None for word counting.
+
+    Only the tokenizer is loaded, never the model itself, so it is cheap in
+    every ingest worker process and works whatever ``EMBEDDING_PROVIDER`` is.
+    """
+    if not name or name == "words":
+        return None
+    from transformers import AutoTokenizer
+
+    if name != "embedder":
+        return AutoTokenizer.from_pretrained(name)
+    if not model_name:
+        raise ValueError("CHUNK_TOKENIZER=embedder needs the embedding model name")
+
+    from .onnx_embedding import default_model_dir
+
+    # An ONNX export ships the model's tokenizer files, so prefer it when present
+    onnx_dir = default_model_dir(model_name)
+    if (onnx_dir / "tokenizer_config.json").exists():
+        return AutoTokenizer.from_pretrained(str(onnx_dir))
+    try:
+        return AutoTokenizer.from_pretrained(model_name)
+    except OSError:
+        if "/" in model_name:
+            raise
+        # SentenceTransformer resolves bare names under the sentence-transformers organisation
+        return AutoTokenizer.from_pretrained(f"sentence-transformers/{model_name}")
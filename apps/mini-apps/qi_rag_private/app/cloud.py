@@ -0,0 +1,178 @@
+"""Client for the cloud fallback endpoint.
+
+The fallback is best effort, so the client is built to never slow a chat
+request down more than necessary:
+
+* requests share a pooled keep-alive session;
+* a circuit breaker fails fast for `CLOUD_RESET_SECONDS` after
+  `CLOUD_FAILURE_THRESHOLD` consecutive errors instead of waiting for the
+  timeout on every query while the remote is down;
+* answers are cached by (question, tiers) for `CLOUD_CACHE_TTL` seconds;
+* calls run on a small thread pool with a bounded wait (`wait_timeout`); with
+  `CLOUD_SPECULATIVE=true` the remote is queried while local retrieval runs,
+  at the cost of a remote call for every chat request.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, Tuple[str, ...]]
+
+
+class CircuitBreaker:
+    """Closed while calls succeed; open (rejecting calls) after repeated failures.
+
+    Once `reset_seconds` have passed a single trial call is let through
+    (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_seconds: float = 60.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class CloudFallbackClient:
+    """Pooled, cached, circuit-broken client of the remote ``/chat`` endpoint."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        timeout: float = 30.0,
+        pool_size: int = 8,
+        failure_threshold: int = 3,
+        reset_seconds: float = 60.0,
+        cache_ttl: float = 300.0,
+        cache_size: int = 1024,
+        speculative: bool = False,
+    ) -> None:
+        self.url = endpoint.rstrip("/") + "/chat"
+        self.timeout = timeout
+        # Longest a caller waits for a submitted call: connect plus read timeout
+        self.wait_timeout = min(timeout, 5.0) + timeout
+        self.speculative = speculative
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[CacheKey, Tuple[float, str]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="cloud-fallback")
+
+    @staticmethod
+    def _key(question: str, tiers: Iterable[str]) -> CacheKey:
+        return question.strip(), tuple(sorted(tiers))
+
+    def _cached(self, key: CacheKey) -> Optional[str]:
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def _store(self, key: CacheKey, answer: str) -> None:
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, answer)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def ask(self, question: str, tiers: Iterable[str]) -> Optional[str]:
+        """Return the remote answer, or None if unavailable; never raises."""
+        tiers = list(tiers)
+        key = self._key(question, tiers)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        if not self.breaker.allow():
+            return None
+        try:
+            resp = self._session.post(
+                self.url,
+                params={"question": question, "tiers": ",".join(tiers)},
+                timeout=(min(self.timeout, 5.0), self.timeout),
+            )
+            resp.raise_for_status()
+            answer = resp.json().get("answer") or None
+        except Exception as exc:
+            self.breaker.record_failure()
+            logger.warning(f"Cloud fallback failed ({self.breaker.state}): {exc}")
+            return None
+        self.breaker.record_success()
+        if answer:
+            self._store(key, answer)
+        return answer
+
+    def submit(self, question: str, tiers: Iterable[str]) -> "Future[Optional[str]]":
+        """Start :meth:`ask` in the background."""
+        return self._pool.submit(self.ask, question, list(tiers))
+
+
+def create_cloud_client() -> Optional[CloudFallbackClient]:
+    """Create the fallback client from the environment; None without `CLOUD_ENDPOINT`."""
+    endpoint = os.getenv("CLOUD_ENDPOINT", "").strip()
+    if not endpoint:
+        return None
+    return CloudFallbackClient(
+        endpoint,
+        timeout=float(os.getenv("CLOUD_REQUEST_TIMEOUT", "30")),
+        pool_size=int(os.getenv("CLOUD_POOL_SIZE", "8")),
+        failure_threshold=int(os.getenv("CLOUD_FAILURE_THRESHOLD", "3")),
+        reset_seconds=float(os.getenv("CLOUD_RESET_SECONDS", "60")),
+        cache_ttl=float(os.getenv("CLOUD_CACHE_TTL", "300")),
+        cache_size=int(os.getenv("CLOUD_CACHE_SIZE", "1024")),
+        speculative=os.getenv("CLOUD_SPECULATIVE", "false").lower() in {"1", "true", "yes"},
+    )
@@ -0,0 +1,284 @@
+"""Shared embedding model server.
+
+Loading the embedding model takes seconds and a copy of it in every process
+(API, ingest CLI, folder watcher) multiplies its memory.  With
+``EMBEDDING_PROVIDER=service`` every component instead talks to a single
+``scripts/embedding_server.py`` process over a local socket.  The server loads
+the model once, warms it up before accepting connections and encodes the
+texts of concurrent callers together in one batch.
+
+The address is ``EMBEDDING_SERVICE_ADDRESS``: ``host:port`` for TCP or a file
+path for a Unix socket (created readable by its owner only).  Clients prove
+they know ``EMBEDDING_SERVICE_AUTHKEY`` with an HMAC challenge before any
+request is served; there is no default key, so both sides refuse to start
+without one.
+
+Messages are length-prefixed frames of a JSON header and raw bytes; vectors
+travel as little-endian float32.  Nothing received is unpickled, so a peer
+can at worst send a malformed request.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import socket
+import stat
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .batching import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+SERVICE_ADDRESS = os.getenv("EMBEDDING_SERVICE_ADDRESS", "127.0.0.1:7997")
+SERVICE_MAX_BATCH = int(os.getenv("EMBEDDING_SERVICE_MAX_BATCH", "256"))
+SERVICE_MAX_WAIT_MS = float(os.getenv("EMBEDDING_SERVICE_MAX_WAIT_MS", "2"))
+
+# JSON header length and payload length of a frame
+_FRAME = struct.Struct("!II")
+_MAX_HEADER_BYTES = 64 * 1024 * 1024
+_MAX_PAYLOAD_BYTES = 1024 * 1024 * 1024
+_HANDSHAKE_TIMEOUT_S = 10.0
+_VECTOR_DTYPE = np.dtype("<f4")
+
+Address = Union[str, Tuple[str, int]]
+
+
+def service_authkey() -> bytes:
+    """The shared secret from ``EMBEDDING_SERVICE_AUTHKEY``; raises if it is not set."""
+    authkey = os.getenv("EMBEDDING_SERVICE_AUTHKEY", "")
+    if not authkey:
+        raise RuntimeError("Set EMBEDDING_SERVICE_AUTHKEY to a secret shared by the embedding server and its clients")
+    return authkey.encode("utf-8")
+
+
+def parse_address(address: str) -> Address:
+    """``host:port`` becomes a TCP address, anything else a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if not n:
+            raise EOFError("Connection closed")
+        received += n
+    return bytes(buf)
+
+
+def send_frame(sock: socket.socket, header: Dict[str, Any], payload: bytes = b"") -> None:
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(_FRAME.pack(len(data), len(payload)) + data + payload)
+
+
+def recv_frame(sock: socket.socket, max_payload: int = _MAX_PAYLOAD_BYTES) -> Tuple[Dict[str, Any], bytes]:
+    """Read one frame; raises ValueError for oversized or malformed frames."""
+    header_len, payload_len = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    if header_len > _MAX_HEADER_BYTES or payload_len > max_payload:
+        raise ValueError(f"Frame too large ({header_len} + {payload_len} bytes)")
+    header = json.loads(_recv_exact(sock, header_len).decode("utf-8"))
+    if not isinstance(header, dict):
+        raise ValueError("Frame header is not an object")
+    return header, _recv_exact(sock, payload_len) if payload_len else b""
+
+
+def _digest(authkey: bytes, challenge: bytes) -> str:
+    return hmac.new(authkey, challenge, hashlib.sha256).hexdigest()
+
+
+class EmbeddingServer:
+    """Hosts one embedder and serves ``encode`` calls to local clients.
+
+    Each connection is handled on its own thread; their texts go through a
+    :class:`MicroBatcher`, which encodes everything arriving within
+    ``max_wait_ms`` (up to ``max_batch`` texts) in one call.  ``fingerprint``
+    (see :func:`app.providers.provider_fingerprint`) is reported by ``info``.
+    """
+
+    def __init__(
+        self,
+        embedder: Any,
+        fingerprint: str,
+        address: str = SERVICE_ADDRESS,
+        authkey: Optional[bytes] = None,
+        max_batch: int = SERVICE_MAX_BATCH,
+        max_wait_ms: float = SERVICE_MAX_WAIT_MS,
+    ) -> None:
+        self.embedder = embedder
+        # Identifies the hosted model to clients, which key their stored points by it
+        self.fingerprint = fingerprint
+        self.address = parse_address(address)
+        self.authkey = authkey or service_authkey()
+        self.batcher = MicroBatcher(self._encode, max_batch=max_batch, max_wait_ms=max_wait_ms, name="embed-encoder")
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.embedder.encode(texts), dtype=np.float32)
+
+    def warm_up(self) -> None:
+        """Run one encode so the first real request does not pay for lazy initialisation."""
+        self.embedder.encode(["warm-up"])
+
+    def _listen(self) -> socket.socket:
+        if isinstance(self.address, tuple):
+            sock = socket.create_server(self.address)
+        else:
+            if os.path.exists(self.address) and stat.S_ISSOCK(os.stat(self.address).st_mode):
+                os.unlink(self.address)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            # Created owner-only, so other local users cannot connect at all
+            umask = os.umask(0o177)
+            try:
+                sock.bind(self.address)
+            finally:
+                os.umask(umask)
+            sock.listen()
+        return sock
+
+    def serve_forever(self) -> None:
+        self.warm_up()
+        with self._listen() as listener:
+            logger.info(f"Embedding service listening on {self.address}")
+            while True:
+                conn, _ = listener.accept()
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _authenticate(self, conn: socket.socket) -> bool:
+        challenge = secrets.token_bytes(32)
+        conn.settimeout(_HANDSHAKE_TIMEOUT_S)
+        send_frame(conn, {"challenge": challenge.hex()})
+        header, _ = recv_frame(conn, max_payload=0)
+        if not hmac.compare_digest(str(header.get("digest", "")), _digest(self.authkey, challenge)):
+            send_frame(conn, {"status": "error", "error": "Authentication failed"})
+            return False
+        send_frame(conn, {"status": "ok"})
+        conn.settimeout(None)
+        return True
+
+    def _serve_connection(self, conn: socket.socket) -> None:
+        with conn:
+            try:
+                if not self._authenticate(conn):
+                    logger.warning("Rejected embedding service connection: wrong authkey")
+                    return
+            except (EOFError, OSError, ValueError) as exc:
+                # A client that hung up or sent garbage during the handshake
+                logger.warning(f"Rejected embedding service connection: {exc}")
+                return
+            while True:
+                try:
+                    request, _ = recv_frame(conn, max_payload=0)
+                except (EOFError, OSError):
+                    return
+                except ValueError as exc:
+                    logger.warning(f"Closing embedding service connection: {exc}")
+                    return
+                try:
+                    self._handle(conn, request)
+                except (EOFError, OSError):
+                    # The client hung up before the reply was sent
+                    return
+
+    def _handle(self, conn: socket.socket, request: Dict[str, Any]) -> None:
+        op = request.get("op")
+        if op == "info":
+            info = {"dim": self.embedder.get_sentence_embedding_dimension(), "fingerprint": self.fingerprint}
+            send_frame(conn, {"status": "ok", "value": info})
+        elif op == "stats":
+            send_frame(conn, {"status": "ok", "value": self.batcher.metrics.snapshot()})
+        elif op == "encode":
+            texts = request.get("texts")
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                send_frame(conn, {"status": "error", "error": "texts must be a list of strings"})
+                return
+            try:
+                vectors = np.ascontiguousarray(np.stack(self.batcher.submit_many(texts)), dtype=_VECTOR_DTYPE)
+            except Exception as exc:
+                send_frame(conn, {"status": "error", "error": str(exc)})
+                return
+            send_frame(conn, {"status": "ok", "shape": list(vectors.shape)}, vectors.tobytes())
+        else:
+            send_frame(conn, {"status": "error", "error": f"Unknown operation: {op}"})
+
+
+class RemoteEmbedder:
+    """Client of :class:`EmbeddingServer` with the ``encode`` API of SentenceTransformer.
+
+    Connections are not thread-safe, so each thread opens its own.
+    """
+
+    def __init__(self, address: str = SERVICE_ADDRESS, authkey: Optional[bytes] = None) -> None:
+        self.address = parse_address(address)
+        self.authkey = authkey or service_authkey()
+        self._local = threading.local()
+        self._info: Optional[Dict[str, Any]] = None
+
+    def _connect(self) -> socket.socket:
+        if isinstance(self.address, tuple):
+            sock = socket.create_connection(self.address)
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.address)
+        try:
+            challenge, _ = recv_frame(sock, max_payload=0)
+            send_frame(sock, {"digest": _digest(self.authkey, bytes.fromhex(challenge["challenge"]))})
+            reply, _ = recv_frame(sock, max_payload=0)
+        except BaseException:
+            sock.close()
+            raise
+        if reply.get("status") != "ok":
+            sock.close()
+            raise RuntimeError(f"Embedding service at {self.address} rejected the connection: {reply.get('error')}")
+        return sock
+
+    def _call(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            try:
+                if conn is None:
+                    conn = self._local.conn = self._connect()
+                send_frame(conn, request)
+                reply, payload = recv_frame(conn)
+                break
+            except (EOFError, OSError) as exc:
+                # The server restarted, possibly with another model; reconnect once
+                if conn is not None:
+                    conn.close()
+                self._local.conn = None
+                self._info = None
+                if attempt:
+                    raise RuntimeError(f"Embedding service at {self.address} is unavailable: {exc}") from exc
+        if reply.get("status") != "ok":
+            raise RuntimeError(f"Embedding service error: {reply.get('error')}")
+        return reply, payload
+
+    def info(self) -> Dict[str, Any]:
+        """Dimension and model fingerprint of the server's embedder."""
+        if self._info is None:
+            self._info = self._call({"op": "info"})[0]["value"]
+        return self._info
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.info()["dim"]
+
+    def fingerprint(self) -> str:
+        return self.info()["fingerprint"]
+
+    def encode(self, texts: Sequence[str], **_: Any) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        reply, payload = self._call({"op": "encode", "texts": list(texts)})
+        return np.frombuffer(payload, dtype=_VECTOR_DTYPE).reshape(reply["shape"]).astype(np.float32)
@@ -0,0 +1,224 @@
+"""Per-tier lexical (BM25) index of the stored chunk text.
+
+Dense search misses exact tokens such as acronyms, document ids and quoted
+phrases, so every chunk written to a tier collection is also indexed in a
+SQLite FTS5 table of that collection, ranked with FTS5's built-in BM25.  The
+index is keyed by Qdrant point id and kept in step with the collection as
+documents are upserted, removed and moved; `RagEngine.query` fuses its
+results with the vector search.
+
+The index lives in one SQLite database (`LEXICAL_INDEX_PATH`, default
+``./lexical_index.sqlite3``) with two tables per collection: ``<name>_points``
+maps point ids to FTS rows and ``<name>_fts`` holds the text.  Collection
+names that are not plain identifiers (Qdrant allows ``q-unclass``) are
+replaced by a hash of the name.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_LEXICAL_INDEX_PATH = "./lexical_index.sqlite3"
+
+# Stemmed, case- and accent-insensitive words; ids such as "AB-1234" become
+# the phrase "ab 1234", which quoted query terms match exactly
+TOKENIZER = "porter unicode61 remove_diacritics 2"
+
+# Quoted phrases and single words of a question
+_QUERY_TERMS = re.compile(r'"([^"]+)"|(\S+)')
+_WORD = re.compile(r"\w")
+
+
+def match_expression(question: str, max_terms: int = 64) -> Optional[str]:
+    """Turn free text into an FTS5 query matching any of its words or quoted phrases.
+
+    Every term is quoted, so FTS5 operators and punctuation in the question
+    are taken literally.  Returns None if the question has no words.
+    """
+    terms: Dict[str, None] = {}
+    for phrase, word in _QUERY_TERMS.findall(question):
+        term = phrase or word
+        if _WORD.search(term):
+            terms['"' + term.replace('"', '""') + '"'] = None
+        if len(terms) >= max_terms:
+            break
+    return " OR ".join(terms) or None
+
+
+class LexicalIndex:
+    """SQLite FTS5 index of chunk text, one table per collection.
+
+    Safe to share between threads: writes go through one connection under a
+    lock, and each searching thread reads through its own connection.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_LEXICAL_INDEX_PATH) -> None:
+        self.db_path = db_path
+        # A private in-memory database is only visible to its own connection
+        self._shared_memory = db_path == ":memory:"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        if not self._shared_memory:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._local = threading.local()
+        self._tables: set = set()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @staticmethod
+    def _table_prefix(collection: str) -> str:
+        if re.fullmatch(r"[A-Za-z0-9_]+", collection):
+            return collection
+        return "h_" + hashlib.sha256(collection.encode("utf-8")).hexdigest()[:24]
+
+    @classmethod
+    def _tables_for(cls, collection: str) -> Tuple[str, str]:
+        prefix = cls._table_prefix(collection)
+        return f'"{prefix}_points"', f'"{prefix}_fts"'
+
+    def _reader(self) -> sqlite3.Connection:
+        if self._shared_memory:
+            return self._conn
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return conn
+
+    def _exists(self, conn: sqlite3.Connection, collection: str) -> bool:
+        if collection in self._tables:
+            return True
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (f"{self._table_prefix(collection)}_fts",)
+        ).fetchone()
+        if row:
+            self._tables.add(collection)
+        return row is not None
+
+    def _ensure(self, collection: str) -> Tuple[str, str]:
+        points, fts = self._tables_for(collection)
+        if collection not in self._tables:
+            self._conn.executescript(
+                f"""
+                CREATE TABLE IF NOT EXISTS {points} (
+                    rowid INTEGER PRIMARY KEY,
+                    point_id TEXT NOT NULL UNIQUE,
+                    path TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS "{self._table_prefix(collection)}_points_path" ON {points} (path);
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(text, tokenize = '{TOKENIZER}');
+                """
+            )
+            self._tables.add(collection)
+        return points, fts
+
+    def add(self, collection: str, chunks: Iterable[Tuple[str, str, str]]) -> int:
+        """Index ``(point_id, path, text)`` chunks; points already indexed are skipped.
+
+        Point ids are content addressed, so a known id always has the same
+        text.  Returns the number of chunks added.
+        """
+        added = 0
+        with self._lock:
+            points, fts = self._ensure(collection)
+            with self._conn:
+                for point_id, path, text in chunks:
+                    cursor = self._conn.execute(
+                        f"INSERT OR IGNORE INTO {points} (point_id, path) VALUES (?, ?)", (point_id, path)
+                    )
+                    if cursor.rowcount:
+                        self._conn.execute(f"INSERT INTO {fts} (rowid, text) VALUES (?, ?)", (cursor.lastrowid, text))
+                        added += 1
+        return added
+
+    def _delete_where(self, collection: str, condition: str, params: List[str]) -> int:
+        with self._lock:
+            if not self._exists(self._conn, collection):
+                return 0
+            points, fts = self._tables_for(collection)
+            rowids = [row[0] for row in self._conn.execute(f"SELECT rowid FROM {points} WHERE {condition}", params)]
+            if not rowids:
+                return 0
+            with self._conn:
+                for start in range(0, len(rowids), 500):
+                    batch = rowids[start : start + 500]
+                    marks = ",".join("?" * len(batch))
+                    self._conn.execute(f"DELETE FROM {fts} WHERE rowid IN ({marks})", batch)
+                    self._conn.execute(f"DELETE FROM {points} WHERE rowid IN ({marks})", batch)
+        return len(rowids)
+
+    def delete(self, collection: str, point_ids: Iterable[str]) -> int:
+        """Remove chunks by point id; returns the number removed."""
+        point_ids = list(point_ids)
+        removed = 0
+        for start in range(0, len(point_ids), 500):
+            batch = point_ids[start : start + 500]
+            removed += self._delete_where(collection, f"point_id IN ({','.join('?' * len(batch))})", batch)
+        return removed
+
+    def remove_path(self, collection: str, path: str) -> int:
+        """Remove all chunks of a file; returns the number removed."""
+        return self._delete_where(collection, "path = ?", [path])
+
+    def clear(self, collection: str) -> None:
+        with self._lock:
+            points, fts = self._tables_for(collection)
+            with self._conn:
+                self._conn.execute(f"DROP TABLE IF EXISTS {fts}")
+                self._conn.execute(f"DROP TABLE IF EXISTS {points}")
+            self._tables.discard(collection)
+
+    def count(self, collection: str) -> int:
+        conn = self._reader()
+        if not self._exists(conn, collection):
+            return 0
+        points, _ = self._tables_for(collection)
+        return conn.execute(f"SELECT count(*) FROM {points}").fetchone()[0]
+
+    def search(self, collection: str, question: str, limit: int) -> List[Tuple[str, float]]:
+        """Return ``(point_id, bm25)`` of the best matching chunks, best first.
+
+        Scores are positive; higher is better.
+        """
+        expression = match_expression(question)
+        if expression is None:
+            return []
+        conn = self._reader()
+        if self._shared_memory:
+            self._lock.acquire()
+        try:
+            if not self._exists(conn, collection):
+                return []
+            points, fts = self._tables_for(collection)
+            rows = conn.execute(
+                f"SELECT p.point_id, bm25({fts}) AS rank FROM {fts} JOIN {points} AS p ON p.rowid = {fts}.rowid "
+                f"WHERE {fts} MATCH ? ORDER BY rank LIMIT ?",
+                (expression, limit),
+            ).fetchall()
+        finally:
+            if self._shared_memory:
+                self._lock.release()
+        return [(point_id, -rank) for point_id, rank in rows]
+
+
+def create_lexical_index(db_path: Optional[str] = None, needed: bool = True) -> Optional[LexicalIndex]:
+    """Open the index at ``LEXICAL_INDEX_PATH``.
+
+    Returns None if the variable is set empty, or if it is unset and the
+    index is not ``needed`` (no tier uses hybrid search), so no database is
+    created in the working directory of a vector-only deployment.
+    """
+    if db_path is None:
+        db_path = os.getenv("LEXICAL_INDEX_PATH")
+    if db_path is None:
+        if not needed:
+            return None
+        db_path = DEFAULT_LEXICAL_INDEX_PATH
+    if not db_path.strip():
+        return None
+    return LexicalIndex(db_path)
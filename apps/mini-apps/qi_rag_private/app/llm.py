@@ -1,15 +1,30 @@
 """LLM abstraction layer.
 
 This module encapsulates calls to a local language model (via Ollama) or to a
-remote provider.  It exposes a simple `generate_answer` function which
-constructs a prompt from the user question and retrieved context.
+simulated model for offline load testing.  It exposes a simple
+`generate_answer` function which constructs a prompt from the user question
+and retrieved context, and `astream_answer`, which streams the answer token by
+token over a pooled, keep-alive async HTTP client.
 """
 
 from __future__ import annotations
 
+import json
 import os
 import requests
-from typing import List
+from typing import AsyncIterator, List, Optional
+
+import httpx
+
+from .providers import create_simulated_llm
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434").rstrip("/")
+# Longest wait for the next streamed token (or the whole answer when not streaming)
+OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "60"))
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "32"))
+
+# Reused across calls so connections to Ollama are kept alive
+_session = requests.Session()
 
 
 def build_prompt(question: str, contexts: List[str]) -> str:
@@ -36,10 +51,10 @@ def call_ollama(prompt: str, model: str) -> str:
     Requires the `ollama/ollama` Docker container to be running with port
     11434 exposed.  See the project README for details.
     """
-    url = "http://localhost:11434/api/generate"
+    url = f"{OLLAMA_BASE_URL}/api/generate"
     payload = {"model": model, "prompt": prompt, "stream": False}
     try:
-        resp = requests.post(url, json=payload, timeout=60)
+        resp = _session.post(url, json=payload, timeout=OLLAMA_READ_TIMEOUT)
         resp.raise_for_status()
         data = resp.json()
         response = data.get("response", "").strip()
@@ -47,7 +62,7 @@ def call_ollama(prompt: str, model: str) -> str:
             raise RuntimeError("Empty response from Ollama")
         return response
     except requests.exceptions.Timeout:
-        raise RuntimeError(f"Ollama request timed out after 60 seconds for model {model}")
+        raise RuntimeError(f"Ollama request timed out after {OLLAMA_READ_TIMEOUT:.0f} seconds for model {model}")
     except requests.exceptions.ConnectionError:
         raise RuntimeError(f"Failed to connect to Ollama server at {url}. Is Ollama running?")
     except requests.exceptions.HTTPError as e:
@@ -59,12 +74,101 @@ def call_ollama(prompt: str, model: str) -> str:
 def generate_answer(question: str, contexts: List[str]) -> str:
     """Generate an answer to a question given a list of context passages.
 
-    Depending on your environment variables this function will either call a
-    local Ollama server or another provider.  For the MVP we support only
-    the local Ollama pathway.
+    The provider is chosen by the `LLM_PROVIDER` environment variable:
+    `ollama` (default) calls the local Ollama server, `simulated` returns a
+    deterministic answer with configurable latency and needs no model.
+    """
+    prompt = build_prompt(question, contexts)
+    provider = os.getenv("LLM_PROVIDER", "ollama").lower()
+    if provider == "simulated":
+        return create_simulated_llm().generate(prompt)
+    if provider != "ollama":
+        raise RuntimeError(f"Unsupported LLM_PROVIDER: {provider}")
+    model = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
+    return call_ollama(prompt, model)
+
+
+class AsyncOllamaClient:
+    """Pooled async client for Ollama's streaming generate API.
+
+    One instance is shared by all requests: connections are kept alive and
+    a request waiting on the model holds no thread, so concurrency is bounded
+    by `max_connections` rather than the server's threadpool.
+    """
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_BASE_URL,
+        read_timeout: float = OLLAMA_READ_TIMEOUT,
+        max_connections: int = OLLAMA_MAX_CONNECTIONS,
+    ) -> None:
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(read_timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def stream(self, prompt: str, model: str) -> AsyncIterator[str]:
+        """Yield generated text fragments as Ollama produces them."""
+        payload = {"model": model, "prompt": prompt, "stream": True}
+        try:
+            async with self._client.stream("POST", "/api/generate", json=payload) as resp:
+                if resp.is_error:
+                    body = (await resp.aread()).decode("utf-8", "replace")
+                    raise RuntimeError(f"Ollama HTTP error: {resp.status_code} - {body}")
+                async for line in resp.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise RuntimeError(f"Ollama error: {data['error']}")
+                    if data.get("response"):
+                        yield data["response"]
+                    if data.get("done"):
+                        return
+        except httpx.TimeoutException:
+            raise RuntimeError(f"Ollama stopped responding for {OLLAMA_READ_TIMEOUT:.0f} seconds for model {model}")
+        except httpx.ConnectError:
+            raise RuntimeError(f"Failed to connect to Ollama server at {self._client.base_url}. Is Ollama running?")
+
+    async def generate(self, prompt: str, model: str) -> str:
+        return "".join([fragment async for fragment in self.stream(prompt, model)]).strip()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_async_client: Optional[AsyncOllamaClient] = None
+
+
+def get_async_client() -> AsyncOllamaClient:
+    """Return the process-wide async Ollama client, creating it on first use."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOllamaClient()
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+async def astream_answer(question: str, contexts: List[str]) -> AsyncIterator[str]:
+    """Stream an answer to a question given a list of context passages.
+
+    Uses the same `LLM_PROVIDER` selection as `generate_answer`.
     """
     prompt = build_prompt(question, contexts)
+    provider = os.getenv("LLM_PROVIDER", "ollama").lower()
+    if provider == "simulated":
+        async for token in create_simulated_llm().astream(prompt):
+            yield token
+        return
+    if provider != "ollama":
+        raise RuntimeError(f"Unsupported LLM_PROVIDER: {provider}")
     model = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
-    # In a more complete implementation you could branch here based on
-    # LLM_PROVIDER environment variables or similar.
-    return call_ollama(prompt, model)
\ No newline at end of file
+    async for fragment in get_async_client().stream(prompt, model):
+        yield fragment
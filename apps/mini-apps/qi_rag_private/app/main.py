@@ -2,16 +2,21 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
-import requests
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from .llm import generate_answer
+from .cloud import create_cloud_client
+from .llm import astream_answer, close_async_client, generate_answer
 from .rag import RagEngine
 from .utils import load_tier_policies
 
@@ -19,9 +24,16 @@ from .utils import load_tier_policies
 engine = RagEngine()
 app = FastAPI(title="Tiered RAG API", version="0.1.0")
 
-# Load tier policies and cloud endpoint from environment
+# Load tier policies and cloud fallback client from environment
 tier_policies = load_tier_policies()
-cloud_endpoint = os.getenv("CLOUD_ENDPOINT", "").strip() or None
+cloud_client = create_cloud_client()
+
+
+@app.on_event("startup")
+def warm_up_embedder() -> None:
+    """Load the embedder before serving so the first request does not pay for it."""
+    if os.getenv("EMBEDDING_WARMUP", "true").lower() in {"1", "true", "yes"}:
+        engine.embedder().encode(["warm-up"])
 
 
 class IngestRequest(BaseModel):
@@ -60,10 +72,8 @@ class ChatResponse(BaseModel):
     fallback_used: bool
 
 
-@app.post("/chat", response_model=ChatResponse)
-def chat(question: str = Query(...), tiers: Optional[str] = Query(None)) -> ChatResponse:
-    """Answer a question using content from the specified classification tiers."""
-    # Validate input
+def _parse_request(question: str, tiers: Optional[str]) -> List[str]:
+    """Validate a chat request and return the tiers to search."""
     if not question or not question.strip():
         raise HTTPException(status_code=400, detail="Question cannot be empty")
     
@@ -72,58 +82,139 @@ def chat(question: str = Query(...), tiers: Optional[str] = Query(None)) -> Chat
     
     # Determine which tiers to search
     if tiers:
-        requested_tiers = [t.strip().upper() for t in tiers.split(",") if t.strip()]
-    else:
-        # Default to UNCLASS and CLASSIFIED
-        requested_tiers = ["UNCLASS", "CLASSIFIED"]
+        return [t.strip().upper() for t in tiers.split(",") if t.strip()]
+    # Default to UNCLASS and CLASSIFIED
+    return ["UNCLASS", "CLASSIFIED"]
 
-    # Query local collections
-    results = engine.query(question, requested_tiers)
+
+def _allowed_tiers(requested_tiers: List[str]) -> List[str]:
+    # We only fall back for tiers whose policy is true
+    if cloud_client is None:
+        return []
+    return [t for t in requested_tiers if tier_policies.get(t, False)]
+
+
+def _start_fallback(question: str, requested_tiers: List[str]) -> Optional["Future[Optional[str]]"]:
+    """Start the cloud query before local retrieval if `CLOUD_SPECULATIVE` is on.
+
+    It then runs while local retrieval does, and is cancelled if every
+    allowed tier turns out to have local results.  Off by default, as it
+    sends every chat question to the remote.
+    """
+    if cloud_client is None or not cloud_client.speculative:
+        return None
+    allowed_tiers = _allowed_tiers(requested_tiers)
+    return cloud_client.submit(question, allowed_tiers) if allowed_tiers else None
+
+
+def _fallback_needed(requested_tiers: List[str], results: list) -> bool:
     # Determine which tiers returned nothing and allow fallback
     missing_tiers = set(requested_tiers) - {res[2].get("tier") for res in results}
-    fallback_used = False
-    remote_answer: Optional[str] = None
-
-    if missing_tiers and cloud_endpoint:
-        # Check policy: we only fall back for tiers whose policy is true
-        allowed_tiers = [t for t in missing_tiers if tier_policies.get(t, False)]
-        if allowed_tiers:
-            # Proxy the query to the remote endpoint
-            try:
-                timeout = int(os.getenv("CLOUD_REQUEST_TIMEOUT", "30"))
-                resp = requests.post(
-                    cloud_endpoint.rstrip("/") + "/chat",
-                    params={"question": question, "tiers": ",".join(allowed_tiers)},
-                    timeout=timeout,
-                )
-                resp.raise_for_status()
-                data = resp.json()
-                remote_answer = data.get("answer") or None
-                fallback_used = True
-            except Exception:
-                remote_answer = None
+    return bool(set(_allowed_tiers(requested_tiers)) & missing_tiers)
+
+
+def _fallback(
+    question: str, requested_tiers: List[str], results: list, remote: Optional["Future[Optional[str]]"]
+) -> Optional["Future[Optional[str]]"]:
+    """The cloud query to wait for, started now unless it already runs; None if not needed."""
+    if not _fallback_needed(requested_tiers, results):
+        if remote is not None:
+            remote.cancel()
+        return None
+    return remote if remote is not None else cloud_client.submit(question, _allowed_tiers(requested_tiers))
 
-    # Compose context texts for the local answer
-    contexts = [res[0] for res in results]
-    if contexts:
-        answer = generate_answer(question, contexts)
-    elif remote_answer:
-        answer = remote_answer
-    else:
-        answer = "No relevant information available."
 
-    # Prepare sources list
-    sources = [
+def _sources(results: list) -> List[dict]:
+    return [
         {
             "text": res[0],
             "score": res[1],
             "tier": res[2].get("tier"),
             "path": res[2].get("path"),
+            # Character offsets of the chunk in the parsed document, for citations
+            "start": res[2].get("start"),
+            "end": res[2].get("end"),
         }
         for res in results
     ]
 
-    return ChatResponse(answer=answer, sources=sources, fallback_used=fallback_used)
+
+@app.post("/chat", response_model=ChatResponse)
+def chat(question: str = Query(...), tiers: Optional[str] = Query(None)) -> ChatResponse:
+    """Answer a question using content from the specified classification tiers."""
+    requested_tiers = _parse_request(question, tiers)
+
+    # Query local collections, with a speculative cloud fallback in flight meanwhile
+    remote = _start_fallback(question, requested_tiers)
+    results = engine.query(question, requested_tiers)
+    remote = _fallback(question, requested_tiers, results, remote)
+    remote_answer = None
+    if remote is not None:
+        try:
+            remote_answer = remote.result(timeout=cloud_client.wait_timeout)
+        except FutureTimeoutError:
+            remote.cancel()
+    fallback_used = remote_answer is not None
+
+    # Compose context texts for the local answer
+    contexts = [res[0] for res in results]
+    if contexts:
+        answer = generate_answer(question, contexts)
+    elif remote_answer:
+        answer = remote_answer
+    else:
+        answer = "No relevant information available."
+
+    return ChatResponse(answer=answer, sources=_sources(results), fallback_used=fallback_used)
+
+
+@app.post("/chat/stream")
+async def chat_stream(question: str = Query(...), tiers: Optional[str] = Query(None)) -> StreamingResponse:
+    """Stream the answer to a question as newline-delimited JSON events.
+
+    A `sources` event comes first, then one `token` event per generated
+    fragment and a final `done` event (or `error` if generation failed).
+    Generation awaits the pooled async Ollama client, so a waiting request
+    holds no worker thread.
+    """
+    requested_tiers = _parse_request(question, tiers)
+    remote = _start_fallback(question, requested_tiers)
+    results = await run_in_threadpool(engine.query, question, requested_tiers)
+    remote = _fallback(question, requested_tiers, results, remote)
+    remote_answer = None
+    if remote is not None:
+        try:
+            # Cancels the call on timeout
+            remote_answer = await asyncio.wait_for(asyncio.wrap_future(remote), cloud_client.wait_timeout)
+        except asyncio.TimeoutError:
+            pass
+    contexts = [res[0] for res in results]
+
+    async def events() -> AsyncIterator[str]:
+        yield json.dumps({"type": "sources", "sources": _sources(results)}) + "\n"
+        try:
+            if contexts:
+                async for fragment in astream_answer(question, contexts):
+                    yield json.dumps({"type": "token", "text": fragment}) + "\n"
+            else:
+                yield json.dumps({"type": "token", "text": remote_answer or "No relevant information available."}) + "\n"
+        except Exception as exc:
+            yield json.dumps({"type": "error", "detail": str(exc)}) + "\n"
+            return
+        yield json.dumps({"type": "done", "fallback_used": remote_answer is not None}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.on_event("shutdown")
+async def close_llm_client() -> None:
+    await close_async_client()
+
+
+@app.get("/metrics/embeddings")
+def embedding_metrics() -> dict:
+    """Batch-size and latency metrics of query embedding micro-batching."""
+    return {"query_batching": engine.query_batch_metrics()}
 
 
 @app.get("/")
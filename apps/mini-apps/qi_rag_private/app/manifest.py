@@ -0,0 +1,143 @@
+"""Local record of ingested files.
+
+The manifest is a small SQLite database holding the size, modification time
+and content hash of every file that was ingested.  Ingestion tools check it
+first: a matching ``stat`` means the file is unchanged without reading it,
+and a matching hash catches files that were only touched.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+
+DEFAULT_MANIFEST_PATH = os.getenv("INGEST_MANIFEST", "./ingest_manifest.sqlite3")
+
+
+@dataclass
+class ManifestEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    """Hash a file's contents without loading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def settings_fingerprint(engine: Any) -> str:
+    """Settings that change the stored points; a change invalidates the manifest."""
+    return (
+        f"{engine.embedding_key()}:{engine.chunk_tokenizer_name}:"
+        f"{engine.chunk_size}:{engine.chunk_overlap}"
+    )
+
+
+class IngestManifest:
+    """SQLite-backed record of ``path -> (size, mtime_ns, sha256)``.
+
+    Safe to share between threads; writes are serialised by a lock.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_MANIFEST_PATH) -> None:
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                ingested_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get(self, path: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, size, mtime_ns, sha256 FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        return ManifestEntry(*row) if row else None
+
+    def record(self, entry: ManifestEntry) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                (entry.path, entry.size, entry.mtime_ns, entry.sha256, time.time()),
+            )
+
+    def remove(self, path: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def paths(self, prefix: str = "") -> Iterator[str]:
+        """Yield recorded paths, optionally only those under a prefix."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+            ).fetchall()
+        for (path,) in rows:
+            yield path
+
+    def check_fingerprint(self, fingerprint: str) -> bool:
+        """Store the ingestion settings fingerprint; return False if it changed.
+
+        Entries recorded under different settings (chunking, embedding model)
+        are dropped, since their points must be rebuilt.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+            if row and row[0] == fingerprint:
+                return True
+            with self._conn:
+                if row:
+                    self._conn.execute("DELETE FROM files")
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)", (fingerprint,))
+        return row is None
+
+    @staticmethod
+    def entry_for(path: Path) -> ManifestEntry:
+        """Build a fresh entry for ``path``, hashing its contents."""
+        stat = path.stat()
+        return ManifestEntry(str(path), stat.st_size, stat.st_mtime_ns, file_sha256(path))
+
+    def needs_ingest(self, path: Path) -> Optional[ManifestEntry]:
+        """Return the file's new entry if it changed since it was recorded, else None.
+
+        Size and mtime are compared first so unchanged files are never read;
+        when they differ the content hash decides, and a file that was only
+        touched has its stat refreshed without being re-ingested.
+        """
+        stat = path.stat()
+        entry = self.get(str(path))
+        if entry and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            return None
+        current = self.entry_for(path)
+        if entry and entry.sha256 == current.sha256:
+            self.record(current)
+            return None
+        return current
@@ -0,0 +1,104 @@
+"""Per-tier collection profiles.
+
+Large tiers do not fit in RAM as float32 HNSW graphs, so each tier can pick
+how its Qdrant collection stores and searches vectors.  Profiles are read from
+the `TIER_PROFILES` environment variable as JSON keyed by tier, with `*` as
+the default for tiers not listed:
+
+    TIER_PROFILES={"*": {"hnsw_m": 16},
+                   "ULTRA": {"quantization": "scalar", "on_disk": true,
+                             "on_disk_payload": true, "search_ef": 128,
+                             "lexical_weight": 2.0}}
+
+Storage settings apply when a collection is created; search settings apply
+to every query.  ``vector_weight`` and ``lexical_weight`` set how much the
+dense and BM25 rankings count when a tier's results are fused.  Tiers are
+vector-only unless given a lexical weight above 0.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional
+
+from qdrant_client.http import models as qmodels
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CollectionProfile:
+    """Storage and search settings of one tier's collection."""
+
+    # None, "scalar" (int8, 4x smaller) or "product" (see compression)
+    quantization: Optional[str] = None
+    # Product quantization compression ratio: x4, x8, x16, x32 or x64
+    compression: str = "x16"
+    # Keep quantized vectors in RAM even when the originals are on disk
+    always_ram: bool = True
+    # Store original vectors / payloads on disk (memmapped) instead of in RAM
+    on_disk: bool = False
+    on_disk_payload: bool = False
+    # HNSW graph degree and build-time beam width; None keeps Qdrant's default
+    hnsw_m: Optional[int] = None
+    hnsw_ef_construct: Optional[int] = None
+    # Search beam width; higher is more accurate and slower
+    search_ef: Optional[int] = None
+    # Re-score quantized candidates with the original vectors, fetching oversampling x limit
+    rescore: bool = True
+    oversampling: Optional[float] = None
+    # Weights of the dense and BM25 rankings in reciprocal rank fusion; 0 lexical = vector only
+    vector_weight: float = 1.0
+    lexical_weight: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CollectionProfile":
+        known = {field.name for field in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            logger.warning(f"Ignoring unknown collection profile settings: {', '.join(sorted(unknown))}")
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+    def vectors_config(self, size: int) -> qmodels.VectorParams:
+        return qmodels.VectorParams(size=size, distance=qmodels.Distance.COSINE, on_disk=self.on_disk or None)
+
+    def hnsw_config(self) -> Optional[qmodels.HnswConfigDiff]:
+        if self.hnsw_m is None and self.hnsw_ef_construct is None:
+            return None
+        return qmodels.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def quantization_config(self) -> Optional[qmodels.QuantizationConfig]:
+        if self.quantization is None:
+            return None
+        if self.quantization == "scalar":
+            return qmodels.ScalarQuantization(
+                scalar=qmodels.ScalarQuantizationConfig(
+                    type=qmodels.ScalarType.INT8, quantile=0.99, always_ram=self.always_ram
+                )
+            )
+        if self.quantization == "product":
+            return qmodels.ProductQuantization(
+                product=qmodels.ProductQuantizationConfig(
+                    compression=qmodels.CompressionRatio(self.compression), always_ram=self.always_ram
+                )
+            )
+        raise ValueError(f"Unsupported quantization: {self.quantization}")
+
+    def search_params(self) -> Optional[qmodels.SearchParams]:
+        quantization = None
+        if self.quantization is not None:
+            quantization = qmodels.QuantizationSearchParams(rescore=self.rescore, oversampling=self.oversampling)
+        if self.search_ef is None and quantization is None:
+            return None
+        return qmodels.SearchParams(hnsw_ef=self.search_ef, quantization=quantization)
+
+
+def load_tier_profiles(var: str = "TIER_PROFILES") -> Dict[str, CollectionProfile]:
+    """Parse per-tier profiles from JSON in an environment variable."""
+    raw = os.getenv(var, "").strip()
+    if not raw:
+        return {}
+    return {str(tier): CollectionProfile.from_dict(profile) for tier, profile in json.loads(raw).items()}
@@ -0,0 +1,146 @@
+"""Embedding and LLM providers.
+
+Besides the real backends (SentenceTransformer embeddings, Ollama) this module
+provides deterministic local stand-ins so the whole pipeline can be load
+tested offline: a hashing embedder and a simulated LLM that emits tokens with
+configurable latency.  Providers are selected through environment variables:
+
+    EMBEDDING_PROVIDER=sentence-transformers|onnx|hashing|service
+    LLM_PROVIDER=ollama|simulated
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _shared_hashing_embedder(dim: int) -> Any:
+    """The hashing embedder of the repository-level ``shared.benchmarking`` harness."""
+    try:
+        from shared.benchmarking import HashingEmbedder as SharedHashingEmbedder
+    except ImportError:
+        sys.path.append(str(Path(__file__).resolve().parents[4]))
+        from shared.benchmarking import HashingEmbedder as SharedHashingEmbedder
+    return SharedHashingEmbedder(dim=dim)
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embeddings from hashed tokens.
+
+    The vectors come from the benchmark harness's hashing embedder; this adds
+    the simulated latency and the SentenceTransformer methods the engine uses.
+    """
+
+    def __init__(self, dim: int = 384, latency_ms: float = 0.0) -> None:
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self._hasher = _shared_hashing_embedder(dim)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts: Sequence[str], **_: Any) -> np.ndarray:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._hasher.encode(texts)
+
+
+class SimulatedLLM:
+    """Stand-in for a local LLM that answers with words of the prompt.
+
+    The first token arrives after ``first_token_ms`` and each further token
+    after ``token_ms``, so concurrency and timeouts behave as with a real model
+    while the output stays deterministic.
+    """
+
+    def __init__(self, first_token_ms: float = 300.0, token_ms: float = 20.0, output_tokens: int = 64) -> None:
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.output_tokens = output_tokens
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the answer token by token."""
+        words = _TOKEN_RE.findall(prompt) or ["simulated"]
+        for i in range(self.output_tokens):
+            time.sleep((self.first_token_ms if i == 0 else self.token_ms) / 1000)
+            yield "Simulated" if i == 0 else f" {words[(i - 1) % len(words)]}"
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the answer token by token without blocking the event loop."""
+        words = _TOKEN_RE.findall(prompt) or ["simulated"]
+        for i in range(self.output_tokens):
+            await asyncio.sleep((self.first_token_ms if i == 0 else self.token_ms) / 1000)
+            yield "Simulated" if i == 0 else f" {words[(i - 1) % len(words)]}"
+
+    def generate(self, prompt: str) -> str:
+        return "".join(self.stream(prompt))
+
+
+def embedding_fingerprint(model_name: str, get_embedder: Optional[Callable[[], Any]] = None) -> str:
+    """Identify the vectors ``model_name`` produces with the configured provider.
+
+    Embeddings with different fingerprints are not comparable, so points
+    stored under another fingerprint must be re-embedded.  With
+    ``EMBEDDING_PROVIDER=service`` the model is whatever the embedding server
+    was started with, so the fingerprint is asked from the server (through
+    the embedder ``get_embedder`` returns, if given) rather than built from
+    ``EMBEDDING_MODEL``.
+    """
+    provider = os.getenv("EMBEDDING_PROVIDER", "sentence-transformers").lower()
+    if provider == "service":
+        embedder = get_embedder() if get_embedder is not None else create_embedder(model_name, provider)
+        return embedder.fingerprint()
+    return provider_fingerprint(provider, model_name)
+
+
+def provider_fingerprint(provider: str, model_name: str) -> str:
+    """Fingerprint of ``model_name`` computed in this process by ``provider``."""
+    provider = provider.lower()
+    if provider == "onnx":
+        # int8 and float32 exports of the same model give different vectors
+        return f"onnx:{model_name}:{os.getenv('ONNX_MODEL_DIR', '')}:{os.getenv('ONNX_QUANTIZED', '')}"
+    if provider == "hashing":
+        return f"hashing:{os.getenv('HASHING_DIM', '384')}"
+    return f"{provider}:{model_name}"
+
+
+def create_embedder(model_name: str, provider: Optional[str] = None) -> Any:
+    """Create the embedder selected by ``provider`` or ``EMBEDDING_PROVIDER``."""
+    provider = (provider or os.getenv("EMBEDDING_PROVIDER", "sentence-transformers")).lower()
+    if provider == "service":
+        from .embedding_service import RemoteEmbedder
+
+        return RemoteEmbedder()
+    if provider == "onnx":
+        from .onnx_embedding import create_onnx_embedder
+
+        return create_onnx_embedder(model_name)
+    if provider == "hashing":
+        return HashingEmbedder(
+            dim=int(os.getenv("HASHING_DIM", "384")),
+            latency_ms=float(os.getenv("SIMULATED_EMBED_MS", "0")),
+        )
+    if provider == "sentence-transformers":
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(model_name)
+    raise ValueError(f"Unsupported EMBEDDING_PROVIDER: {provider}")
+
+
+def create_simulated_llm() -> SimulatedLLM:
+    """Create a simulated LLM configured from the environment."""
+    return SimulatedLLM(
+        first_token_ms=float(os.getenv("SIMULATED_FIRST_TOKEN_MS", "300")),
+        token_ms=float(os.getenv("SIMULATED_TOKEN_MS", "20")),
+        output_tokens=int(os.getenv("SIMULATED_OUTPUT_TOKENS", "64")),
+    )
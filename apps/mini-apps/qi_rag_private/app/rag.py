@@ -1,21 +1,31 @@
 """Core retrieval and ingestion logic.
 
 This module provides helper functions to create a Qdrant client, split
-documents into chunks, generate embeddings and perform similarity search.
+documents into chunks, generate embeddings and perform hybrid (dense and
+BM25) search.
 """
 
 from __future__ import annotations
 
+import hashlib
+import heapq
 import logging
+import math
 import os
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from qdrant_client import QdrantClient
 from qdrant_client.http import models as qmodels
-from sentence_transformers import SentenceTransformer
 
+from .batching import MicroBatcher
+from .chunking import chunk_spans, load_tokenizer
+from .lexical import LexicalIndex, create_lexical_index
+from .profiles import CollectionProfile, load_tier_profiles
+from .providers import create_embedder, embedding_fingerprint
 from .utils import (
     determine_tier_for_file,
     load_env_mapping,
@@ -23,9 +33,41 @@ from .utils import (
     read_pdf,
     read_text_file,
 )
+from .vector_store import VectorClient, create_vector_client
 
 logger = logging.getLogger(__name__)
 
+# Namespace of the content-addressed point ids
+POINT_NAMESPACE = uuid.UUID("6f1c52f0-52a4-4c56-9a57-2f1b8e0f5a21")
+
+
+@dataclass
+class PreparedDocument:
+    """A parsed and split file, ready to be embedded and stored."""
+
+    path: str
+    tier: str
+    collection: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    chunks: List[str] = field(default_factory=list)
+    # Character offsets of each chunk in the parsed document body
+    spans: List[Tuple[int, int]] = field(default_factory=list)
+
+    def position(self, idx: int) -> Dict[str, Any]:
+        """Payload fields that locate a chunk within the document."""
+        position: Dict[str, Any] = {"chunk_index": idx, "tier": self.tier, "metadata": self.metadata}
+        if self.spans:
+            position["start"], position["end"] = self.spans[idx]
+        return position
+
+    def payload(self, idx: int) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            **self.position(idx),
+            # Stored so queries never have to touch the source file
+            "text": self.chunks[idx],
+        }
+
 
 class RagEngine:
     """Encapsulates embedding, storage and retrieval operations."""
@@ -38,22 +80,120 @@ class RagEngine:
         self.embedding_model_name = os.getenv("EMBEDDING_MODEL", "bge-small-en-v1.5")
         self.chunk_size = int(os.getenv("CHUNK_SIZE", "800"))
         self.chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "100"))
+        # "words", "embedder" or a Hugging Face tokenizer name; sizes count its units
+        self.chunk_tokenizer_name = os.getenv("CHUNK_TOKENIZER", "words")
         self.top_k = int(os.getenv("TOP_K", "5"))
+        # Tiers are searched concurrently; a tier slower than this is dropped
+        self.tier_search_timeout = float(os.getenv("TIER_SEARCH_TIMEOUT", "5"))
+        self.tier_search_workers = int(os.getenv("TIER_SEARCH_WORKERS", "8"))
+        # Concurrent query embeddings are batched; a wait of 0 embeds each query alone
+        self.query_batch_max_size = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+        self.query_batch_max_wait_ms = float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "5"))
+        # Hybrid search: candidates taken from each ranking, and the reciprocal rank fusion constant
+        self.hybrid_candidates = int(os.getenv("HYBRID_CANDIDATES", "20"))
+        self.hybrid_rrf_k = float(os.getenv("HYBRID_RRF_K", "60"))
 
         # Load mapping from env
         self.tier_collections = load_env_mapping("TIER_COLLECTIONS")
         self.folder_tiers = load_env_mapping("FOLDER_TIERS")
+        self.tier_profiles = load_tier_profiles()
 
         # Initialise components
-        self._client = QdrantClient(host=self.qdrant_host, port=self.qdrant_port)
-        self._embedder: Optional[SentenceTransformer] = None
+        self._vector_client: Optional[VectorClient] = None
+        self._vector_client_lock = threading.Lock()
+        self._lexical_index: Optional[LexicalIndex] = None
+        self._lexical_loaded = False
+        self._embedder: Optional[Any] = None
+        self._tokenizer: Optional[Any] = None
+        self._tokenizer_loaded = False
+        self._ensured_collections: set = set()
+        # Vector size each ensured collection was checked against
+        self._collection_sizes: Dict[str, int] = {}
+        # Names of existing collections, listed once instead of checked per upsert
+        self._known_collections: Optional[set] = None
+        self._query_batcher: Optional[MicroBatcher] = None
+        self._query_batcher_lock = threading.Lock()
+        self._search_pool = ThreadPoolExecutor(
+            max_workers=self.tier_search_workers, thread_name_prefix="tier-search"
+        )
+
+    @property
+    def client(self) -> VectorClient:
+        """The vector store selected by ``VECTOR_BACKEND``, connected on first use.
+
+        Connecting lazily keeps engines that only parse documents (such as
+        ingest worker processes) from opening an embedded store, which
+        allows a single process per storage path.
+        """
+        if self._vector_client is None:
+            with self._vector_client_lock:
+                if self._vector_client is None:
+                    self._vector_client = create_vector_client(host=self.qdrant_host, port=self.qdrant_port)
+        return self._vector_client
+
+    @client.setter
+    def client(self, value: VectorClient) -> None:
+        self._vector_client = value
+
+    @property
+    def lexical(self) -> Optional[LexicalIndex]:
+        """The BM25 index of the stored chunks, opened on first use like `client`.
+
+        None if ``LEXICAL_INDEX_PATH`` is set empty, which disables hybrid
+        search, or if it is unset and no tier profile has a lexical weight.
+        """
+        if not self._lexical_loaded:
+            with self._vector_client_lock:
+                if not self._lexical_loaded:
+                    needed = any(profile.lexical_weight > 0 for profile in self.tier_profiles.values())
+                    self._lexical_index = create_lexical_index(needed=needed)
+                    self._lexical_loaded = True
+        return self._lexical_index
+
+    @lexical.setter
+    def lexical(self, value: Optional[LexicalIndex]) -> None:
+        self._lexical_index = value
+        self._lexical_loaded = True
 
-    def embedder(self) -> SentenceTransformer:
-        """Lazy load the embedding model."""
+    def embedding_key(self) -> str:
+        """Fingerprint of the configured embedding model, part of every point id."""
+        return embedding_fingerprint(self.embedding_model_name, self.embedder)
+
+    def embedder(self) -> Any:
+        """Lazy load the embedding model selected by ``EMBEDDING_PROVIDER``."""
         if self._embedder is None:
-            self._embedder = SentenceTransformer(self.embedding_model_name)
+            self._embedder = create_embedder(self.embedding_model_name)
         return self._embedder
 
+    def tokenizer(self) -> Optional[Any]:
+        """Lazy load the chunking tokenizer; None when chunking by words.
+
+        Never loads the embedding model, even for ``CHUNK_TOKENIZER=embedder``.
+        """
+        if not self._tokenizer_loaded:
+            self._tokenizer = load_tokenizer(self.chunk_tokenizer_name, self.embedding_model_name)
+            self._tokenizer_loaded = True
+        return self._tokenizer
+
+    def embed_query(self, question: str) -> List[float]:
+        """Embed a query, batched with concurrent queries unless batching is disabled."""
+        if self.query_batch_max_wait_ms <= 0 or self.query_batch_max_size <= 1:
+            return self.embedder().encode([question]).tolist()[0]
+        if self._query_batcher is None:
+            with self._query_batcher_lock:
+                if self._query_batcher is None:
+                    self._query_batcher = MicroBatcher(
+                        lambda questions: self.embedder().encode(questions).tolist(),
+                        max_batch=self.query_batch_max_size,
+                        max_wait_ms=self.query_batch_max_wait_ms,
+                        name="query-embed",
+                    )
+        return self._query_batcher.submit(question)
+
+    def query_batch_metrics(self) -> Optional[Dict[str, Any]]:
+        """Batch-size and latency metrics of query embedding, if batching has run."""
+        return self._query_batcher.metrics.snapshot() if self._query_batcher is not None else None
+
     # Document handling
     def load_document(self, path: Path) -> Tuple[str, Dict[str, str]]:
         """Load the contents of a document and return (text, metadata)."""
@@ -65,112 +205,527 @@ class RagEngine:
         meta, body = parse_front_matter(text) if path.suffix.lower() in {".md", ".markdown"} else ({}, text)
         return body, meta or {}
 
+    def split_spans(self, text: str) -> List[Tuple[int, int]]:
+        """Split a document into overlapping chunks given as character offsets.
+
+        Each chunk covers at most `chunk_size` units with `chunk_overlap`
+        units overlap with the previous chunk.  Units are words, or tokens of
+        the tokenizer selected by `CHUNK_TOKENIZER`.
+        """
+        return list(chunk_spans(text, self.chunk_size, self.chunk_overlap, self.tokenizer()))
+
     def split_text(self, text: str) -> List[str]:
-        """Split a document into overlapping chunks.
-
-        We perform a naive word‑based segmentation using whitespace to approximate
-        tokens.  Each chunk contains at most `chunk_size` words with
-        `chunk_overlap` words overlap with the previous chunk.  You may
-        substitute a more sophisticated tokeniser here.
-        """
-        words = text.split()
-        if not words:
-            return []
-        chunks: List[str] = []
-        step = self.chunk_size - self.chunk_overlap
-        for i in range(0, len(words), step):
-            chunk_words = words[i : i + self.chunk_size]
-            chunk = " ".join(chunk_words)
-            chunks.append(chunk)
-            if i + self.chunk_size >= len(words):
-                break
-        return chunks
-
-    def ensure_collection(self, collection_name: str, vector_size: int) -> None:
-        """Create a collection if it does not already exist."""
+        """Split a document into overlapping chunks of its original text."""
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    def profile_for_tier(self, tier: Optional[str]) -> CollectionProfile:
+        """The collection profile of a tier, falling back to the ``*`` profile."""
+        return self.tier_profiles.get(tier or "") or self.tier_profiles.get("*") or CollectionProfile()
+
+    def collection_exists(self, collection_name: str) -> bool:
+        """Check the cached collection names, re-listing them only on a miss."""
+        if self._known_collections is not None and collection_name in self._known_collections:
+            return True
+        self._known_collections = {c.name for c in self.client.get_collections().collections}
+        return collection_name in self._known_collections
+
+    def tier_collection_names(self) -> set:
+        """Names of the existing collections that may hold tier documents.
+
+        The store is listed on every call: default ``q_<tier>`` collections
+        created by another process are not in the configuration or this
+        engine's cache, and would otherwise be missed by deletes and moves.
+        Other collections sharing the store are left alone.
+        """
+        existing = {c.name for c in self.client.get_collections().collections}
+        self._known_collections = set(existing)
+        configured = set(self.tier_collections.values()) | self._ensured_collections
+        return {name for name in existing if name in configured or name.startswith("q_")}
+
+    def ensure_collection(self, collection_name: str, vector_size: int, tier: Optional[str] = None) -> bool:
+        """Create a collection if it does not already exist.
+
+        New collections are created with the profile of ``tier`` (quantization,
+        on-disk storage, HNSW settings).  Also makes sure the ``path`` payload
+        field is indexed, which document diffs and deletions filter on.
+
+        An existing collection whose vectors have another size was built with
+        a different embedding model and cannot be searched with this one, so
+        it is dropped and recreated.  Returns True in that case.
+        """
+        if self._collection_sizes.get(collection_name) == vector_size:
+            return False
+        recreated = False
+        if self.collection_exists(collection_name):
+            stored_size = self._vector_size(collection_name)
+            if stored_size is not None and stored_size != vector_size:
+                logger.warning(
+                    f"Collection {collection_name} holds {stored_size}-d vectors but the embedding model "
+                    f"gives {vector_size}-d; recreating it, re-ingest its files"
+                )
+                self.client.delete_collection(collection_name)
+                if self.lexical is not None:
+                    self.lexical.clear(collection_name)
+                self._known_collections.discard(collection_name)
+                recreated = True
+        if not self.collection_exists(collection_name):
+            profile = self.profile_for_tier(tier)
+            self.client.create_collection(
+                collection_name=collection_name,
+                vectors_config=profile.vectors_config(vector_size),
+                hnsw_config=profile.hnsw_config(),
+                quantization_config=profile.quantization_config(),
+                on_disk_payload=profile.on_disk_payload or None,
+            )
+            self._known_collections.add(collection_name)
+        self.client.create_payload_index(
+            collection_name=collection_name,
+            field_name="path",
+            field_schema=qmodels.PayloadSchemaType.KEYWORD,
+        )
+        self._ensured_collections.add(collection_name)
+        self._collection_sizes[collection_name] = vector_size
+        return recreated
+
+    def _vector_size(self, collection_name: str) -> Optional[int]:
+        vectors = self.client.get_collection(collection_name).config.params.vectors
+        return getattr(vectors, "size", None)
+
+    def collection_for_tier(self, tier: str) -> str:
+        return self.tier_collections.get(tier, f"q_{tier.lower()}")
+
+    @staticmethod
+    def point_id(path: str, chunk: str, occurrence: int = 0, embedding_key: str = "") -> str:
+        """Content-addressed id of a chunk.
+
+        Derived from the file path and the chunk's hash, so re-ingesting an
+        unchanged chunk maps onto the same point.  ``occurrence`` tells apart
+        identical chunks within one file.  ``embedding_key`` (see
+        :meth:`embedding_key`) makes a change of embedding model give every
+        chunk a new id, so re-ingestion re-embeds it and deletes the point
+        holding the old model's vector.
+        """
+        digest = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+        return str(uuid.uuid5(POINT_NAMESPACE, f"{path}\0{digest}\0{occurrence}\0{embedding_key}"))
+
+    def _path_filter(self, path: str) -> qmodels.Filter:
+        return qmodels.Filter(must=[qmodels.FieldCondition(key="path", match=qmodels.MatchValue(value=path))])
+
+    def _scroll_path(self, collection: str, path: str, with_payload: Any = True, with_vectors: bool = False) -> Iterator[Any]:
+        """Yield all points of a file in a collection (none if it does not exist)."""
+        return self._scroll_filter(collection, self._path_filter(path), with_payload, with_vectors)
+
+    def _scroll_filter(
+        self, collection: str, scroll_filter: qmodels.Filter, with_payload: Any = True, with_vectors: bool = False
+    ) -> Iterator[Any]:
+        """Yield all points of a collection matching a filter (none if it does not exist)."""
+        offset = None
         try:
-            self._client.get_collection(collection_name)
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=collection,
+                    scroll_filter=scroll_filter,
+                    limit=256,
+                    offset=offset,
+                    with_payload=with_payload,
+                    with_vectors=with_vectors,
+                )
+                yield from points
+                if offset is None:
+                    return
         except Exception:
-            # Use default configuration: HNSW + cosine distance
-            self._client.create_collection(
-                collection_name=collection_name,
-                vectors_config=qmodels.VectorParams(size=vector_size, distance=qmodels.Distance.COSINE),
+            # The collection does not exist yet
+            return
+
+    def stored_points(self, collection: str, path: str) -> Dict[str, Dict[str, Any]]:
+        """Return ``{point_id: payload}`` of the points stored for a file."""
+        if not self.collection_exists(collection):
+            return {}
+        return {
+            str(point.id): point.payload or {}
+            for point in self._scroll_path(collection, path, with_payload=["chunk_index", "tier", "metadata", "start", "end"])
+        }
+
+    def _stored_elsewhere(self, docs: List[PreparedDocument]) -> Dict[str, set]:
+        """Map each collection to the paths of ``docs`` it holds that belong to another tier.
+
+        One scroll per collection covers the whole batch, instead of a
+        filtered delete in every collection for every document.
+        """
+        own = {doc.path: doc.collection for doc in docs}
+        found: Dict[str, set] = {}
+        for collection in self.tier_collection_names():
+            candidates = [path for path, target in own.items() if target != collection]
+            if not candidates:
+                continue
+            scroll_filter = qmodels.Filter(
+                must=[qmodels.FieldCondition(key="path", match=qmodels.MatchAny(any=candidates))]
             )
+            for point in self._scroll_filter(collection, scroll_filter, with_payload=["path"]):
+                found.setdefault(collection, set()).add((point.payload or {}).get("path"))
+        return found
+
+    def prepare_document(self, path: Path) -> PreparedDocument:
+        """Load, classify and split a file without touching Qdrant."""
+        body, meta = self.load_document(path)
+        tier = determine_tier_for_file(path, self.folder_tiers)
+        spans = self.split_spans(body)
+        return PreparedDocument(
+            path=str(path),
+            tier=tier,
+            collection=self.collection_for_tier(tier),
+            metadata=meta,
+            chunks=[body[start:end] for start, end in spans],
+            spans=spans,
+        )
+
+    def upsert_prepared(self, doc: PreparedDocument) -> Dict[str, int]:
+        """Bring the stored points of a document in line with its chunks.
+
+        Only chunks whose content is new are embedded and upserted; points of
+        chunks that disappeared are deleted, and unchanged chunks only get
+        their payload refreshed if their position or metadata moved.  Points
+        left in other tiers' collections (the file was reclassified) are
+        removed; only files with no points in their own tier's collection are
+        looked up there.  Returns counts of added, removed and unchanged chunks.
+        """
+        return self.upsert_prepared_batch([doc])[0]
 
-    def upsert_document(self, path: Path) -> None:
-        """Ingest a single file into the appropriate tier collection."""
+    def upsert_prepared_batch(
+        self,
+        docs: List[PreparedDocument],
+        embed_batch_size: int = 256,
+        upsert_batch_size: int = 512,
+    ) -> List[Dict[str, int]]:
+        """Apply :meth:`upsert_prepared` to many documents at once.
+
+        New chunks of all documents are embedded together in batches of
+        ``embed_batch_size`` and written with one upsert per
+        ``upsert_batch_size`` points per collection, which is much faster
+        than embedding and writing file by file.  Returns the per-document
+        counts in the order of ``docs``.
+        """
+        plans = []
+        pending: List[Tuple[PreparedDocument, int, str]] = []
+        embedding_key = self.embedding_key()
+        for doc in docs:
+            ids: List[str] = []
+            seen: Dict[str, int] = {}
+            for chunk in doc.chunks:
+                occurrence = seen.get(chunk, 0)
+                seen[chunk] = occurrence + 1
+                ids.append(self.point_id(doc.path, chunk, occurrence, embedding_key))
+
+            stored = self.stored_points(doc.collection, doc.path)
+            new_indices = [idx for idx, point_id in enumerate(ids) if point_id not in stored]
+            current = set(ids)
+            stale = [point_id for point_id in stored if point_id not in current]
+            pending.extend((doc, idx, ids[idx]) for idx in new_indices)
+            plans.append((doc, ids, stored, stale, len(new_indices)))
+
+        # A file already stored in its tier's collection has not changed tier
+        # since it was ingested, so only new arrivals can have points elsewhere
+        for collection, paths in self._stored_elsewhere([doc for doc, _, stored, _, _ in plans if not stored]).items():
+            for path in paths:
+                self._remove_from_collection(collection, path)
+
+        points_by_collection: Dict[str, List[qmodels.PointStruct]] = {}
+        # Collections dropped for a vector size change no longer hold the stored points
+        recreated = set()
+        for start in range(0, len(pending), embed_batch_size):
+            batch = pending[start : start + embed_batch_size]
+            vectors = self.embedder().encode(
+                [doc.chunks[idx] for doc, idx, _ in batch], batch_size=embed_batch_size
+            ).tolist()
+            for (doc, idx, point_id), vector in zip(batch, vectors):
+                if self.ensure_collection(doc.collection, len(vector), doc.tier):
+                    recreated.add(doc.collection)
+                points_by_collection.setdefault(doc.collection, []).append(
+                    qmodels.PointStruct(id=point_id, vector=vector, payload={**doc.payload(idx), "embedding": embedding_key})
+                )
+        for collection, points in points_by_collection.items():
+            for start in range(0, len(points), upsert_batch_size):
+                self.client.upsert(collection_name=collection, points=points[start : start + upsert_batch_size])
+            if self.lexical is not None:
+                self.lexical.add(collection, ((str(p.id), p.payload["path"], p.payload["text"]) for p in points))
+
+        results = []
+        for doc, ids, stored, stale, added in plans:
+            if doc.collection in recreated:
+                results.append({"added": added, "removed": len(stale), "unchanged": len(ids) - added})
+                continue
+            updates = []
+            for idx, point_id in enumerate(ids):
+                payload = doc.position(idx)
+                old = stored.get(point_id)
+                if old is not None and any(old.get(key) != value for key, value in payload.items()):
+                    updates.append(qmodels.SetPayloadOperation(
+                        set_payload=qmodels.SetPayload(payload=payload, points=[point_id])
+                    ))
+            if updates:
+                self.client.batch_update_points(collection_name=doc.collection, update_operations=updates)
+
+            if stale:
+                self.client.delete(collection_name=doc.collection, points_selector=qmodels.PointIdsList(points=stale))
+                if self.lexical is not None:
+                    self.lexical.delete(doc.collection, stale)
+
+            results.append({"added": added, "removed": len(stale), "unchanged": len(ids) - added})
+        return results
+
+    def upsert_document(self, path: Path) -> Dict[str, int]:
+        """Ingest a single file into the appropriate tier collection.
+
+        Re-ingesting a file is idempotent: only changed chunks are embedded and
+        written, and chunks that no longer exist are deleted.
+        """
         try:
             logger.info(f"Starting ingestion of document: {path}")
-            body, meta = self.load_document(path)
-            tier = determine_tier_for_file(path, self.folder_tiers)
-            collection = self.tier_collections.get(tier, f"q_{tier.lower()}")
-
-            # Split into chunks and embed
-            chunks = self.split_text(body)
-            if not chunks:
+            doc = self.prepare_document(path)
+            if not doc.chunks:
                 logger.warning(f"No chunks generated for document: {path}")
-                return
-            
-            logger.info(f"Generated {len(chunks)} chunks for document: {path}")
-            embeddings = self.embedder().encode(chunks).tolist()
-            
-            # Ensure collection exists
-            self.ensure_collection(collection, len(embeddings[0]))
-            
-            points: List[qmodels.PointStruct] = []
-            for idx, vector in enumerate(embeddings):
-                payload = {
-                    "path": str(path),
-                    "tier": tier,
-                    "metadata": meta,
-                    "chunk_index": idx,
-                }
-                points.append(
-                    qmodels.PointStruct(
-                        id=str(uuid.uuid4()),
-                        vector=vector,
-                        payload=payload,
-                    )
-                )
-            
-            # Upsert points
-            self._client.upsert(collection_name=collection, points=points)
-            logger.info(f"Successfully ingested document: {path} into collection: {collection}")
-            
+            stats = self.upsert_prepared(doc)
+            logger.info(
+                f"Ingested document: {path} into collection: {doc.collection} "
+                f"({stats['added']} added, {stats['removed']} removed, {stats['unchanged']} unchanged)"
+            )
+            return stats
         except Exception as e:
             logger.error(f"Failed to ingest document {path}: {str(e)}")
             raise
 
+    def remove_document(self, path: str, exclude: Iterable[str] = ()) -> None:
+        """Delete all points of a file from every tier collection."""
+        for collection in self.tier_collection_names() - set(exclude):
+            self._remove_from_collection(collection, str(path))
+
+    def collections_holding(self, path: str) -> List[str]:
+        """Tier collections that still hold points of a file.
+
+        Store errors propagate instead of reading as "no points", so callers
+        can use this to confirm a removal before forgetting the file.
+        """
+        return [
+            collection
+            for collection in sorted(self.tier_collection_names())
+            if self.client.scroll(
+                collection_name=collection,
+                scroll_filter=self._path_filter(str(path)),
+                limit=1,
+                with_payload=False,
+                with_vectors=False,
+            )[0]
+        ]
+
+    def _remove_from_collection(self, collection: str, path: str) -> None:
+        if self.lexical is not None:
+            self.lexical.remove_path(collection, path)
+        try:
+            self.client.delete(
+                collection_name=collection,
+                points_selector=qmodels.FilterSelector(filter=self._path_filter(path)),
+            )
+        except Exception:
+            # Collection does not exist
+            pass
+
+    def relocate_document(self, src: str, dest: str) -> int:
+        """Move the points of a renamed file to its new path without re-embedding.
+
+        Points are re-keyed to the new path (and moved to the new tier's
+        collection if the file changed tier) with their vectors reused.
+        Points without stored chunk text, or embedded with a model other than
+        the current one, cannot be re-keyed and are dropped; re-ingesting the
+        destination restores them.  Returns the number of
+        points moved.
+        """
+        tier = determine_tier_for_file(Path(dest), self.folder_tiers)
+        target = self.collection_for_tier(tier)
+        embedding_key = self.embedding_key()
+        moved = 0
+        for collection in self.tier_collection_names():
+            points = sorted(
+                self._scroll_path(collection, src, with_vectors=True),
+                key=lambda point: (point.payload or {}).get("chunk_index", 0),
+            )
+            if not points:
+                continue
+            seen: Dict[str, int] = {}
+            relocated = []
+            for point in points:
+                payload = dict(point.payload or {})
+                text = payload.get("text")
+                if text is None or payload.get("embedding") != embedding_key:
+                    continue
+                occurrence = seen.get(text, 0)
+                seen[text] = occurrence + 1
+                payload.update(path=dest, tier=tier)
+                relocated.append(qmodels.PointStruct(
+                    id=self.point_id(dest, text, occurrence, embedding_key), vector=point.vector, payload=payload
+                ))
+            if relocated:
+                self.ensure_collection(target, len(relocated[0].vector), tier)
+                for start in range(0, len(relocated), 512):
+                    self.client.upsert(collection_name=target, points=relocated[start : start + 512])
+            self.client.delete(
+                collection_name=collection,
+                points_selector=qmodels.FilterSelector(filter=self._path_filter(src)),
+            )
+            if self.lexical is not None:
+                self.lexical.remove_path(collection, src)
+                self.lexical.add(target, ((str(p.id), dest, p.payload["text"]) for p in relocated))
+            moved += len(relocated)
+        logger.info(f"Relocated {moved} points from {src} to {dest}")
+        return moved
+
+    def rebuild_lexical_index(self, tier: str) -> int:
+        """Re-index a tier's stored chunks in the BM25 index from its collection.
+
+        Needed for collections ingested before the lexical index existed (or
+        with it disabled), since ingestion skips unchanged files.  Returns
+        the number of chunks indexed.
+        """
+        collection = self.collection_for_tier(tier)
+        if self.lexical is None or not self.collection_exists(collection):
+            return 0
+        self.lexical.clear(collection)
+        indexed = 0
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=collection, limit=1024, offset=offset, with_payload=["path", "text"]
+            )
+            indexed += self.lexical.add(collection, (
+                (str(point.id), point.payload["path"], point.payload["text"])
+                for point in points
+                if point.payload and point.payload.get("text") is not None
+            ))
+            if offset is None:
+                return indexed
+
+    def _legacy_chunk_text(self, payload: Dict[str, str]) -> str:
+        """Rebuild the text of a point ingested before chunk text was stored.
+
+        This re-reads and re-splits the source file, which is slow and returns
+        the wrong chunk if the file changed since ingestion.  Re-ingest the
+        collection to avoid it.
+        """
+        path = Path(payload.get("path", ""))
+        logger.warning(f"Point for {path} has no stored chunk text; re-reading the file. Re-ingest to fix.")
+        try:
+            text, _ = self.load_document(path)
+            return self.split_text(text)[int(payload.get("chunk_index", 0))]
+        except Exception:
+            return ""
+
+    def _hit(self, payload: Optional[Dict[str, Any]], score: float) -> Tuple[str, float, Dict[str, str]]:
+        payload = dict(payload or {})
+        chunk = payload.pop("text", None)
+        if chunk is None:
+            chunk = self._legacy_chunk_text(payload)
+        return chunk, score, payload
+
+    def _search_timeout(self) -> int:
+        # Qdrant takes whole seconds; the server stops a search that outlives the caller's wait
+        return max(1, math.ceil(self.tier_search_timeout))
+
+    def _is_hybrid(self, tier: str) -> bool:
+        return self.lexical is not None and self.profile_for_tier(tier).lexical_weight > 0
+
+    def _search_tier(self, tier: str, question: str, q_emb: List[float]) -> List[Tuple[str, float, Dict[str, str]]]:
+        """Search one tier's collection; results are ordered by descending score.
+
+        With a lexical weight in the tier's profile, the top
+        `HYBRID_CANDIDATES` of the dense search and of the BM25 index are
+        fused by weighted reciprocal rank: a chunk scores
+        ``weight / (HYBRID_RRF_K + rank)`` summed over both rankings, divided
+        by the score of a chunk ranked first in both, so it lies in [0, 1].
+        Otherwise the score is the cosine similarity.
+        """
+        collection = self.collection_for_tier(tier)
+        profile = self.profile_for_tier(tier)
+        search_params = profile.search_params()
+        if not self._is_hybrid(tier):
+            return [
+                self._hit(res.payload, res.score)
+                for res in self.client.search(
+                    collection, q_emb, limit=self.top_k, search_params=search_params, timeout=self._search_timeout()
+                )
+            ]
+
+        candidates = max(self.top_k, self.hybrid_candidates)
+        dense = []
+        if profile.vector_weight > 0:
+            dense = self.client.search(
+                collection, q_emb, limit=candidates, search_params=search_params, timeout=self._search_timeout()
+            )
+        lexical = self.lexical.search(collection, question, candidates)
+
+        scores: Dict[str, float] = {}
+        for weight, ranking in ((profile.vector_weight, [str(res.id) for res in dense]),
+                                (profile.lexical_weight, [point_id for point_id, _ in lexical])):
+            for rank, point_id in enumerate(ranking, start=1):
+                scores[point_id] = scores.get(point_id, 0.0) + weight / (self.hybrid_rrf_k + rank)
+        best = (max(profile.vector_weight, 0.0) + profile.lexical_weight) / (self.hybrid_rrf_k + 1)
+        top = [
+            (point_id, score / best)
+            for point_id, score in heapq.nlargest(self.top_k, scores.items(), key=lambda item: item[1])
+        ]
+
+        payloads = {str(res.id): res.payload for res in dense}
+        missing = [point_id for point_id, _ in top if point_id not in payloads]
+        if missing:
+            for point in self.client.retrieve(collection, ids=missing, with_payload=True):
+                payloads[str(point.id)] = point.payload
+        # Points in the lexical index but gone from the collection are skipped
+        return [self._hit(payloads[point_id], score) for point_id, score in top if point_id in payloads]
+
     def query(self, question: str, tiers: List[str]) -> List[Tuple[str, float, Dict[str, str]]]:
         """Search for relevant chunks across multiple tiers.
 
         Returns a list of tuples `(text, score, payload)`.  The text is the chunk
-        content, score is the similarity score (the higher the better), and
+        content, score is the relevance score (the higher the better: cosine
+        similarity, or for hybrid tiers the normalised fused rank score), and
         payload contains metadata such as the original file path and tier.
+        Chunk text is read from the point payload, so a query does no file I/O.
+
+        Each tier fuses dense and BM25 results as configured by its profile
+        (see `_search_tier`), so exact terms such as acronyms and ids are
+        found even when the embedding misses them.
+
+        Tiers are searched in parallel, so latency is that of the slowest
+        collection rather than the sum.  A tier that fails or does not answer
+        within `TIER_SEARCH_TIMEOUT` seconds is logged and contributes no
+        results.  Its search is abandoned, not cancelled: the Qdrant server
+        stops it at the same timeout, but an embedded store or the lexical
+        index finishes it on its search thread.
         """
         # Embed the question
-        q_emb = self.embedder().encode([question]).tolist()[0]
-        results: List[Tuple[str, float, Dict[str, str]]] = []
-        for tier in tiers:
-            collection = self.tier_collections.get(tier, f"q_{tier.lower()}")
+        q_emb = self.embed_query(question)
+        futures = {
+            self._search_pool.submit(self._search_tier, tier, question, q_emb): tier
+            for tier in dict.fromkeys(tiers)
+        }
+        done, not_done = wait(futures, timeout=self.tier_search_timeout)
+        for future in not_done:
+            future.cancel()
+            logger.warning(
+                f"Search of tier {futures[future]} timed out after {self.tier_search_timeout}s; "
+                "abandoning it (it keeps its search thread until it finishes)"
+            )
+
+        per_tier: List[List[Tuple[str, float, Dict[str, str]]]] = []
+        hybrid = set()
+        for future in done:
             try:
-                search_res = self._client.search(collection, q_emb, limit=self.top_k)
-            except Exception:
+                per_tier.append(future.result())
+            except Exception as e:
+                logger.warning(f"Search of tier {futures[future]} failed: {e}")
                 continue
-            for res in search_res:
-                payload = res.payload or {}
-                # We need to fetch the actual chunk text.  Qdrant stores only the
-                # embedding and payload; to reconstruct the text we must read
-                # the document and split again.  For MVP we include the chunk
-                # index in the payload and re‑compute the split.
-                path = Path(payload.get("path", ""))
-                idx = payload.get("chunk_index", 0)
-                try:
-                    text, _ = self.load_document(path)
-                    chunk = self.split_text(text)[idx]
-                except Exception:
-                    chunk = ""
-                results.append((chunk, res.score, payload))
-        # Sort results by descending score
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results
\ No newline at end of file
+            hybrid.add(self._is_hybrid(futures[future]))
+        if len(hybrid) > 1:
+            # Cosine and fused rank scores are not comparable: interleave by rank within each tier
+            ranked = [(rank, -hit[1], hit) for hits in per_tier for rank, hit in enumerate(hits)]
+            return [hit for _, _, hit in sorted(ranked, key=lambda item: item[:2])]
+        # Each tier's hits are already sorted, so a k-way merge is enough
+        return list(heapq.merge(*per_tier, key=lambda x: x[1], reverse=True))
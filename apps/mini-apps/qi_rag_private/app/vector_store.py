@@ -0,0 +1,85 @@
+"""Vector store backends.
+
+`RagEngine` talks to its vector store through the small subset of the
+`QdrantClient` API described by `VectorClient`.  The backend is selected with
+`VECTOR_BACKEND`:
+
+    qdrant   a Qdrant server at QDRANT_HOST:QDRANT_PORT (default)
+    local    embedded Qdrant storing collections under QDRANT_PATH; runs
+             in-process, so no server is needed (one process per path)
+    memory   embedded Qdrant without persistence, for tests and benchmarks
+    <module>:<factory>
+             any other implementation, created by calling the factory
+
+Tier collections, payloads and filters are the same for every backend.
+"""
+
+from __future__ import annotations
+
+import functools
+import importlib
+import os
+import threading
+from typing import Any, Optional, Protocol
+
+from qdrant_client import QdrantClient
+
+
+class VectorClient(Protocol):
+    """The operations `RagEngine` needs from a vector store."""
+
+    def get_collections(self) -> Any: ...
+    def get_collection(self, collection_name: str) -> Any: ...
+    def delete_collection(self, collection_name: str) -> Any: ...
+    def create_collection(self, collection_name: str, vectors_config: Any, **kwargs: Any) -> Any: ...
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema: Any) -> Any: ...
+    def upsert(self, collection_name: str, points: Any) -> Any: ...
+    def batch_update_points(self, collection_name: str, update_operations: Any) -> Any: ...
+    def delete(self, collection_name: str, points_selector: Any) -> Any: ...
+    def scroll(self, collection_name: str, **kwargs: Any) -> Any: ...
+    def search(self, collection_name: str, query_vector: Any, **kwargs: Any) -> Any: ...
+    def retrieve(self, collection_name: str, ids: Any, **kwargs: Any) -> Any: ...
+
+
+class SerializedClient:
+    """Proxy that serialises calls to a client that is not thread-safe.
+
+    The embedded Qdrant keeps its state in plain Python objects, while the
+    engine calls it from tier search, ingestion and API threads.
+    """
+
+    def __init__(self, client: Any) -> None:
+        self._client = client
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args: Any, **kwargs: Any) -> Any:
+            with self._lock:
+                return attr(*args, **kwargs)
+
+        return call
+
+
+def create_vector_client(backend: Optional[str] = None, host: Optional[str] = None, port: Optional[int] = None) -> VectorClient:
+    """Create the vector store selected by ``backend`` or ``VECTOR_BACKEND``."""
+    backend = backend or os.getenv("VECTOR_BACKEND", "qdrant")
+    if backend == "qdrant":
+        return QdrantClient(
+            host=host or os.getenv("QDRANT_HOST", "localhost"),
+            port=port or int(os.getenv("QDRANT_PORT", "6333")),
+        )
+    if backend == "local":
+        path = os.getenv("QDRANT_PATH", "./qdrant_storage")
+        os.makedirs(path, exist_ok=True)
+        return SerializedClient(QdrantClient(path=path, force_disable_check_same_thread=True))
+    if backend == "memory":
+        return SerializedClient(QdrantClient(location=":memory:"))
+    if ":" in backend:
+        module_name, _, factory = backend.partition(":")
+        return getattr(importlib.import_module(module_name), factory)()
+    raise ValueError(f"Unsupported VECTOR_BACKEND: {backend}")
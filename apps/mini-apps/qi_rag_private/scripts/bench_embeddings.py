@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""Compare embedding backends for throughput and agreement.
+
+Usage:
+    python scripts/bench_embeddings.py [--backends sentence-transformers,onnx,onnx-int8]
+                                       [--texts 2000] [--texts-from path/to/folder]
+
+Every backend embeds the same texts (synthetic chunks, or chunks of the files
+under ``--texts-from``) at ``--batch-size``.  The first backend is the
+reference: for the others the report gives the cosine similarity of each
+embedding to the reference one and how many of the reference's top-k
+neighbours they retrieve, so the speed-up of the ONNX and int8 backends can be
+weighed against how much they change retrieval.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+# The benchmark harness lives in the repository-level ``shared`` package
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from app.onnx_embedding import OnnxEmbedder, default_model_dir
+from app.providers import create_embedder
+from app.rag import RagEngine
+from shared.benchmarking import Stopwatch, SyntheticCorpus, compare_reports, memory_snapshot, write_report
+
+
+def load_backend(name: str, model: str) -> Any:
+    if name == "onnx":
+        return OnnxEmbedder(default_model_dir(model), quantized=False)
+    if name == "onnx-int8":
+        return OnnxEmbedder(default_model_dir(model), quantized=True)
+    return create_embedder(model, provider=name)
+
+
+def load_texts(args: argparse.Namespace) -> List[str]:
+    if args.texts_from:
+        engine = RagEngine()
+        texts: List[str] = []
+        for path in sorted(args.texts_from.rglob("*")):
+            if path.is_file():
+                texts.extend(engine.split_text(engine.load_document(path)[0]))
+            if len(texts) >= args.texts:
+                break
+        return texts[: args.texts]
+    corpus = SyntheticCorpus(n_chunks=args.texts, seed=args.seed)
+    return [text for _, chunks in corpus.iter_documents() for text in chunks]
+
+
+def neighbour_agreement(reference: np.ndarray, candidate: np.ndarray, queries: int, k: int) -> float:
+    """Mean share of the reference top-k neighbours also in the candidate's top-k."""
+    queries = min(queries, len(reference))
+    ref_top = np.argsort(-(reference[:queries] @ reference.T), axis=1)[:, 1 : k + 1]
+    cand_top = np.argsort(-(candidate[:queries] @ candidate.T), axis=1)[:, 1 : k + 1]
+    return float(np.mean([len(set(r) & set(c)) / k for r, c in zip(ref_top, cand_top)]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare embedding backends.")
+    parser.add_argument("--backends", type=lambda v: v.split(","), default=["sentence-transformers", "onnx", "onnx-int8"])
+    parser.add_argument("--model", default=RagEngine().embedding_model_name)
+    parser.add_argument("--texts", type=int, default=2000, help="Number of texts to embed")
+    parser.add_argument("--texts-from", type=Path, help="Embed chunks of these files instead of synthetic text")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10, help="Neighbours compared for retrieval agreement")
+    parser.add_argument("--queries", type=int, default=200, help="Texts used as queries for retrieval agreement")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Report path (default: bench_results/<name>-<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    texts = load_texts(args)
+    print(f"Embedding {len(texts)} texts with {', '.join(args.backends)}")
+    results: List[Dict[str, Any]] = []
+    reference = None
+    for name in args.backends:
+        with Stopwatch() as load:
+            backend = load_backend(name, args.model)
+        backend.encode(texts[: args.batch_size], batch_size=args.batch_size)
+        with Stopwatch() as run:
+            vectors = np.asarray(backend.encode(texts, batch_size=args.batch_size), dtype=np.float32)
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+        result: Dict[str, Any] = {
+            "backend": name,
+            "load_seconds": load.elapsed,
+            "texts_per_second": len(texts) / run.elapsed if run.elapsed else None,
+            "memory": memory_snapshot(),
+        }
+        if reference is None:
+            reference = vectors
+        else:
+            cosine = np.sum(reference * vectors, axis=1)
+            result["agreement"] = {
+                "cosine_mean": float(cosine.mean()),
+                "cosine_p5": float(np.percentile(cosine, 5)),
+                "cosine_min": float(cosine.min()),
+                f"top{args.k}_overlap": neighbour_agreement(reference, vectors, args.queries, args.k),
+            }
+        results.append(result)
+
+    config = {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items() if key not in {"output", "compare"}}
+    output = write_report("qi_rag_private-embeddings", config, results, args.output)
+
+    baseline = results[0]["texts_per_second"]
+    for result in results:
+        line = f"{result['backend']:>22} | {result['texts_per_second']:.1f} texts/s ({result['texts_per_second'] / baseline:.2f}x)"
+        if "agreement" in result:
+            line += " | " + " ".join(f"{key}={value:.4f}" for key, value in result["agreement"].items())
+        print(line)
+    print(f"Report written to {output}")
+
+    if args.compare:
+        print(f"Compared with {args.compare}:")
+        for line in compare_reports(json.loads(args.compare.read_text()), json.loads(output.read_text())):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
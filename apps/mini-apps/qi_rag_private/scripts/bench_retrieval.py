@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+"""Benchmark ingestion and retrieval of the private RAG engine.
+
+Usage:
+    python scripts/bench_retrieval.py [--sizes 1k,100k,1M] [--queries 200] [--output report.json]
+
+For each corpus size a synthetic corpus is written to a temporary folder,
+ingested through ``RagEngine.upsert_document`` and queried through
+``RagEngine.query``.  Embeddings come from a deterministic hashing embedder
+and Qdrant runs in-process (``:memory:``) unless ``--qdrant server`` is given,
+so no model download or network access is needed.  The BM25 index is kept
+in memory and fused with weight ``--lexical-weight`` (0 measures dense search
+alone).  The report contains
+ingest throughput, p50/p95/p99 query latency, memory use and recall@k, and
+can be compared with an earlier run through ``--compare``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, List
+
+# The benchmark harness lives in the repository-level ``shared`` package
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from app.lexical import LexicalIndex
+from app.rag import RagEngine
+from app.vector_store import create_vector_client
+from shared.benchmarking import (
+    HashingEmbedder,
+    Stopwatch,
+    SyntheticCorpus,
+    compare_reports,
+    latency_summary,
+    memory_snapshot,
+    parse_sizes,
+    recall_at_k,
+    write_report,
+)
+
+TIER = "UNCLASS"
+
+
+def write_corpus(corpus: SyntheticCorpus, folder: Path) -> List[Path]:
+    paths = []
+    for doc_id, chunks in corpus.iter_documents():
+        path = folder / f"doc_{doc_id:07d}.txt"
+        path.write_text(" ".join(chunks), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def build_engine(args: argparse.Namespace, corpus: SyntheticCorpus) -> RagEngine:
+    engine = RagEngine()
+    # Chunk boundaries must line up with the synthetic chunks for recall@k
+    engine.chunk_size = corpus.words_per_chunk
+    engine.chunk_overlap = 0
+    engine.top_k = max(args.k)
+    engine._embedder = HashingEmbedder(dim=args.dim)
+    engine.lexical = LexicalIndex(":memory:")
+    engine.tier_profiles = {**engine.tier_profiles, TIER: replace(engine.profile_for_tier(TIER), lexical_weight=args.lexical_weight)}
+    if args.qdrant == "memory":
+        engine.client = create_vector_client("memory")
+    else:
+        collection = engine.collection_for_tier(TIER)
+        engine.client.delete_collection(collection)
+    return engine
+
+
+def run_size(args: argparse.Namespace, n_chunks: int) -> Dict:
+    corpus = SyntheticCorpus(
+        n_chunks=n_chunks,
+        chunks_per_doc=args.chunks_per_doc,
+        words_per_chunk=args.words_per_chunk,
+        seed=args.seed,
+    )
+    print(f"[{n_chunks} chunks] generating {corpus.n_documents} documents")
+    memory_before = memory_snapshot()
+    with tempfile.TemporaryDirectory(prefix="qi_rag_bench_") as tmp:
+        paths = write_corpus(corpus, Path(tmp))
+        engine = build_engine(args, corpus)
+
+        with Stopwatch() as ingest:
+            for path in paths:
+                engine.upsert_document(path)
+        print(f"[{n_chunks} chunks] ingested in {ingest.elapsed:.1f}s")
+        memory_after_ingest = memory_snapshot()
+
+        latencies: List[float] = []
+        ranked: List[List[int]] = []
+        expected: List[int] = []
+        for question, chunk_id in corpus.queries(args.queries):
+            with Stopwatch() as query:
+                hits = engine.query(question, [TIER])
+            latencies.append(query.elapsed)
+            ids = []
+            for _, _, payload in hits:
+                doc_id = int(Path(payload.get("path", "doc_0")).stem.split("_")[-1])
+                ids.append(doc_id * corpus.chunks_per_doc + int(payload.get("chunk_index", 0)))
+            ranked.append(ids)
+            expected.append(chunk_id)
+
+    return {
+        "chunks": n_chunks,
+        "documents": corpus.n_documents,
+        "ingest": {
+            "seconds": ingest.elapsed,
+            "chunks_per_second": n_chunks / ingest.elapsed if ingest.elapsed else None,
+        },
+        "query_latency": latency_summary(latencies),
+        "quality": recall_at_k(ranked, expected, args.k),
+        "memory": {"before": memory_before, "after_ingest": memory_after_ingest, "after_queries": memory_snapshot()},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark RagEngine ingestion and retrieval.")
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes("1k"), help="Corpus sizes in chunks, e.g. 1k,100k,1M")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries per corpus size")
+    parser.add_argument("--k", type=lambda v: [int(k) for k in v.split(",")], default=[1, 5], help="Cut-offs for recall@k")
+    parser.add_argument("--chunks-per-doc", type=int, default=10)
+    parser.add_argument("--words-per-chunk", type=int, default=48)
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lexical-weight", type=float, default=1.0, help="Weight of BM25 results in the fused ranking (0 disables)")
+    parser.add_argument("--qdrant", choices=["memory", "server"], default="memory", help="In-process Qdrant or QDRANT_HOST/QDRANT_PORT")
+    parser.add_argument("--output", type=Path, help="Report path (default: bench_results/<name>-<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    results = [run_size(args, n_chunks) for n_chunks in args.sizes]
+    config = {key: value for key, value in vars(args).items() if key not in {"output", "compare"}}
+    output = write_report("qi_rag_private-retrieval", config, results, args.output)
+
+    for result in results:
+        latency = result["query_latency"]
+        print(
+            f"{result['chunks']:>9} chunks | ingest {result['ingest']['chunks_per_second']:.0f} chunks/s | "
+            f"p50 {latency['p50_ms']:.1f}ms p95 {latency['p95_ms']:.1f}ms p99 {latency['p99_ms']:.1f}ms | "
+            + " ".join(f"{key}={value:.3f}" for key, value in result["quality"].items())
+        )
+    print(f"Report written to {output}")
+
+    if args.compare:
+        print(f"Compared with {args.compare}:")
+        for line in compare_reports(json.loads(args.compare.read_text()), json.loads(output.read_text())):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""Run the shared embedding model server.
+
+Usage:
+    python scripts/embedding_server.py [--address 127.0.0.1:7997] [--provider sentence-transformers]
+
+Loads the embedding model once, warms it up and serves ``encode`` requests
+from the API, ``scripts/ingest.py`` and ``scripts/watch_folder.py`` when they
+run with ``EMBEDDING_PROVIDER=service``.  Texts arriving within
+``--max-wait-ms`` of each other are encoded in one batch of up to
+``--max-batch`` texts.  ``EMBEDDING_SERVICE_AUTHKEY`` must be set, to the
+same secret as in the clients.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+
+from app.embedding_service import (
+    SERVICE_ADDRESS,
+    SERVICE_MAX_BATCH,
+    SERVICE_MAX_WAIT_MS,
+    EmbeddingServer,
+)
+from app.providers import create_embedder, provider_fingerprint
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve embeddings to local RAG components.")
+    parser.add_argument("--address", default=SERVICE_ADDRESS, help="host:port or Unix socket path")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "bge-small-en-v1.5"))
+    parser.add_argument(
+        "--provider",
+        default=os.getenv("EMBEDDING_SERVICE_PROVIDER", "sentence-transformers"),
+        choices=["sentence-transformers", "onnx", "hashing"],
+        help="Embedder hosted by the server",
+    )
+    parser.add_argument("--max-batch", type=int, default=SERVICE_MAX_BATCH, help="Most texts encoded in one call")
+    parser.add_argument("--max-wait-ms", type=float, default=SERVICE_MAX_WAIT_MS, help="How long to wait for more texts to batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"Loading {args.provider} embedder {args.model}")
+    embedder = create_embedder(args.model, provider=args.provider)
+    server = EmbeddingServer(
+        embedder,
+        provider_fingerprint(args.provider, args.model),
+        address=args.address,
+        max_batch=args.max_batch,
+        max_wait_ms=args.max_wait_ms,
+    )
+    print(f"Serving embeddings on {args.address}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""Export the embedding model to ONNX for ``EMBEDDING_PROVIDER=onnx``.
+
+Usage:
+    python scripts/export_onnx.py [--model bge-small-en-v1.5] [--output ./models/...] [--no-quantize]
+
+Loads ``EMBEDDING_MODEL`` through SentenceTransformer, exports its
+transformer to ``model.onnx`` together with the tokenizer, and by default
+also writes a dynamically int8-quantized ``model.int8.onnx``.  The pooling
+and normalisation of the SentenceTransformer pipeline are recorded so the
+ONNX backend reproduces its embeddings.
+
+Requires ``torch``, ``onnx`` and ``onnxruntime`` in addition to the normal
+requirements.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+from app.onnx_embedding import METADATA_FILE, MODEL_FILE, QUANTIZED_MODEL_FILE, default_model_dir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX.")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "bge-small-en-v1.5"))
+    parser.add_argument("--output", type=Path, help="Output directory (default: ONNX_MODEL_DIR)")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--no-quantize", action="store_true", help="Skip writing the int8-quantized model")
+    args = parser.parse_args()
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output = args.output or default_model_dir(args.model)
+    output.mkdir(parents=True, exist_ok=True)
+
+    st_model = SentenceTransformer(args.model, device="cpu")
+    transformer = st_model[0]
+    pooling = "cls"
+    for module in st_model:
+        if getattr(module, "pooling_mode_mean_tokens", False):
+            pooling = "mean"
+    normalize = any(type(module).__name__ == "Normalize" for module in st_model)
+
+    auto_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+    sample = tokenizer(["an example sentence"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    print(f"Exporting {args.model} ({pooling} pooling, normalize={normalize}) to {output}")
+    with torch.no_grad():
+        torch.onnx.export(
+            auto_model,
+            tuple(sample[name] for name in input_names),
+            str(output / MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=args.opset,
+        )
+    tokenizer.save_pretrained(str(output))
+
+    if not args.no_quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        print("Writing int8-quantized model")
+        quantize_dynamic(str(output / MODEL_FILE), str(output / QUANTIZED_MODEL_FILE), weight_type=QuantType.QInt8)
+    elif (output / QUANTIZED_MODEL_FILE).exists():
+        # A stale quantized model would be preferred over the new export
+        (output / QUANTIZED_MODEL_FILE).unlink()
+
+    metadata = {
+        "model": args.model,
+        "dim": st_model.get_sentence_embedding_dimension(),
+        "pooling": pooling,
+        "normalize": normalize,
+        "max_length": st_model.max_seq_length,
+    }
+    (output / METADATA_FILE).write_text(json.dumps(metadata, indent=2), encoding="utf-8")
+    print(f"Done. Set EMBEDDING_PROVIDER=onnx and ONNX_MODEL_DIR={output}")
+
+
+if __name__ == "__main__":
+    main()
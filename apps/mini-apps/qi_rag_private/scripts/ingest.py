@@ -2,44 +2,235 @@
 """CLI tool to ingest documents from a folder.
 
 Usage:
-    python scripts/ingest.py /path/to/file_or_folder
+    python scripts/ingest.py /path/to/file_or_folder [--force] [--prune] [--rebuild-lexical]
+                             [--workers N] [--batch-chunks N]
+                             [--embed-batch-size N] [--upsert-batch-size N]
 
 The script walks through the provided path.  If a file is given it is ingested
 directly; if a directory is given all files within are ingested recursively.
 
+Files are parsed and split on a pool of ``--workers`` processes (PDF
+extraction and front-matter parsing are CPU bound).  Parsed files are
+gathered until they hold ``--batch-chunks`` chunks, whose new chunks are then
+embedded in batches of ``--embed-batch-size`` and written to Qdrant in
+batches of ``--upsert-batch-size`` points.  Progress and throughput are
+printed as files complete.
+
+Ingested files are recorded in a local manifest (``INGEST_MANIFEST``, default
+``./ingest_manifest.sqlite3``).  Files whose size and modification time match
+the manifest are skipped without being read, and files that were only touched
+are skipped after a content hash check, so re-syncing a large unchanged tree
+is quick.  ``--force`` re-ingests everything and ``--prune`` removes files
+from the index that were deleted from the given folders.
+
+New chunks are also added to the BM25 lexical index used by hybrid search.
+``--rebuild-lexical`` re-indexes every tier from the chunks already stored
+in Qdrant, for collections ingested before the lexical index was enabled.
+
 The ingestion honours classification tiers defined in your environment.
 """
 
 from __future__ import annotations
 
 import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.manifest import DEFAULT_MANIFEST_PATH, IngestManifest, ManifestEntry, settings_fingerprint
+from app.rag import PreparedDocument, RagEngine
+
+# Engine of a parse worker process, created by _init_worker
+_worker_engine: Optional[RagEngine] = None
+
 
-from app.rag import RagEngine
+def _init_worker() -> None:
+    global _worker_engine
+    _worker_engine = RagEngine()
 
 
-def ingest_path(engine: RagEngine, path: Path) -> None:
+def _prepare(path: Path) -> Tuple[Path, Optional[PreparedDocument], Optional[str]]:
+    """Parse and split one file in a worker; errors are returned, not raised."""
+    try:
+        return path, _worker_engine.prepare_document(path), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def iter_files(path: Path) -> Iterator[Path]:
     if path.is_dir():
         for item in path.rglob("*"):
             if item.is_file():
-                print(f"Ingesting {item}")
-                engine.upsert_document(item)
+                yield item
     elif path.is_file():
-        print(f"Ingesting {path}")
-        engine.upsert_document(path)
+        yield path
     else:
         print(f"Skipping unknown path: {path}")
 
 
+def changed_files(manifest: IngestManifest, paths: List[Path], force: bool, stats: Dict[str, int]) -> List[Tuple[Path, ManifestEntry]]:
+    """Files under ``paths`` that are new or changed according to the manifest."""
+    manifest_path = Path(manifest.db_path).resolve()
+    changed = []
+    for path in paths:
+        for item in iter_files(path):
+            if item.resolve() == manifest_path or item.name.startswith(manifest_path.name + "-"):
+                continue
+            entry = manifest.needs_ingest(item)
+            if entry is None and not force:
+                stats["skipped"] += 1
+                continue
+            changed.append((item, entry or manifest.entry_for(item)))
+    return changed
+
+
+class Progress:
+    """Prints files and chunks processed with their rates."""
+
+    def __init__(self, total: int, interval: float = 2.0) -> None:
+        self.total = total
+        self.interval = interval
+        self.files = 0
+        self.chunks = 0
+        self.started = time.perf_counter()
+        self._last = 0.0
+
+    def update(self, files: int, chunks: int, force: bool = False) -> None:
+        self.files += files
+        self.chunks += chunks
+        now = time.perf_counter()
+        if force or now - self._last >= self.interval:
+            self._last = now
+            print(self.line())
+
+    def line(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (
+            f"{self.files}/{self.total} files, {self.chunks} chunks in {elapsed:.1f}s "
+            f"({self.files / elapsed:.1f} files/s, {self.chunks / elapsed:.1f} chunks/s)"
+        )
+
+
+def ingest_files(
+    engine: RagEngine,
+    manifest: IngestManifest,
+    files: List[Tuple[Path, ManifestEntry]],
+    args: argparse.Namespace,
+    stats: Dict[str, int],
+) -> None:
+    if not files:
+        return
+    entries = {str(path): entry for path, entry in files}
+    progress = Progress(len(files))
+    batch: List[PreparedDocument] = []
+    batch_chunks = 0
+
+    def flush() -> None:
+        nonlocal batch, batch_chunks
+        if not batch:
+            return
+        try:
+            engine.upsert_prepared_batch(batch, args.embed_batch_size, args.upsert_batch_size)
+        except Exception as e:
+            # Retry file by file so one bad document does not sink the batch
+            print(f"Batch upsert failed ({e}); retrying {len(batch)} files individually")
+            for doc in list(batch):
+                try:
+                    engine.upsert_prepared(doc)
+                except Exception as doc_error:
+                    print(f"Failed to ingest {doc.path}: {doc_error}")
+                    stats["failed"] += 1
+                    batch.remove(doc)
+        for doc in batch:
+            manifest.record(entries[doc.path])
+        stats["ingested"] += len(batch)
+        progress.update(len(batch), batch_chunks)
+        batch, batch_chunks = [], 0
+
+    def add(path: Path, doc: Optional[PreparedDocument], error: Optional[str]) -> None:
+        nonlocal batch_chunks
+        if doc is None:
+            print(f"Failed to parse {path}: {error}")
+            stats["failed"] += 1
+            return
+        batch.append(doc)
+        batch_chunks += len(doc.chunks)
+        if batch_chunks >= args.batch_chunks:
+            flush()
+
+    paths = [path for path, _ in files]
+    if args.workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+            for result in pool.map(_prepare, paths, chunksize=args.parse_chunksize):
+                add(*result)
+    else:
+        for path in paths:
+            try:
+                add(path, engine.prepare_document(path), None)
+            except Exception as e:
+                add(path, None, str(e))
+    flush()
+    progress.update(0, 0, force=True)
+
+
+def prune_path(engine: RagEngine, manifest: IngestManifest, path: Path, stats: Dict[str, int]) -> None:
+    """Remove files under ``path`` that are in the manifest but no longer on disk.
+
+    A file is only forgotten once none of its points are left, so a removal
+    that failed is retried by the next prune.
+    """
+    prefix = str(path) if path.is_file() else os.path.join(str(path), "")
+    for recorded in list(manifest.paths(prefix)):
+        if not os.path.exists(recorded):
+            print(f"Removing {recorded}")
+            engine.remove_document(recorded)
+            remaining = engine.collections_holding(recorded)
+            if remaining:
+                print(f"Failed to remove {recorded}: points left in {', '.join(remaining)}")
+                stats["failed"] += 1
+                continue
+            manifest.remove(recorded)
+            stats["removed"] += 1
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Ingest documents into Qdrant.")
     parser.add_argument("paths", nargs="+", type=Path, help="Files or directories to ingest")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST_PATH, help="Path of the ingest manifest database")
+    parser.add_argument("--force", action="store_true", help="Re-ingest files even if the manifest says they are unchanged")
+    parser.add_argument("--prune", action="store_true", help="Remove deleted files from the index")
+    parser.add_argument("--rebuild-lexical", action="store_true", help="Rebuild the BM25 index of every tier from Qdrant")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parse worker processes (1 parses in-process)")
+    parser.add_argument("--parse-chunksize", type=int, default=8, help="Files handed to a parse worker at a time")
+    parser.add_argument("--batch-chunks", type=int, default=2048, help="Chunks gathered from parsed files before embedding")
+    parser.add_argument("--embed-batch-size", type=int, default=256, help="Chunks per embedding call")
+    parser.add_argument("--upsert-batch-size", type=int, default=512, help="Points per Qdrant upsert")
     args = parser.parse_args()
 
     engine = RagEngine()
-    for path in args.paths:
-        ingest_path(engine, path)
+    manifest = IngestManifest(args.manifest)
+    if not manifest.check_fingerprint(settings_fingerprint(engine)):
+        print("Embedding or chunking settings changed; re-ingesting all files")
+    stats = {"ingested": 0, "skipped": 0, "removed": 0, "failed": 0}
+    try:
+        files = changed_files(manifest, args.paths, args.force, stats)
+        print(f"{len(files)} files to ingest, {stats['skipped']} unchanged")
+        ingest_files(engine, manifest, files, args, stats)
+        if args.prune:
+            for path in args.paths:
+                prune_path(engine, manifest, path, stats)
+        if args.rebuild_lexical:
+            for tier in engine.tier_collections:
+                print(f"Lexical index of {tier}: {engine.rebuild_lexical_index(tier)} chunks")
+    finally:
+        manifest.close()
+    print(
+        f"Ingested {stats['ingested']}, unchanged {stats['skipped']}, "
+        f"removed {stats['removed']}, failed {stats['failed']}"
+    )
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -3,7 +3,15 @@
 
 This script uses watchdog to monitor the directory specified by the `DATA_ROOT`
 environment variable.  When a file is created or modified it will be
-ingested into the appropriate Qdrant collection.
+ingested into the appropriate Qdrant collection; deleted files are purged and
+moved files have their points relocated without re-embedding.
+
+Events are coalesced per path: a path is only processed once it has been quiet
+for `WATCH_DEBOUNCE_SECONDS`, so the several modify events an editor emits per
+save trigger a single ingestion.  Ingestion runs on a pool of `WATCH_WORKERS`
+threads, and files that become due together (a git checkout, a sync) are
+embedded in batches of up to `WATCH_BATCH_FILES`.  Files whose contents did
+not change according to the ingest manifest are skipped.
 
 Run this script in a long‑running process alongside your API server.
 """
@@ -13,47 +21,251 @@ from __future__ import annotations
 import os
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
+from app.manifest import DEFAULT_MANIFEST_PATH, IngestManifest, settings_fingerprint
 from app.rag import RagEngine
 
+DEBOUNCE_SECONDS = float(os.getenv("WATCH_DEBOUNCE_SECONDS", "1.0"))
+WATCH_WORKERS = int(os.getenv("WATCH_WORKERS", "2"))
+WATCH_BATCH_FILES = int(os.getenv("WATCH_BATCH_FILES", "32"))
+
+
+@dataclass
+class PendingChange:
+    """The coalesced change of a path: ``upsert``, ``delete`` or ``move``."""
+
+    action: str
+    due: float
+    src: Optional[str] = None
+
+
+class DebouncedIngester:
+    """Coalesces file events per path and applies them on a worker pool."""
+
+    def __init__(
+        self,
+        engine: RagEngine,
+        manifest: Optional[IngestManifest] = None,
+        quiet: float = DEBOUNCE_SECONDS,
+        workers: int = WATCH_WORKERS,
+        batch_files: int = WATCH_BATCH_FILES,
+    ) -> None:
+        self.engine = engine
+        self.manifest = manifest
+        self.quiet = quiet
+        self.batch_files = batch_files
+        self._pending: Dict[str, PendingChange] = {}
+        self._in_flight: Set[str] = set()
+        self._cond = threading.Condition()
+        self._slots = threading.BoundedSemaphore(workers)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._stopped = False
+        self._thread = threading.Thread(target=self._dispatch, name="ingest-dispatch", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._pool.shutdown(wait=True)
+
+    # Event intake
+    def _put(self, path: str, action: str, src: Optional[str] = None) -> None:
+        self._pending[path] = PendingChange(action, time.monotonic() + self.quiet, src)
+        self._cond.notify_all()
+
+    def changed(self, path: str) -> None:
+        with self._cond:
+            existing = self._pending.get(path)
+            if existing is not None and existing.action == "move":
+                # Still relocate first; the move ingests the new contents afterwards
+                self._put(path, "move", existing.src)
+            else:
+                self._put(path, "upsert")
+
+    def deleted(self, path: str) -> None:
+        with self._cond:
+            existing = self._pending.pop(path, None)
+            if existing is not None and existing.action == "move":
+                self._put(existing.src, "delete")
+            self._put(path, "delete")
+
+    def moved(self, src: str, dest: str) -> None:
+        with self._cond:
+            existing = self._pending.pop(src, None)
+            origin = existing.src if existing is not None and existing.action == "move" else src
+            self._put(dest, "move", origin)
+
+    # Dispatch
+    def _take_due(self) -> Optional[List[Tuple[str, PendingChange]]]:
+        """Wait for changes that are due and whose paths are not being processed."""
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                due = [
+                    (path, change)
+                    for path, change in self._pending.items()
+                    if change.due <= now and path not in self._in_flight and change.src not in self._in_flight
+                ]
+                if due:
+                    for path, change in due:
+                        del self._pending[path]
+                        self._in_flight.add(path)
+                        if change.src is not None:
+                            self._in_flight.add(change.src)
+                    return sorted(due, key=lambda item: item[1].due)
+                next_due = min((change.due for change in self._pending.values()), default=None)
+                self._cond.wait(self.quiet if next_due is None else max(next_due - now, 0.05))
+            return None
+
+    def _dispatch(self) -> None:
+        while True:
+            due = self._take_due()
+            if due is None:
+                return
+            upserts = [path for path, change in due if change.action == "upsert"]
+            tasks = []
+            for start in range(0, len(upserts), self.batch_files):
+                batch = upserts[start : start + self.batch_files]
+                tasks.append((self._ingest, (batch,), batch))
+            for path, change in due:
+                if change.action == "delete":
+                    tasks.append((self._delete, (path,), [path]))
+                elif change.action == "move":
+                    tasks.append((self._move, (change.src, path), [change.src, path]))
+            for func, args, paths in tasks:
+                # Blocks while all workers are busy; events keep coalescing meanwhile
+                self._slots.acquire()
+                self._pool.submit(self._run, func, args, paths)
+
+    def _run(self, func: Callable[..., None], args: Tuple, paths: List[str]) -> None:
+        try:
+            func(*args)
+        except Exception as exc:
+            print(f"[watcher] failed to process {', '.join(paths)}: {exc}")
+        finally:
+            with self._cond:
+                self._in_flight.difference_update(paths)
+                self._cond.notify_all()
+            self._slots.release()
+
+    # Work
+    def _ingest(self, paths: List[str]) -> None:
+        docs, entries = [], {}
+        for path in paths:
+            file_path = Path(path)
+            if not file_path.is_file():
+                continue
+            if self.manifest is not None:
+                entry = self.manifest.needs_ingest(file_path)
+                if entry is None:
+                    continue
+                entries[path] = entry
+            try:
+                docs.append(self.engine.prepare_document(file_path))
+            except Exception as exc:
+                print(f"[watcher] failed to parse {path}: {exc}")
+        if not docs:
+            return
+        print(f"[watcher] ingesting {len(docs)} file(s): {', '.join(doc.path for doc in docs)}")
+        try:
+            self.engine.upsert_prepared_batch(docs)
+        except Exception as exc:
+            print(f"[watcher] batch ingest failed ({exc}); retrying file by file")
+            for doc in list(docs):
+                try:
+                    self.engine.upsert_prepared(doc)
+                except Exception as doc_exc:
+                    print(f"[watcher] failed to ingest {doc.path}: {doc_exc}")
+                    docs.remove(doc)
+        if self.manifest is not None:
+            for doc in docs:
+                self.manifest.record(entries[doc.path])
+
+    def _forget(self, path: str) -> None:
+        """Drop a file from the manifest, but only once none of its points are left."""
+        remaining = self.engine.collections_holding(path)
+        if remaining:
+            print(f"[watcher] points of {path} left in {', '.join(remaining)}; keeping it in the manifest")
+        elif self.manifest is not None:
+            self.manifest.remove(path)
+
+    def _delete(self, path: str) -> None:
+        print(f"[watcher] removing {path}")
+        self.engine.remove_document(path)
+        self._forget(path)
+
+    def _move(self, src: str, dest: str) -> None:
+        print(f"[watcher] moving {src} -> {dest}")
+        self.engine.relocate_document(src, dest)
+        self._forget(src)
+        # Unchanged chunks are found under their new ids, so this only embeds edits
+        self._ingest([dest])
+
 
 class IngestionHandler(FileSystemEventHandler):
-    def __init__(self, engine: RagEngine, data_root: Path) -> None:
+    def __init__(self, ingester: DebouncedIngester, data_root: Path, ignore: Optional[Path] = None) -> None:
         super().__init__()
-        self.engine = engine
+        self.ingester = ingester
         self.data_root = data_root
+        self.ignore = ignore
+
+    def _watched(self, path: str) -> bool:
+        # Only process files under data_root, never the manifest itself
+        file_path = Path(path)
+        try:
+            file_path.relative_to(self.data_root)
+        except ValueError:
+            return False
+        if self.ignore is not None and file_path.parent == self.ignore.parent:
+            # Also covers SQLite's -wal and -shm files
+            return not file_path.name.startswith(self.ignore.name)
+        return True
 
     def on_created(self, event):
-        if not event.is_directory:
-            self.handle(Path(event.src_path))
+        if not event.is_directory and self._watched(event.src_path):
+            self.ingester.changed(event.src_path)
 
     def on_modified(self, event):
-        if not event.is_directory:
-            self.handle(Path(event.src_path))
+        if not event.is_directory and self._watched(event.src_path):
+            self.ingester.changed(event.src_path)
 
-    def handle(self, path: Path) -> None:
-        # Only process files under data_root
-        try:
-            path.relative_to(self.data_root)
-        except ValueError:
+    def on_deleted(self, event):
+        if not event.is_directory and self._watched(event.src_path):
+            self.ingester.deleted(event.src_path)
+
+    def on_moved(self, event):
+        if event.is_directory:
+            # watchdog also reports a move event for every file in the directory
             return
-        try:
-            print(f"[watcher] ingesting {path}")
-            self.engine.upsert_document(path)
-        except Exception as exc:
-            print(f"[watcher] failed to ingest {path}: {exc}")
+        src_watched, dest_watched = self._watched(event.src_path), self._watched(event.dest_path)
+        if src_watched and dest_watched:
+            self.ingester.moved(event.src_path, event.dest_path)
+        elif src_watched:
+            self.ingester.deleted(event.src_path)
+        elif dest_watched:
+            self.ingester.changed(event.dest_path)
 
 
 def main() -> None:
     data_root = Path(os.getenv("DATA_ROOT", ".")).resolve()
     print(f"Watching {data_root}")
     engine = RagEngine()
-    event_handler = IngestionHandler(engine, data_root)
+    manifest = IngestManifest(DEFAULT_MANIFEST_PATH)
+    manifest.check_fingerprint(settings_fingerprint(engine))
+    ingester = DebouncedIngester(engine, manifest)
+    ingester.start()
+    event_handler = IngestionHandler(ingester, data_root, ignore=Path(DEFAULT_MANIFEST_PATH).resolve())
     observer = Observer()
     observer.schedule(event_handler, str(data_root), recursive=True)
     observer.start()
@@ -63,7 +275,9 @@ def main() -> None:
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    ingester.stop()
+    manifest.close()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
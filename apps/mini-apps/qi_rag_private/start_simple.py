@@ -2,18 +2,27 @@
 """
 Simple startup script for testing the RAG application locally.
 This script sets up basic environment variables and starts the FastAPI server.
+
+By default vectors are kept in an embedded Qdrant under ./qdrant_storage, so
+no Qdrant server or Docker is needed.  Set VECTOR_BACKEND=qdrant to use a
+server instead.  With --watch the folder watcher runs in the same process
+(the embedded store can only be opened by one process at a time).
 """
 
+import argparse
 import os
 import sys
 from pathlib import Path
 
-# Add the app directory to the Python path
-app_dir = Path(__file__).parent / "app"
-sys.path.insert(0, str(app_dir))
+# Add the project directory to the Python path
+project_dir = Path(__file__).parent
+sys.path.insert(0, str(project_dir))
 
 # Set basic environment variables if not already set
 os.environ.setdefault("DATA_ROOT", str(Path(__file__).parent / "data"))
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("QDRANT_PATH", str(project_dir / "qdrant_storage"))
+os.environ.setdefault("LEXICAL_INDEX_PATH", str(project_dir / "lexical_index.sqlite3"))
 os.environ.setdefault("QDRANT_HOST", "localhost")
 os.environ.setdefault("QDRANT_PORT", "6333")
 os.environ.setdefault("EMBEDDING_MODEL", "bge-small-en-v1.5")
@@ -30,21 +39,59 @@ os.environ.setdefault("CLOUD_REQUEST_TIMEOUT", "30")
 data_dir = Path(os.environ["DATA_ROOT"])
 data_dir.mkdir(exist_ok=True)
 
+
+def start_watcher(engine):
+    """Run the folder watcher on the API's engine; returns a stop function."""
+    from watchdog.observers import Observer
+
+    from app.manifest import DEFAULT_MANIFEST_PATH, IngestManifest, settings_fingerprint
+    from scripts.watch_folder import DebouncedIngester, IngestionHandler
+
+    manifest = IngestManifest(DEFAULT_MANIFEST_PATH)
+    manifest.check_fingerprint(settings_fingerprint(engine))
+    ingester = DebouncedIngester(engine, manifest)
+    ingester.start()
+    observer = Observer()
+    handler = IngestionHandler(ingester, data_dir.resolve(), ignore=Path(DEFAULT_MANIFEST_PATH).resolve())
+    observer.schedule(handler, str(data_dir.resolve()), recursive=True)
+    observer.start()
+
+    def stop():
+        observer.stop()
+        observer.join()
+        ingester.stop()
+        manifest.close()
+
+    return stop
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Start the RAG API locally.")
+    parser.add_argument("--watch", action="store_true", help="Also ingest changes under DATA_ROOT in this process")
+    args = parser.parse_args()
+
     print("Starting RAG application in simple mode...")
     print(f"Data directory: {data_dir}")
-    print("Note: This requires Qdrant to be running on localhost:6333")
-    print("You can start Qdrant with: docker run -p 6333:6333 qdrant/qdrant")
+    if os.environ["VECTOR_BACKEND"] == "local":
+        print(f"Vectors are stored in-process under {os.environ['QDRANT_PATH']}")
+    else:
+        print(f"Note: This requires Qdrant to be running on {os.environ['QDRANT_HOST']}:{os.environ['QDRANT_PORT']}")
+        print("You can start Qdrant with: docker run -p 6333:6333 qdrant/qdrant")
     print()
     
     try:
         import uvicorn
-        from main import app
-        
-        uvicorn.run(app, host="127.0.0.1", port=8000, log_level="info")
+        from app.main import app, engine
+
+        stop_watcher = start_watcher(engine) if args.watch else None
+        try:
+            uvicorn.run(app, host="127.0.0.1", port=8000, log_level="info")
+        finally:
+            if stop_watcher is not None:
+                stop_watcher()
     except ImportError as e:
         print(f"Missing dependency: {e}")
         print("Please install requirements: pip install -r requirements.txt")
     except Exception as e:
         print(f"Failed to start application: {e}")
-        print("Make sure Qdrant is running and all dependencies are installed.")
+        print("Make sure the vector store is reachable and all dependencies are installed.")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Check the offset-based chunker against the original word splitter.
+
+``window_spans`` over word offsets must produce the same chunks as the
+word-list splitter it replaced, for every chunk size and overlap, and the
+offsets must point at the exact source text.  Token offsets are checked with
+a stand-in tokenizer across block boundaries, so no model is downloaded.
+
+Usage:
+    python test_chunking.py
+"""
+
+import random
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.chunking import chunk_spans, load_tokenizer, token_spans, window_spans, word_spans
+
+
+def baseline_split(text, chunk_size, chunk_overlap):
+    """The word splitter RagEngine.split_text used before chunks became offsets."""
+    words = text.split()
+    if not words:
+        return []
+    chunks = []
+    step = chunk_size - chunk_overlap
+    for i in range(0, len(words), step):
+        chunks.append(" ".join(words[i : i + chunk_size]))
+        if i + chunk_size >= len(words):
+            break
+    return chunks
+
+
+class PunctuationTokenizer:
+    """Splits words from punctuation and reports offsets like a fast HF tokenizer."""
+
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=True):
+        return {"offset_mapping": [m.span() for m in re.finditer(r"\w+|[^\w\s]", text)]}
+
+
+def random_text(rng, n_words):
+    words = ["".join(rng.choice("abcdefgh") for _ in range(rng.randint(1, 8))) for _ in range(n_words)]
+    return "".join(word + rng.choice([" ", "  ", "\n", "\t ", ", "]) for word in words)
+
+
+def test_matches_baseline():
+    print("Testing window_spans against the baseline split...")
+    rng = random.Random(0)
+    cases = 0
+    for n_words in (0, 1, 2, 7, 8, 9, 50, 333):
+        text = random_text(rng, n_words)
+        for size in (1, 2, 3, 8, 50, 400):
+            for overlap in sorted({0, 1, size // 2, size - 1}):
+                if overlap >= size:
+                    continue
+                spans = list(chunk_spans(text, size, overlap))
+                chunks = [" ".join(text[start:end].split()) for start, end in spans]
+                assert chunks == baseline_split(text, size, overlap), (n_words, size, overlap)
+                for start, end in spans:
+                    assert not text[start].isspace() and not text[end - 1].isspace(), "span must start and end on a word"
+                cases += 1
+    print(f"✅ {cases} size/overlap cases match the word-list splitter")
+
+
+def test_invalid_settings():
+    for size, overlap in ((0, 0), (5, 5), (5, -1)):
+        try:
+            list(window_spans(word_spans("a b c"), size, overlap))
+        except ValueError:
+            continue
+        raise AssertionError(f"chunk_size={size}, chunk_overlap={overlap} accepted")
+    assert load_tokenizer("words") is None and load_tokenizer("") is None
+    print("✅ invalid sizes are rejected and 'words' needs no tokenizer")
+
+
+def test_token_spans():
+    print("Testing token offsets...")
+    rng = random.Random(1)
+    text = random_text(rng, 2000)
+    tokenizer = PunctuationTokenizer()
+    whole = [m.span() for m in re.finditer(r"\w+|[^\w\s]", text)]
+    # Small blocks force many whitespace-aligned cuts
+    assert list(token_spans(text, tokenizer, block_chars=97)) == whole
+    for start, end in chunk_spans(text, 16, 4, tokenizer):
+        tokens = [span for span in whole if start <= span[0] and span[1] <= end]
+        assert len(tokens) <= 16 and (start, end) == (tokens[0][0], tokens[-1][1])
+    print("✅ token offsets survive block boundaries and windows hold chunk_size tokens")
+
+
+if __name__ == "__main__":
+    test_matches_baseline()
+    test_invalid_settings()
+    test_token_spans()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Check the cloud fallback client's circuit breaker and answer cache.
+
+The breaker's state transitions are driven directly; the client is pointed at
+an unused local port (failures) or given a stub session (answers), so no
+remote endpoint is needed.
+
+Usage:
+    python test_cloud.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.cloud import CircuitBreaker, CloudFallbackClient
+
+
+def test_breaker_transitions():
+    print("Testing circuit breaker transitions...")
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.1)
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow(), "one failure is below the threshold"
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed", "a success resets the failure count"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    print("✅ closed -> open after failure_threshold consecutive failures")
+
+    time.sleep(0.12)
+    assert breaker.state == "half-open"
+    assert breaker.allow(), "one trial call is let through"
+    assert not breaker.allow(), "only one trial call at a time"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    print("✅ half-open -> open when the trial call fails")
+
+    time.sleep(0.12)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+    print("✅ half-open -> closed when the trial call succeeds")
+
+
+class StubResponse:
+    def __init__(self, answer):
+        self.answer = answer
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"answer": self.answer}
+
+
+class StubSession:
+    def __init__(self):
+        self.calls = 0
+
+    def post(self, url, params, timeout):
+        self.calls += 1
+        return StubResponse(f"remote answer {self.calls}")
+
+
+def test_client():
+    print("Testing the fallback client...")
+    # Nothing listens on port 9; connections are refused at once
+    client = CloudFallbackClient("http://127.0.0.1:9", timeout=0.5, failure_threshold=2, reset_seconds=60)
+    assert client.ask("q", ["UNCLASS"]) is None and client.ask("q", ["UNCLASS"]) is None
+    assert client.breaker.state == "open"
+    started = time.monotonic()
+    assert client.submit("q", ["UNCLASS"]).result(timeout=1) is None
+    assert time.monotonic() - started < 0.1, "an open breaker fails fast"
+    print("✅ errors return None and open the breaker")
+
+    client = CloudFallbackClient("http://remote", cache_ttl=60)
+    client._session = StubSession()
+    first = client.ask("What is new?", ["CLASSIFIED", "UNCLASS"])
+    assert client.ask(" What is new? ", ["UNCLASS", "CLASSIFIED"]) == first, "same question and tiers hit the cache"
+    assert client.ask("What is new?", ["UNCLASS"]) != first
+    assert client._session.calls == 2
+    assert client.speculative is False and client.wait_timeout > client.timeout
+    print("✅ answers are cached per question and tiers; speculation is off by default")
+
+
+if __name__ == "__main__":
+    test_breaker_transitions()
+    test_client()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Check the shared embedding service's authentication and wire protocol.
+
+Starts an EmbeddingServer with the hashing embedder on a temporary Unix
+socket and talks to it with RemoteEmbedder: vectors and the model fingerprint
+must come back intact, clients with a wrong key or a forged handshake must be
+rejected before any request is served, and an unset key must stop both sides
+from starting.
+
+Usage:
+    python test_embedding_service.py
+"""
+
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.embedding_service import EmbeddingServer, RemoteEmbedder, recv_frame, send_frame
+from app.providers import HashingEmbedder
+
+AUTHKEY = b"test-secret"
+
+
+def start_server(address):
+    server = EmbeddingServer(HashingEmbedder(dim=16), "hashing:16", address=address, authkey=AUTHKEY)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for _ in range(100):
+        if os.path.exists(address):
+            return server
+        time.sleep(0.02)
+    raise RuntimeError("embedding server did not start")
+
+
+def raw_connection(address):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(address)
+    return sock
+
+
+def test_embedding_service():
+    print("Testing the embedding service...")
+    with tempfile.TemporaryDirectory() as tmp:
+        address = str(Path(tmp) / "embeddings.sock")
+        start_server(address)
+        assert oct(os.stat(address).st_mode & 0o777) == oct(0o600), "socket must be owner-only"
+
+        client = RemoteEmbedder(address=address, authkey=AUTHKEY)
+        texts = ["alpha beta", "gamma"]
+        vectors = client.encode(texts)
+        assert vectors.dtype == np.float32 and np.allclose(vectors, HashingEmbedder(dim=16).encode(texts), atol=1e-6)
+        assert client.get_sentence_embedding_dimension() == 16 and client.fingerprint() == "hashing:16"
+        print("✅ vectors and fingerprint come back intact")
+
+        try:
+            RemoteEmbedder(address=address, authkey=b"wrong-secret").encode(["alpha"])
+        except RuntimeError as exc:
+            assert "rejected" in str(exc), exc
+        else:
+            raise AssertionError("a client with the wrong key was served")
+        print("✅ a wrong key is rejected")
+
+        # A peer that skips the handshake gets no reply to its request
+        with raw_connection(address) as sock:
+            challenge, _ = recv_frame(sock, max_payload=0)
+            assert "challenge" in challenge
+            send_frame(sock, {"op": "encode", "texts": ["alpha"]})
+            reply, payload = recv_frame(sock)
+            assert reply == {"status": "error", "error": "Authentication failed"} and not payload
+            sock.settimeout(2)
+            assert sock.recv(1) == b"", "connection must be closed after a failed handshake"
+        print("✅ requests sent without a valid digest are not served")
+
+        assert client.encode(["still works"]).shape == (1, 16), "server must keep serving good clients"
+
+        saved = os.environ.pop("EMBEDDING_SERVICE_AUTHKEY", None)
+        try:
+            for start in (lambda: RemoteEmbedder(address=address), lambda: EmbeddingServer(HashingEmbedder(dim=16), "hashing:16")):
+                try:
+                    start()
+                except RuntimeError:
+                    continue
+                raise AssertionError("started without EMBEDDING_SERVICE_AUTHKEY")
+        finally:
+            if saved is not None:
+                os.environ["EMBEDDING_SERVICE_AUTHKEY"] = saved
+        print("✅ neither side starts without EMBEDDING_SERVICE_AUTHKEY")
+
+
+if __name__ == "__main__":
+    test_embedding_service()
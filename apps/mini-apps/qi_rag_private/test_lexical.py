@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Check the per-tier BM25 lexical index.
+
+Exercises LexicalIndex directly on a temporary SQLite file: adding chunks
+(idempotently), searching for words, ids and quoted phrases, deleting by point
+id and by path, clearing a collection, and collection names that are not
+plain identifiers.
+
+Usage:
+    python test_lexical.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.lexical import LexicalIndex, create_lexical_index, match_expression
+
+CHUNKS = [
+    ("p1", "a.txt", "Quarterly report on reactor AB-1234 maintenance"),
+    ("p2", "a.txt", "The maintenance window moved to Friday"),
+    ("p3", "b.txt", "Budget report for the new fiscal year"),
+    ("p4", "c.txt", "Ordinary notes about lunch"),
+]
+
+
+def ids(results):
+    return [point_id for point_id, _ in results]
+
+
+def test_lexical_index():
+    print("Testing the lexical index...")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = LexicalIndex(str(Path(tmp) / "lexical.sqlite3"))
+        for collection in ("q_unclass", "q-classified"):
+            assert index.add(collection, CHUNKS) == len(CHUNKS)
+            assert index.add(collection, CHUNKS[:2]) == 0, "known point ids are skipped"
+            assert index.count(collection) == len(CHUNKS)
+        print("✅ chunks are added once per point id, whatever the collection name")
+
+        results = index.search("q-classified", "AB-1234", 10)
+        assert ids(results) == ["p1"] and results[0][1] > 0, results
+        assert set(ids(index.search("q_unclass", "report", 10))) == {"p1", "p3"}
+        assert ids(index.search("q_unclass", '"maintenance window"', 10))[0] == "p2"
+        assert index.search("q_unclass", "zebra", 10) == []
+        assert index.search("q_unclass", "?? --", 10) == [], "a question without words matches nothing"
+        assert index.search("missing_collection", "report", 10) == []
+        print("✅ words, ids and quoted phrases are found, best first")
+
+        assert index.delete("q_unclass", ["p3"]) == 1
+        assert ids(index.search("q_unclass", "budget", 10)) == []
+        assert index.remove_path("q_unclass", "a.txt") == 2
+        assert index.remove_path("q_unclass", "a.txt") == 0
+        assert index.count("q_unclass") == 1 and index.count("q-classified") == len(CHUNKS)
+        print("✅ deletes by point id and by path only touch their collection")
+
+        index.clear("q-classified")
+        assert index.count("q-classified") == 0 and index.search("q-classified", "report", 10) == []
+        assert index.add("q-classified", CHUNKS[:1]) == 1
+        index.close()
+        print("✅ a cleared collection can be indexed again")
+
+    assert match_expression('say "hello world" AND x*') == '"say" OR "hello world" OR "AND" OR "x*"'
+    assert create_lexical_index("") is None
+    print("✅ query terms are quoted and an empty path disables the index")
+
+
+if __name__ == "__main__":
+    test_lexical_index()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Check that changing the embedding model re-embeds stored chunks.
+
+Runs offline against the in-memory vector store: a folder is ingested, the
+embedding model is swapped (once for a model of the same dimension, once for
+one of another dimension) and the folder is ingested again.  Every stored
+vector must then come from the new model, with no points of the old one left.
+
+Usage:
+    python test_reembed.py
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+os.environ.update(VECTOR_BACKEND="memory", LEXICAL_INDEX_PATH=":memory:", CHUNK_SIZE="8", CHUNK_OVERLAP="0")
+
+from app.providers import HashingEmbedder
+from app.rag import RagEngine
+
+
+class FlippedEmbedder(HashingEmbedder):
+    """A different model with the same dimension: the hashing vectors negated."""
+
+    def encode(self, texts, **kwargs):
+        return -super().encode(texts, **kwargs)
+
+
+def stored_vectors(engine, collection):
+    points, _ = engine.client.scroll(collection, limit=1000, with_payload=True, with_vectors=True)
+    return {(p.payload["path"], p.payload["chunk_index"]): (p.payload["text"], np.asarray(p.vector)) for p in points}
+
+
+def check_model(engine, paths, embedder, model_name):
+    engine._embedder = embedder
+    engine.embedding_model_name = model_name
+    results = [engine.upsert_document(path) for path in paths]
+    collection = engine.collection_for_tier("UNCLASS")
+    stored = stored_vectors(engine, collection)
+    chunks = sum(r["added"] + r["unchanged"] for r in results)
+    assert len(stored) == chunks, f"{len(stored)} points stored for {chunks} chunks: old model's points left"
+    for text, vector in stored.values():
+        expected = embedder.encode([text])[0]
+        assert vector.shape == expected.shape and np.allclose(vector, expected, atol=1e-5), "vector from the old model"
+    assert engine.lexical.count(collection) == chunks, "lexical index out of step"
+    print(f"✅ {model_name}: {chunks} chunks, all embedded with the new model ({results[0]})")
+
+
+def test_reembed():
+    print("Testing re-embedding on embedding model change...")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(3):
+            path = Path(tmp) / f"doc{i}.txt"
+            path.write_text(f"document {i} " + " ".join(f"word{i}{j}" for j in range(20)), encoding="utf-8")
+            paths.append(path)
+
+        os.environ["EMBEDDING_PROVIDER"] = "sentence-transformers"
+        engine = RagEngine()
+        check_model(engine, paths, HashingEmbedder(dim=64), "model-a")
+        check_model(engine, paths, FlippedEmbedder(dim=64), "model-b")
+        check_model(engine, paths, HashingEmbedder(dim=32), "model-c")
+        # Same model again: nothing is re-embedded
+        before = stored_vectors(engine, engine.collection_for_tier("UNCLASS"))
+        assert all(r["added"] == 0 for r in (engine.upsert_document(p) for p in paths))
+        assert before.keys() == stored_vectors(engine, engine.collection_for_tier("UNCLASS")).keys()
+        print("✅ unchanged model: nothing re-embedded")
+
+
+if __name__ == "__main__":
+    test_reembed()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Check how the folder watcher coalesces file events.
+
+Events are fed to a DebouncedIngester backed by a recording engine, so no
+vector store or embedder is needed.  Bursts of modifications must become one
+ingestion, chains of moves one relocation, and a move followed by a delete
+must remove the original path.  Manifest entries are only dropped once the
+engine holds no points of the path.
+
+Usage:
+    python test_watch_folder.py
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent / "scripts"))
+
+from watch_folder import DebouncedIngester
+
+QUIET = 0.05
+
+
+class RecordingEngine:
+    def __init__(self):
+        self.calls = []
+        self.stuck = set()
+
+    def prepare_document(self, path):
+        return SimpleNamespace(path=str(path))
+
+    def upsert_prepared_batch(self, docs):
+        self.calls.append(("upsert", sorted(doc.path for doc in docs)))
+
+    def remove_document(self, path):
+        self.calls.append(("delete", path))
+
+    def relocate_document(self, src, dest):
+        self.calls.append(("move", src, dest))
+
+    def collections_holding(self, path):
+        return ["q_unclass"] if path in self.stuck else []
+
+
+class RecordingManifest:
+    def __init__(self, paths):
+        self.entries = set(paths)
+
+    def needs_ingest(self, path):
+        return str(path)
+
+    def record(self, entry):
+        self.entries.add(entry)
+
+    def remove(self, path):
+        self.entries.discard(path)
+
+
+def run_events(events, files=(), stuck=(), manifest_paths=()):
+    """Apply ``events`` to a fresh ingester and return the engine calls and manifest."""
+    engine = RecordingEngine()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        engine.stuck.update(str(root / path) for path in stuck)
+        manifest = RecordingManifest(str(root / path) for path in manifest_paths)
+        for name in files:
+            (root / name).write_text("contents", encoding="utf-8")
+        ingester = DebouncedIngester(engine, manifest, quiet=QUIET, workers=2, batch_files=8)
+        ingester.start()
+        for event, *paths in events:
+            getattr(ingester, event)(*(str(root / path) for path in paths))
+        time.sleep(QUIET * 6)
+        ingester.stop()
+        prefix = str(root) + "/"
+        strip = lambda value: [v.replace(prefix, "") for v in value] if isinstance(value, list) else value.replace(prefix, "")
+        calls = [tuple(strip(value) for value in call) for call in engine.calls]
+        entries = {strip(entry) for entry in manifest.entries}
+    return calls, entries
+
+
+def test_modifications_coalesce():
+    calls, _ = run_events([("changed", "a.txt")] * 5 + [("changed", "b.txt")], files=["a.txt", "b.txt"])
+    assert calls == [("upsert", ["a.txt", "b.txt"])], calls
+    print("✅ a burst of modifications is ingested once, in one batch")
+
+
+def test_created_then_deleted():
+    calls, _ = run_events([("changed", "a.txt"), ("deleted", "a.txt")])
+    assert calls == [("delete", "a.txt")], calls
+    print("✅ a file deleted before it settled is only removed")
+
+
+def test_move_chain():
+    calls, entries = run_events(
+        [("moved", "a.txt", "b.txt"), ("moved", "b.txt", "c.txt"), ("changed", "c.txt")],
+        files=["c.txt"],
+        manifest_paths=["a.txt"],
+    )
+    assert calls == [("move", "a.txt", "c.txt"), ("upsert", ["c.txt"])], calls
+    assert entries == {"c.txt"}, entries
+    print("✅ a chain of moves becomes one relocation, then the edit is ingested")
+
+
+def test_move_then_delete():
+    calls, entries = run_events(
+        [("moved", "a.txt", "b.txt"), ("deleted", "b.txt")], manifest_paths=["a.txt"]
+    )
+    assert sorted(calls) == [("delete", "a.txt"), ("delete", "b.txt")], calls
+    assert entries == set(), entries
+    print("✅ deleting a moved file removes its original path")
+
+
+def test_manifest_kept_while_points_remain():
+    calls, entries = run_events([("deleted", "a.txt")], stuck=["a.txt"], manifest_paths=["a.txt"])
+    assert calls == [("delete", "a.txt")] and entries == {"a.txt"}, (calls, entries)
+    print("✅ a file whose points could not be removed stays in the manifest")
+
+
+if __name__ == "__main__":
+    test_modifications_coalesce()
+    test_created_then_deleted()
+    test_move_chain()
+    test_move_then_delete()
+    test_manifest_kept_while_points_remain()
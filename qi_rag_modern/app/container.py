@@ -0,0 +1,140 @@
+"""
+Application Component Container
+Builds each heavy component once, on first use, and shares it across the app
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from .config import Settings
+from .state_backend import DOCSTORE_PATH, StateBackend, create_state_backend
+from .tracing import span, start_trace
+
+# Component modules pull in LangChain and friends, so they are imported by the
+# factories below rather than at module import time
+if TYPE_CHECKING:
+    from .document_processor import DocumentProcessor
+    from .job_queue import IngestJob, JobQueue
+    from .multimodal_retriever import MultimodalRetriever
+    from .rag_engine import RAGEngine
+
+logger = logging.getLogger(__name__)
+
+
+class Container:
+    """Lazily builds and shares the application's heavy components
+
+    The embedding and LLM clients are created once and injected into every
+    component that needs them, and there is a single RAGEngine (one ChromaDB
+    client, one set of caches) behind both chat and ingestion.
+    """
+
+    def __init__(self, settings: Optional[Settings] = None):
+        self._lock = threading.RLock()
+        self._components: Dict[str, Any] = {}
+        self._multimodal_retrievers: Dict[str, MultimodalRetriever] = {}
+        if settings is not None:
+            self._components["settings"] = settings
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Get a component, building it on first access"""
+        component = self._components.get(name)
+        if component is None:
+            with self._lock:
+                component = self._components.get(name)
+                if component is None:
+                    logger.info(f"Initializing component: {name}")
+                    component = factory()
+                    self._components[name] = component
+        return component
+
+    def is_initialized(self, name: str) -> bool:
+        """Check whether a component has been built"""
+        return name in self._components
+
+    @property
+    def settings(self) -> Settings:
+        return self._get("settings", Settings)
+
+    @property
+    def state_backend(self) -> StateBackend:
+        return self._get("state_backend", create_state_backend)
+
+    @property
+    def embeddings(self) -> Any:
+        def build():
+            from .providers import create_embeddings
+            return create_embeddings(self.settings)
+        return self._get("embeddings", build)
+
+    @property
+    def llm(self) -> Any:
+        def build():
+            from .providers import create_chat_model
+            return create_chat_model(self.settings)
+        return self._get("llm", build)
+
+    @property
+    def rag_engine(self) -> RAGEngine:
+        def build():
+            from .rag_engine import RAGEngine
+            return RAGEngine(
+                settings=self.settings,
+                embeddings=self.embeddings,
+                llm=self.llm,
+                state_backend=self.state_backend
+            )
+        return self._get("rag_engine", build)
+
+    @property
+    def document_processor(self) -> DocumentProcessor:
+        def build():
+            from .document_processor import DocumentProcessor
+            return DocumentProcessor(
+                rag_engine=self.rag_engine,
+                settings=self.settings
+            )
+        return self._get("document_processor", build)
+
+    @property
+    def ingest_queue(self) -> JobQueue:
+        def build():
+            from .job_queue import JobQueue
+            return JobQueue(handler=self._run_ingest_job)
+        return self._get("ingest_queue", build)
+
+    async def _run_ingest_job(self, job: IngestJob) -> Dict:
+        """Process a queued ingestion job"""
+        with start_trace(parent_id=job.job_id), span("ingest_job", tenant=job.tenant_id):
+            return await self.document_processor.process_document(**job.payload)
+
+    def multimodal_retriever(self, client_id: str) -> MultimodalRetriever:
+        """Get or create the multimodal retriever for a client"""
+        retriever = self._multimodal_retrievers.get(client_id)
+        if retriever is None:
+            with self._lock:
+                retriever = self._multimodal_retrievers.get(client_id)
+                if retriever is None:
+                    from .multimodal_retriever import MultimodalRetriever
+                    chroma_client = docstore = None
+                    if self.state_backend.shared:
+                        # Other workers must see this client's documents too
+                        from langchain.storage import LocalFileStore, create_kv_docstore
+                        chroma_client = self.rag_engine.chroma_client
+                        docstore = create_kv_docstore(
+                            LocalFileStore(os.path.join(DOCSTORE_PATH, client_id))
+                        )
+                    retriever = MultimodalRetriever(
+                        client_id,
+                        settings=self.settings,
+                        embedding_model=self.embeddings,
+                        text_llm=self.llm,
+                        chroma_client=chroma_client,
+                        docstore=docstore
+                    )
+                    self._multimodal_retrievers[client_id] = retriever
+        return retriever
@@ -0,0 +1,93 @@
+"""
+Context Packing
+Fits retrieved chunks into a token budget before they are stuffed into the prompt
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import List, Optional
+
+from langchain.schema import Document
+
+from .metrics import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Tokens of retrieved context allowed in a prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("QI_RAG_CONTEXT_TOKEN_BUDGET", "3000"))
+# Shared text shorter than this is not treated as splitter overlap
+MIN_OVERLAP_CHARS = 32
+# Longest overlap searched for; the splitter overlaps chunks by up to 200 chars
+MAX_OVERLAP_CHARS = int(os.getenv("QI_RAG_CONTEXT_MAX_OVERLAP_CHARS", "400"))
+
+
+def _overlap(head: str, tail: str, min_chars: int, max_chars: int) -> int:
+    """Length of the longest suffix of head that is also a prefix of tail"""
+    if len(head) < min_chars or len(tail) < min_chars:
+        return 0
+    window_start = max(0, len(head) - max_chars)
+    probe = tail[:min_chars]
+    pos = head.find(probe, window_start)
+    while pos != -1:
+        size = len(head) - pos
+        if size <= len(tail) and tail.startswith(head[pos:]):
+            return size
+        pos = head.find(probe, pos + 1)
+    return 0
+
+
+def pack_context(
+    documents: List[Document],
+    token_budget: Optional[int] = None,
+    min_overlap_chars: int = MIN_OVERLAP_CHARS,
+    max_overlap_chars: int = MAX_OVERLAP_CHARS
+) -> List[Document]:
+    """Select documents for the prompt within a token budget
+
+    Documents are taken in retrieval order (the ensemble retriever returns them
+    ranked by fused score). Chunks already contained in a selected chunk are
+    dropped and text shared with a neighbouring selected chunk (the splitter's
+    overlap) is trimmed. Chunks that no longer fit are skipped so that smaller,
+    lower-ranked ones can still use the remaining budget; the top chunk is
+    truncated rather than dropped if it alone exceeds the budget.
+    """
+    budget = CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    selected: List[Document] = []
+    used = 0
+    skipped = 0
+
+    for rank, doc in enumerate(documents):
+        text = doc.page_content
+        if any(text in chosen.page_content for chosen in selected):
+            skipped += 1
+            continue
+
+        for chosen in selected:
+            # Drop the start of this chunk that repeats the end of a selected one, and vice versa
+            text = text[_overlap(chosen.page_content, text, min_overlap_chars, max_overlap_chars):]
+            cut = _overlap(text, chosen.page_content, min_overlap_chars, max_overlap_chars)
+            if cut:
+                text = text[:len(text) - cut]
+        text = text.strip()
+        if not text:
+            skipped += 1
+            continue
+
+        tokens = count_tokens(text)
+        if used + tokens > budget:
+            if selected:
+                skipped += 1
+                continue
+            text = truncate_tokens(text, budget)
+            tokens = count_tokens(text)
+
+        selected.append(Document(page_content=text, metadata={**doc.metadata, "fused_rank": rank}))
+        used += tokens
+
+    logger.debug(
+        f"Packed {len(selected)}/{len(documents)} chunks into {used}/{budget} tokens "
+        f"({skipped} skipped)"
+    )
+    return selected
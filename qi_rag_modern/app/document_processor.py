@@ -11,37 +11,40 @@ import logging
 import os
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Any, Union
 from urllib.parse import urlparse
 
-import pandas as pd
-from PIL import Image
-import cv2
-import numpy as np
-
 from langchain.schema import Document
-from langchain_community.document_loaders import (
-    TextLoader, 
-    CSVLoader, 
-    JSONLoader,
-    UnstructuredFileLoader,
-    PyPDFLoader,
-    Docx2txtLoader
-)
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
 
 from .config import Settings
+from .providers import uses_remote_models
 from .rag_engine import RAGEngine
+from .tracing import span
+
+# pandas, PIL, cv2, Gemini and the document loaders are imported where they are
+# used so that importing this module stays cheap
+if TYPE_CHECKING:
+    from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+def _read_csv_records(file_path: Path) -> List[Dict]:
+    """Read a CSV file into a list of row dicts"""
+    import pandas as pd
+    return pd.read_csv(file_path).to_dict('records')
+
 class DocumentProcessor:
     """Advanced document processor for automated multimodal data ingestion"""
     
-    def __init__(self):
-        self.settings = Settings()
-        self.rag_engine = RAGEngine()
+    def __init__(
+        self,
+        rag_engine: Optional[RAGEngine] = None,
+        settings: Optional[Settings] = None
+    ):
+        self.settings = settings or Settings()
+        # Share the serving engine so ingests invalidate its caches
+        self.rag_engine = rag_engine or RAGEngine(settings=self.settings)
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
@@ -65,9 +68,17 @@ class DocumentProcessor:
             '.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a'
         }
         
-        # Initialize multimodal embedding model
-        self.multimodal_embeddings = None
-        self._initialize_multimodal_embeddings()
+        # Multimodal embedding model, initialized on first use (skipped with offline providers)
+        self._multimodal_embeddings = None
+        self._multimodal_embeddings_loaded = not uses_remote_models()
+    
+    @property
+    def multimodal_embeddings(self):
+        """Multimodal embedding model (Gemini), or None if unavailable"""
+        if not self._multimodal_embeddings_loaded:
+            self._multimodal_embeddings_loaded = True
+            self._initialize_multimodal_embeddings()
+        return self._multimodal_embeddings
     
     def _initialize_multimodal_embeddings(self):
         """Initialize multimodal embedding model"""
@@ -75,7 +86,7 @@ class DocumentProcessor:
             # Try to initialize Google Gemini for multimodal embeddings
             import google.generativeai as genai
             genai.configure(api_key=self.settings.gemini_api_key)
-            self.multimodal_embeddings = genai.GenerativeModel('gemini-pro-vision')
+            self._multimodal_embeddings = genai.GenerativeModel('gemini-pro-vision')
             logger.info("Multimodal embeddings (Gemini) initialized successfully")
         except ImportError:
             logger.warning("Google Gemini not available for multimodal embeddings")
@@ -105,25 +116,27 @@ class DocumentProcessor:
                 metadata = self._extract_file_metadata(file_path)
             
             # Process based on file type
-            if document_type in ['text', 'document']:
-                documents = await self._process_text_document(file_path, client_id, metadata)
-            elif document_type == 'image':
-                documents = await self._process_image(file_path, client_id, metadata)
-            elif document_type == 'video':
-                documents = await self._process_video(file_path, client_id, metadata)
-            elif document_type == 'audio':
-                documents = await self._process_audio(file_path, client_id, metadata)
-            elif document_type == 'chat_transcript':
-                documents = await self._process_chat_transcript(file_path, client_id, metadata)
-            elif document_type == 'activity_data':
-                documents = await self._process_activity_data(file_path, client_id, metadata)
-            elif document_type == 'memory_data':
-                documents = await self._process_memory_data(file_path, client_id, metadata)
-            else:
-                raise ValueError(f"Unsupported document type: {document_type}")
+            with span("parse", tenant=client_id):
+                if document_type in ['text', 'document']:
+                    documents = await self._process_text_document(file_path, client_id, metadata)
+                elif document_type == 'image':
+                    documents = await self._process_image(file_path, client_id, metadata)
+                elif document_type == 'video':
+                    documents = await self._process_video(file_path, client_id, metadata)
+                elif document_type == 'audio':
+                    documents = await self._process_audio(file_path, client_id, metadata)
+                elif document_type == 'chat_transcript':
+                    documents = await self._process_chat_transcript(file_path, client_id, metadata)
+                elif document_type == 'activity_data':
+                    documents = await self._process_activity_data(file_path, client_id, metadata)
+                elif document_type == 'memory_data':
+                    documents = await self._process_memory_data(file_path, client_id, metadata)
+                else:
+                    raise ValueError(f"Unsupported document type: {document_type}")
             
             # Add documents to RAG system
-            chunks_processed = await self.rag_engine.add_documents(documents, client_id)
+            with span("index", tenant=client_id):
+                chunks_processed = await self.rag_engine.add_documents(documents, client_id)
             
             return {
                 "status": "success",
@@ -176,6 +189,14 @@ class DocumentProcessor:
     ) -> List[Document]:
         """Process text and document files"""
         try:
+            from langchain_community.document_loaders import (
+                CSVLoader,
+                Docx2txtLoader,
+                JSONLoader,
+                PyPDFLoader,
+                TextLoader
+            )
+            
             extension = file_path.suffix.lower()
             
             # Choose appropriate loader
@@ -223,6 +244,8 @@ class DocumentProcessor:
     ) -> List[Document]:
         """Process image files using multimodal embeddings"""
         try:
+            from PIL import Image
+            
             # Load image
             image = Image.open(file_path)
             
@@ -265,6 +288,9 @@ class DocumentProcessor:
     ) -> List[Document]:
         """Process video files by extracting keyframes"""
         try:
+            import cv2
+            from PIL import Image
+            
             # Open video file
             cap = cv2.VideoCapture(str(file_path))
             
@@ -378,7 +404,7 @@ class DocumentProcessor:
                 with open(file_path, 'r', encoding='utf-8') as f:
                     chat_data = json.load(f)
             elif file_path.suffix.lower() == '.csv':
-                chat_data = pd.read_csv(file_path).to_dict('records')
+                chat_data = _read_csv_records(file_path)
             else:
                 # Assume text file with chat format
                 with open(file_path, 'r', encoding='utf-8') as f:
@@ -432,7 +458,7 @@ class DocumentProcessor:
                 with open(file_path, 'r', encoding='utf-8') as f:
                     activity_data = json.load(f)
             elif file_path.suffix.lower() == '.csv':
-                activity_data = pd.read_csv(file_path).to_dict('records')
+                activity_data = _read_csv_records(file_path)
             else:
                 raise ValueError(f"Unsupported format for activity data: {file_path.suffix}")
             
@@ -501,7 +527,7 @@ class DocumentProcessor:
                 with open(file_path, 'r', encoding='utf-8') as f:
                     memory_data = json.load(f)
             elif file_path.suffix.lower() == '.csv':
-                memory_data = pd.read_csv(file_path).to_dict('records')
+                memory_data = _read_csv_records(file_path)
             else:
                 # Assume text file with journal entries
                 with open(file_path, 'r', encoding='utf-8') as f:
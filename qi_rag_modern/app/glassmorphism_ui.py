@@ -698,4 +698,17 @@ export const GlassModal: React.FC<GlassModalProps> = ({
 """
 
 # Global glassmorphism UI instance
-glassmorphism_ui = GlassmorphismUI()
+_glassmorphism_ui: Optional[GlassmorphismUI] = None
+
+def get_glassmorphism_ui() -> GlassmorphismUI:
+    """Get the global instance, created on first use"""
+    global _glassmorphism_ui
+    if _glassmorphism_ui is None:
+        _glassmorphism_ui = GlassmorphismUI()
+    return _glassmorphism_ui
+
+def __getattr__(name: str):
+    # Keep `glassmorphism_ui` importable without building it at import time
+    if name == "glassmorphism_ui":
+        return get_glassmorphism_ui()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
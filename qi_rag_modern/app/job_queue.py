@@ -0,0 +1,490 @@
+"""
+Durable Ingestion Job Queue
+SQLite-backed queue with a bounded worker pool, priorities, per-tenant fairness and retries
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the environment
+JOB_DB_PATH = os.getenv("QI_RAG_JOB_DB", "./ingest_jobs.sqlite3")
+INGEST_WORKERS = int(os.getenv("QI_RAG_INGEST_WORKERS", "2"))
+PER_TENANT_CONCURRENCY = int(os.getenv("QI_RAG_INGEST_PER_TENANT", "1"))
+MAX_ATTEMPTS = int(os.getenv("QI_RAG_INGEST_MAX_ATTEMPTS", "3"))
+RETRY_BACKOFF_SECONDS = float(os.getenv("QI_RAG_INGEST_RETRY_BACKOFF", "5"))
+LEASE_SECONDS = float(os.getenv("QI_RAG_INGEST_LEASE_SECONDS", "300"))
+
+# Errors that fail the same way on every attempt (bad input, missing file), so
+# the job is failed at once instead of being retried
+NON_RETRYABLE_ERRORS = (ValueError, TypeError, KeyError, FileNotFoundError, IsADirectoryError, PermissionError)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+    job_id TEXT PRIMARY KEY,
+    tenant_id TEXT NOT NULL,
+    submitted_by TEXT,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_claim
+    ON ingest_jobs (status, available_at, tenant_id, priority);
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_finished
+    ON ingest_jobs (status, finished_at);
+"""
+
+
+class JobStatus(Enum):
+    """Lifecycle states of an ingestion job"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@dataclass
+class IngestJob:
+    """A queued unit of ingestion work"""
+    job_id: str
+    tenant_id: str
+    payload: Dict[str, Any]
+    priority: int = 0
+    status: JobStatus = JobStatus.QUEUED
+    attempts: int = 0
+    max_attempts: int = MAX_ATTEMPTS
+    submitted_by: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    created_at: float = field(default_factory=time.time)
+    available_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "IngestJob":
+        return cls(
+            job_id=row["job_id"],
+            tenant_id=row["tenant_id"],
+            payload=json.loads(row["payload"]),
+            priority=row["priority"],
+            status=JobStatus(row["status"]),
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            submitted_by=row["submitted_by"],
+            error=row["error"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            created_at=row["created_at"],
+            available_at=row["available_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "tenant_id": self.tenant_id,
+            "status": self.status.value,
+            "priority": self.priority,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "payload": self.payload,
+            "error": self.error,
+            "result": self.result,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+JobHandler = Callable[[IngestJob], Awaitable[Dict[str, Any]]]
+
+
+class JobQueue:
+    """Durable job queue processed by a bounded pool of asyncio workers
+
+    Jobs survive process crashes: a running job holds a lease that its worker keeps
+    renewing, and jobs whose lease expired are handed out again. Claims happen in
+    an IMMEDIATE transaction, so several processes can share one database file.
+
+    Scheduling picks the highest priority first; among tenants with work at that
+    priority, the one with the fewest running jobs (then the least recently served)
+    wins, and tenants at their concurrency limit are skipped. A bulk upload from one
+    tenant therefore cannot monopolise the pool.
+    """
+
+    def __init__(
+        self,
+        handler: JobHandler,
+        db_path: str = JOB_DB_PATH,
+        workers: int = INGEST_WORKERS,
+        per_tenant_concurrency: int = PER_TENANT_CONCURRENCY,
+        max_attempts: int = MAX_ATTEMPTS,
+        retry_backoff: float = RETRY_BACKOFF_SECONDS,
+        lease_seconds: float = LEASE_SECONDS,
+        poll_interval: float = 1.0,
+        non_retryable: tuple = NON_RETRYABLE_ERRORS
+    ):
+        self.handler = handler
+        self.db_path = db_path
+        self.workers = max(1, workers)
+        self.per_tenant_concurrency = max(1, per_tenant_concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.non_retryable = non_retryable
+
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._last_served: Dict[str, float] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    # Synchronous database operations (run in a thread from async code)
+
+    def _insert(self, job: IngestJob):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO ingest_jobs (
+                    job_id, tenant_id, submitted_by, payload, priority, status,
+                    attempts, max_attempts, created_at, available_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job.job_id, job.tenant_id, job.submitted_by,
+                    json.dumps(job.payload, default=str), job.priority,
+                    job.status.value, job.attempts, job.max_attempts,
+                    job.created_at, job.available_at,
+                ),
+            )
+
+    def _claim_next(self) -> Optional[IngestJob]:
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Hand out again jobs whose worker died without finishing
+                conn.execute(
+                    """
+                    UPDATE ingest_jobs SET status = ?, available_at = ?
+                    WHERE status = ? AND lease_expires_at < ?
+                    """,
+                    (JobStatus.QUEUED.value, now, JobStatus.RUNNING.value, now),
+                )
+
+                running = {
+                    row["tenant_id"]: row["n"]
+                    for row in conn.execute(
+                        "SELECT tenant_id, COUNT(*) AS n FROM ingest_jobs WHERE status = ? GROUP BY tenant_id",
+                        (JobStatus.RUNNING.value,),
+                    )
+                }
+                candidates = [
+                    (row["tenant_id"], row["top_priority"])
+                    for row in conn.execute(
+                        """
+                        SELECT tenant_id, MAX(priority) AS top_priority FROM ingest_jobs
+                        WHERE status = ? AND available_at <= ?
+                        GROUP BY tenant_id
+                        """,
+                        (JobStatus.QUEUED.value, now),
+                    )
+                    if running.get(row["tenant_id"], 0) < self.per_tenant_concurrency
+                ]
+                if not candidates:
+                    conn.execute("COMMIT")
+                    return None
+
+                tenant_id, _ = min(
+                    candidates,
+                    key=lambda c: (-c[1], running.get(c[0], 0), self._last_served.get(c[0], 0.0)),
+                )
+                row = conn.execute(
+                    """
+                    SELECT * FROM ingest_jobs
+                    WHERE status = ? AND available_at <= ? AND tenant_id = ?
+                    ORDER BY priority DESC, created_at ASC
+                    LIMIT 1
+                    """,
+                    (JobStatus.QUEUED.value, now, tenant_id),
+                ).fetchone()
+                conn.execute(
+                    """
+                    UPDATE ingest_jobs
+                    SET status = ?, attempts = attempts + 1, started_at = ?, lease_expires_at = ?
+                    WHERE job_id = ?
+                    """,
+                    (JobStatus.RUNNING.value, now, now + self.lease_seconds, row["job_id"]),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        self._last_served[tenant_id] = now
+        job = IngestJob.from_row(row)
+        job.status = JobStatus.RUNNING
+        job.attempts += 1
+        job.started_at = now
+        return job
+
+    def _renew_lease(self, job_id: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE ingest_jobs SET lease_expires_at = ? WHERE job_id = ? AND status = ?",
+                (time.time() + self.lease_seconds, job_id, JobStatus.RUNNING.value),
+            )
+
+    def _complete(self, job: IngestJob, result: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE ingest_jobs
+                SET status = ?, result = ?, error = NULL, finished_at = ?, lease_expires_at = NULL
+                WHERE job_id = ?
+                """,
+                (JobStatus.SUCCEEDED.value, json.dumps(result, default=str), time.time(), job.job_id),
+            )
+
+    def _fail(self, job: IngestJob, error: str, retryable: bool = True):
+        now = time.time()
+        with self._lock:
+            if retryable and job.attempts < job.max_attempts:
+                delay = self.retry_backoff * (2 ** (job.attempts - 1))
+                self._conn.execute(
+                    """
+                    UPDATE ingest_jobs
+                    SET status = ?, error = ?, available_at = ?, lease_expires_at = NULL
+                    WHERE job_id = ?
+                    """,
+                    (JobStatus.QUEUED.value, error, now + delay, job.job_id),
+                )
+                logger.warning(f"Ingest job {job.job_id} failed (attempt {job.attempts}), retrying in {delay:.0f}s: {error}")
+            else:
+                self._conn.execute(
+                    """
+                    UPDATE ingest_jobs
+                    SET status = ?, error = ?, finished_at = ?, lease_expires_at = NULL
+                    WHERE job_id = ?
+                    """,
+                    (JobStatus.FAILED.value, error, now, job.job_id),
+                )
+                reason = f"after {job.attempts} attempts" if retryable else "(not retryable)"
+                logger.error(f"Ingest job {job.job_id} failed permanently {reason}: {error}")
+
+    def _release(self, job: IngestJob):
+        """Put an interrupted job back without counting the attempt"""
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE ingest_jobs
+                SET status = ?, attempts = attempts - 1, available_at = ?, lease_expires_at = NULL
+                WHERE job_id = ?
+                """,
+                (JobStatus.QUEUED.value, time.time(), job.job_id),
+            )
+
+    def _get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM ingest_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return IngestJob.from_row(row) if row else None
+
+    def _metrics(self, window_seconds: float) -> Dict[str, Any]:
+        if window_seconds <= 0:
+            raise ValueError("window_seconds must be positive")
+        since = time.time() - window_seconds
+        with self._lock:
+            counts = {
+                row["status"]: row["n"]
+                for row in self._conn.execute("SELECT status, COUNT(*) AS n FROM ingest_jobs GROUP BY status")
+            }
+            recent = self._conn.execute(
+                """
+                SELECT COUNT(*) AS n,
+                       AVG(finished_at - started_at) AS avg_run,
+                       AVG(started_at - created_at) AS avg_wait
+                FROM ingest_jobs WHERE status = ? AND finished_at >= ?
+                """,
+                (JobStatus.SUCCEEDED.value, since),
+            ).fetchone()
+            failed_recent = self._conn.execute(
+                "SELECT COUNT(*) AS n FROM ingest_jobs WHERE status = ? AND finished_at >= ?",
+                (JobStatus.FAILED.value, since),
+            ).fetchone()["n"]
+            chunk_rows = self._conn.execute(
+                "SELECT result FROM ingest_jobs WHERE status = ? AND finished_at >= ?",
+                (JobStatus.SUCCEEDED.value, since),
+            ).fetchall()
+
+        chunks = 0
+        for row in chunk_rows:
+            try:
+                chunks += int(json.loads(row["result"]).get("chunks_processed", 0))
+            except Exception:
+                continue
+
+        return {
+            "jobs_by_status": {status.value: counts.get(status.value, 0) for status in JobStatus},
+            "window_seconds": window_seconds,
+            "completed_in_window": recent["n"],
+            "failed_in_window": failed_recent,
+            "jobs_per_minute": recent["n"] / (window_seconds / 60),
+            "chunks_per_second": chunks / window_seconds,
+            "avg_run_seconds": recent["avg_run"],
+            "avg_queue_wait_seconds": recent["avg_wait"],
+            "workers": self.workers,
+            "per_tenant_concurrency": self.per_tenant_concurrency,
+        }
+
+    # Async API
+
+    async def enqueue(
+        self,
+        tenant_id: str,
+        payload: Dict[str, Any],
+        priority: int = 0,
+        submitted_by: Optional[str] = None
+    ) -> IngestJob:
+        """Persist a new job and wake a worker"""
+        job = IngestJob(
+            job_id=uuid.uuid4().hex,
+            tenant_id=tenant_id,
+            payload=payload,
+            priority=priority,
+            max_attempts=self.max_attempts,
+            submitted_by=submitted_by,
+        )
+        await asyncio.to_thread(self._insert, job)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        logger.info(f"Queued ingest job {job.job_id} for tenant {tenant_id}")
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[IngestJob]:
+        """Get a job by ID"""
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def get_metrics(self, window_seconds: float = 300.0) -> Dict[str, Any]:
+        """Queue depth and throughput over a trailing window"""
+        return await asyncio.to_thread(self._metrics, window_seconds)
+
+    async def start(self):
+        """Start the worker pool"""
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"ingest-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} ingest workers")
+
+    async def stop(self):
+        """Stop the worker pool; interrupted jobs are re-queued"""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Stopped ingest workers")
+
+    async def _worker(self, index: int):
+        while not self._stopping:
+            try:
+                job = await asyncio.to_thread(self._claim_next)
+            except Exception as e:
+                logger.error(f"Ingest worker {index} failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Recording a failure failed (e.g. database locked): put the job back,
+                # or leave it to be handed out again once its lease expires
+                logger.error(f"Ingest worker {index} failed to record job {job.job_id}: {e}")
+                try:
+                    await asyncio.to_thread(self._release, job)
+                except Exception:
+                    pass
+
+    async def _keep_lease(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await asyncio.to_thread(self._renew_lease, job_id)
+
+    async def _run(self, job: IngestJob):
+        lease = asyncio.create_task(self._keep_lease(job.job_id))
+        try:
+            result = await self.handler(job)
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self._release, job)
+            raise
+        except Exception as e:
+            retryable = not isinstance(e, self.non_retryable)
+            await asyncio.to_thread(self._fail, job, str(e), retryable)
+        else:
+            await self._record_completion(job, result or {})
+            logger.info(f"Ingest job {job.job_id} completed")
+        finally:
+            lease.cancel()
+
+    async def _record_completion(self, job: IngestJob, result: Dict[str, Any]):
+        """Mark a job done, retrying until the write succeeds
+
+        The handler's side effects have already happened, so the job must not be
+        released and run again just because the database was briefly unavailable.
+        The lease is still being renewed meanwhile.
+        """
+        delay = 0.5
+        while True:
+            try:
+                await asyncio.to_thread(self._complete, job, result)
+                return
+            except Exception as e:
+                logger.error(f"Failed to record completion of ingest job {job.job_id}, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.lease_seconds / 3)
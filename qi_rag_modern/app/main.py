@@ -6,30 +6,31 @@ Built with FastAPI, ChromaDB, LangChain, and Supabase
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
-from typing import AsyncGenerator, Dict, List, Optional
+import os
+from typing import TYPE_CHECKING, AsyncGenerator, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Request
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
 import uvicorn
 
 from .auth import get_current_user, User
-from .rag_engine import RAGEngine
-from .document_processor import DocumentProcessor
-from .config import Settings
-from .modular_architecture import modular_arch, AppMode
-from .glassmorphism_ui import glassmorphism_ui, GlassEffect, GlowEffect
+from .container import Container
+from .metrics import registry, stream_metrics
+from .streaming import sse_response
+from .tracing import trace_middleware, traces
+from .modular_architecture import get_modular_arch
+from .glassmorphism_ui import get_glassmorphism_ui, GlassEffect, GlowEffect
+
+if TYPE_CHECKING:
+    from .multimodal_retriever import MultimodalRetriever
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize settings
-settings = Settings()
-
 # Initialize FastAPI app
 app = FastAPI(
     title="Modern RAG API",
@@ -46,9 +47,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize core components
-rag_engine = RAGEngine()
-document_processor = DocumentProcessor()
+# Trace every request; stage timings feed the /metrics histograms
+app.middleware("http")(trace_middleware)
+
+# Optional bearer token required to scrape /metrics
+METRICS_TOKEN = os.getenv("QI_RAG_METRICS_TOKEN")
+
+# Core components are built lazily and shared
+container = Container()
+
+@app.on_event("startup")
+async def start_ingest_workers():
+    await container.ingest_queue.start()
+
+@app.on_event("shutdown")
+async def stop_ingest_workers():
+    if container.is_initialized("ingest_queue"):
+        await container.ingest_queue.stop()
 
 # Pydantic models
 class ChatRequest(BaseModel):
@@ -62,14 +77,22 @@ class ChatResponse(BaseModel):
     sources: List[Dict]
     metadata: Dict
 
+class MultimodalChatRequest(BaseModel):
+    message: str = Field(..., min_length=1, max_length=10000)
+    client_id: Optional[str] = None
+    use_streaming: bool = True
+    k: int = Field(default=5, ge=1, le=20)
+
 class DocumentUploadRequest(BaseModel):
     file_path: str
     client_id: str
     document_type: Optional[str] = "general"
+    priority: int = Field(default=0, ge=-10, le=10)
 
 class DocumentUploadResponse(BaseModel):
     status: str
     document_id: str
+    job_id: str
     chunks_processed: int
 
 class HealthResponse(BaseModel):
@@ -81,7 +104,7 @@ async def health_check():
     """Health check endpoint"""
     try:
         # Check ChromaDB connection
-        chroma_status = "healthy" if rag_engine.is_connected() else "unhealthy"
+        chroma_status = "healthy" if container.rag_engine.is_connected() else "unhealthy"
         
         return HealthResponse(
             status="healthy",
@@ -98,22 +121,27 @@ async def health_check():
 @app.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
+    http_request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    """Chat endpoint with optional streaming"""
+    """Chat endpoint with optional SSE streaming"""
     try:
         # Use authenticated user's client_id if not provided
         client_id = request.client_id or current_user.client_id
         
         if request.use_streaming:
-            # Return streaming response
-            return StreamingResponse(
-                stream_chat_response(request.message, client_id, request.max_tokens),
-                media_type="text/plain"
+            # Return streaming response; generation stops if the client disconnects
+            return sse_response(
+                container.rag_engine.stream_chat(
+                    message=request.message,
+                    client_id=client_id,
+                    max_tokens=request.max_tokens
+                ),
+                http_request
             )
         else:
             # Return regular response
-            response = await rag_engine.chat(
+            response = await container.rag_engine.chat(
                 message=request.message,
                 client_id=client_id,
                 max_tokens=request.max_tokens
@@ -124,48 +152,124 @@ async def chat(
         logger.error(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-async def stream_chat_response(
-    message: str, 
-    client_id: str, 
-    max_tokens: int
-) -> AsyncGenerator[str, None]:
-    """Stream chat response token by token"""
+def _format_sources(docs: List) -> List[Dict]:
+    """Summarize retrieved documents for API responses"""
+    return [
+        {
+            "content": doc.page_content[:150] + "...",
+            "metadata": doc.metadata
+        }
+        for doc in docs
+    ]
+
+@app.post("/multimodal/chat", response_model=ChatResponse)
+async def multimodal_chat(
+    request: MultimodalChatRequest,
+    http_request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """Multimodal chat endpoint with optional SSE streaming"""
     try:
-        async for chunk in rag_engine.stream_chat(
-            message=message,
-            client_id=client_id,
-            max_tokens=max_tokens
-        ):
-            yield f"data: {json.dumps(chunk)}\n\n"
+        # Use authenticated user's client_id if not provided
+        client_id = request.client_id or current_user.client_id
+        retriever = container.multimodal_retriever(client_id)
+        docs = await retriever.retrieve_relevant_documents(request.message, k=request.k)
         
-        yield "data: [DONE]\n\n"
+        if request.use_streaming:
+            return sse_response(
+                stream_multimodal_chunks(retriever, request.message, docs),
+                http_request
+            )
+        
+        answer = await retriever.generate_multimodal_response(request.message, docs)
+        return ChatResponse(
+            answer=answer,
+            sources=_format_sources(docs),
+            metadata={
+                "client_id": client_id,
+                "multimodal": retriever.multimodal_llm is not None
+            }
+        )
         
     except Exception as e:
-        logger.error(f"Streaming error: {e}")
-        yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        logger.error(f"Multimodal chat error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def stream_multimodal_chunks(
+    retriever: "MultimodalRetriever",
+    message: str,
+    docs: List
+) -> AsyncGenerator[Dict, None]:
+    """Sources followed by the streamed multimodal answer"""
+    yield {
+        "type": "sources",
+        "sources": _format_sources(docs)
+    }
+    async for chunk in retriever.stream_multimodal_response(message, docs):
+        yield chunk
+
+@app.get("/metrics/streaming")
+async def get_streaming_metrics(
+    limit: int = 50,
+    current_user: User = Depends(get_current_user)
+):
+    """Get time-to-first-token and throughput metrics for streamed generations"""
+    return {
+        "summary": stream_metrics.summary(),
+        "recent": stream_metrics.recent(limit)
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_prometheus_metrics(request: Request):
+    """Per-stage latency histograms in Prometheus text format"""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/traces")
+async def list_traces(
+    limit: int = 50,
+    current_user: User = Depends(get_current_user)
+):
+    """Get recent request traces for the current tenant"""
+    return {"traces": traces.recent(tenant=current_user.client_id, limit=limit)}
+
+@app.get("/metrics/traces/{trace_id}")
+async def get_trace(
+    trace_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get the stage timings of a single request"""
+    trace = traces.get(trace_id)
+    if trace is None or trace.tenant != current_user.client_id:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.to_dict()
 
 @app.post("/ingest", response_model=DocumentUploadResponse)
 async def ingest_document(
     request: DocumentUploadRequest,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
-    """Ingest a document into the RAG system"""
+    """Queue a document for ingestion into the RAG system"""
     try:
         # Use authenticated user's client_id if not provided
         client_id = request.client_id or current_user.client_id
         
-        # Start background processing
-        background_tasks.add_task(
-            document_processor.process_document,
-            file_path=request.file_path,
-            client_id=client_id,
-            document_type=request.document_type
+        job = await container.ingest_queue.enqueue(
+            tenant_id=client_id,
+            payload={
+                "file_path": request.file_path,
+                "client_id": client_id,
+                "document_type": request.document_type
+            },
+            priority=request.priority,
+            submitted_by=current_user.client_id
         )
         
         return DocumentUploadResponse(
-            status="processing",
-            document_id=f"doc_{client_id}_{hash(request.file_path)}",
+            status=job.status.value,
+            document_id=job.job_id,
+            job_id=job.job_id,
             chunks_processed=0
         )
         
@@ -173,6 +277,39 @@ async def ingest_document(
         logger.error(f"Ingest error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/ingest/metrics")
+async def get_ingest_metrics(
+    window_seconds: float = Query(300.0, gt=0),
+    current_user: User = Depends(get_current_user)
+):
+    """Get ingestion queue depth and throughput"""
+    try:
+        return await container.ingest_queue.get_metrics(window_seconds)
+    except Exception as e:
+        logger.error(f"Ingest metrics error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/ingest/{job_id}")
+async def get_ingest_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get the status of an ingestion job"""
+    try:
+        job = await container.ingest_queue.get_job(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        
+        if current_user.client_id not in (job.tenant_id, job.submitted_by):
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        return job.to_dict()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Ingest job status error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/documents/{client_id}")
 async def list_documents(
     client_id: str,
@@ -184,7 +321,7 @@ async def list_documents(
         if current_user.client_id != client_id:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        documents = await document_processor.list_documents(client_id)
+        documents = await container.document_processor.list_documents(client_id)
         return {"documents": documents}
         
     except Exception as e:
@@ -203,7 +340,7 @@ async def delete_document(
         if current_user.client_id != client_id:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        await document_processor.delete_document(client_id, document_id)
+        await container.document_processor.delete_document(client_id, document_id)
         return {"status": "deleted"}
         
     except Exception as e:
@@ -223,7 +360,7 @@ async def get_3d_visualization(
         if current_user.client_id != client_id:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        viz_data = await rag_engine.get_3d_visualization_data(client_id, method)
+        viz_data = await container.rag_engine.get_3d_visualization_data(client_id, method)
         return viz_data
         
     except Exception as e:
@@ -242,7 +379,7 @@ async def get_query_visualization(
         if current_user.client_id != client_id:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        viz_data = await rag_engine.get_query_visualization(query, client_id)
+        viz_data = await container.rag_engine.get_query_visualization(query, client_id)
         return viz_data
         
     except Exception as e:
@@ -265,7 +402,7 @@ async def list_available_apps(
 ):
     """List available mini-apps for the current tenant"""
     try:
-        apps = modular_arch.get_available_apps(current_user.client_id)
+        apps = get_modular_arch(container.state_backend).get_available_apps(current_user.client_id)
         return {
             "apps": [
                 {
@@ -294,7 +431,7 @@ async def create_app_instance(
 ):
     """Create a new instance of a mini-app"""
     try:
-        instance = modular_arch.create_app_instance(
+        instance = get_modular_arch(container.state_backend).create_app_instance(
             app_name=app_name,
             tenant_id=current_user.client_id,
             config=config or {}
@@ -320,7 +457,7 @@ async def list_app_instances(
 ):
     """List app instances for the current tenant"""
     try:
-        instances = modular_arch.get_tenant_instances(current_user.client_id)
+        instances = get_modular_arch(container.state_backend).get_tenant_instances(current_user.client_id)
         return {
             "instances": [
                 {
@@ -347,14 +484,14 @@ async def update_app_config(
 ):
     """Update configuration for an app instance"""
     try:
-        instance = modular_arch.get_app_instance(instance_id)
+        instance = get_modular_arch(container.state_backend).get_app_instance(instance_id)
         if not instance:
             raise HTTPException(status_code=404, detail="Instance not found")
         
         if instance.tenant_id != current_user.client_id:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        success = modular_arch.update_app_config(instance_id, config)
+        success = get_modular_arch(container.state_backend).update_app_config(instance_id, config)
         if not success:
             raise HTTPException(status_code=400, detail="Failed to update config")
         
@@ -372,14 +509,14 @@ async def remove_app_instance(
 ):
     """Remove an app instance"""
     try:
-        instance = modular_arch.get_app_instance(instance_id)
+        instance = get_modular_arch(container.state_backend).get_app_instance(instance_id)
         if not instance:
             raise HTTPException(status_code=404, detail="Instance not found")
         
         if instance.tenant_id != current_user.client_id:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        success = modular_arch.remove_app_instance(instance_id)
+        success = get_modular_arch(container.state_backend).remove_app_instance(instance_id)
         if not success:
             raise HTTPException(status_code=400, detail="Failed to remove instance")
         
@@ -396,7 +533,7 @@ async def get_ui_config(
 ):
     """Get UI configuration for orchestrated mode"""
     try:
-        ui_config = modular_arch.get_orchestrated_ui_config(current_user.client_id)
+        ui_config = get_modular_arch(container.state_backend).get_orchestrated_ui_config(current_user.client_id)
         return {"ui_config": ui_config}
     except Exception as e:
         logger.error(f"Error getting UI config: {e}")
@@ -410,7 +547,7 @@ async def execute_app_api(
 ):
     """Execute an API call to a mini-app endpoint"""
     try:
-        result = await modular_arch.execute_api_call(
+        result = await get_modular_arch(container.state_backend).execute_api_call(
             endpoint=endpoint,
             tenant_id=current_user.client_id,
             data=data
@@ -428,7 +565,7 @@ async def get_app_statistics(
 ):
     """Get statistics about the modular architecture"""
     try:
-        stats = modular_arch.get_app_statistics()
+        stats = get_modular_arch(container.state_backend).get_app_statistics()
         return stats
     except Exception as e:
         logger.error(f"Error getting app statistics: {e}")
@@ -442,7 +579,7 @@ async def get_glassmorphism_dashboard(
 ):
     """Get glassmorphism dashboard HTML"""
     try:
-        dashboard_html = glassmorphism_ui.generate_dashboard_template(theme)
+        dashboard_html = get_glassmorphism_ui().generate_dashboard_template(theme)
         return {"html": dashboard_html}
     except Exception as e:
         logger.error(f"Error generating dashboard: {e}")
@@ -454,7 +591,7 @@ async def get_glassmorphism_styles(
 ):
     """Get glassmorphism CSS styles"""
     try:
-        css_styles = glassmorphism_ui.generate_css_styles(theme)
+        css_styles = get_glassmorphism_ui().generate_css_styles(theme)
         return {"css": css_styles}
     except Exception as e:
         logger.error(f"Error generating styles: {e}")
@@ -464,7 +601,7 @@ async def get_glassmorphism_styles(
 async def get_glassmorphism_components():
     """Get React component templates"""
     try:
-        components = glassmorphism_ui.generate_react_components()
+        components = get_glassmorphism_ui().generate_react_components()
         return components
     except Exception as e:
         logger.error(f"Error generating components: {e}")
@@ -481,7 +618,7 @@ async def get_available_themes():
                 "accent_color": theme.accent_color,
                 "glow_color": theme.glow_color
             }
-            for name, theme in glassmorphism_ui.themes.items()
+            for name, theme in get_glassmorphism_ui().themes.items()
         }
         return {"themes": themes}
     except Exception as e:
@@ -495,7 +632,7 @@ async def get_card_styles(
 ):
     """Get glassmorphism card styles"""
     try:
-        styles = glassmorphism_ui.generate_card_styles(theme, effect)
+        styles = get_glassmorphism_ui().generate_card_styles(theme, effect)
         return {"styles": styles}
     except Exception as e:
         logger.error(f"Error generating card styles: {e}")
@@ -508,17 +645,22 @@ async def get_button_styles(
 ):
     """Get glassmorphism button styles"""
     try:
-        styles = glassmorphism_ui.generate_button_styles(theme, glow_effect)
+        styles = get_glassmorphism_ui().generate_button_styles(theme, glow_effect)
         return {"styles": styles}
     except Exception as e:
         logger.error(f"Error generating button styles: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
+    # Several workers need a shared state backend (QI_RAG_STATE_BACKEND=sqlite)
+    workers = int(os.getenv("QI_RAG_WORKERS", "1"))
+    if workers > 1 and os.getenv("QI_RAG_STATE_BACKEND", "memory") == "memory":
+        logger.warning("Running several workers with the in-memory state backend; caches and app instances will not be shared")
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        workers=workers,
+        reload=workers == 1,
         log_level="info"
     )
@@ -0,0 +1,270 @@
+"""
+Runtime Metrics for the RAG System
+Tracks time-to-first-token and token throughput for streamed generations, and
+per-stage latency histograms exported in Prometheus text format
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the tiktoken encoding used for token counting (if available)"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken not available, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in a piece of text, falling back to a 4-chars-per-token estimate"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most max_tokens tokens"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * 4]
+
+
+@dataclass
+class StreamMetrics:
+    """Timing information for a single streamed generation"""
+    provider: str
+    client_id: Optional[str] = None
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    started_at: float = field(default_factory=time.perf_counter)
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    tokens: int = 0
+    chunks: int = 0
+    error: Optional[str] = None
+
+    def record_chunk(self, text: str):
+        """Record a chunk of generated text"""
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.chunks += 1
+        self.tokens += count_tokens(text)
+
+    def finish(self, error: Optional[str] = None):
+        """Mark the generation as finished"""
+        self.finished_at = time.perf_counter()
+        self.error = error
+
+    @property
+    def time_to_first_token_ms(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return (self.first_token_at - self.started_at) * 1000
+
+    @property
+    def total_time_ms(self) -> Optional[float]:
+        if self.finished_at is None:
+            return None
+        return (self.finished_at - self.started_at) * 1000
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Generation throughput measured from the first token to the end of the stream"""
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        generation_time = self.finished_at - self.first_token_at
+        if generation_time <= 0:
+            return None
+        return self.tokens / generation_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "provider": self.provider,
+            "client_id": self.client_id,
+            "time_to_first_token_ms": self.time_to_first_token_ms,
+            "total_time_ms": self.total_time_ms,
+            "tokens": self.tokens,
+            "chunks": self.chunks,
+            "tokens_per_second": self.tokens_per_second,
+            "error": self.error,
+        }
+
+
+# Latency buckets in seconds, from cache hits up to slow LLM generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """Cumulative histogram with labels, rendered in Prometheus text format"""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any):
+        """Record one observation"""
+        key = tuple(str(labels.get(name) or "") for name in self.labelnames)
+        with self._lock:
+            # Per-bucket counts followed by the running sum and total count
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        """Render all series as Prometheus exposition lines"""
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            labels = [f'{name}="{_escape_label(value)}"' for name, value in zip(self.labelnames, key)]
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                bucket_labels = ",".join(labels + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative:g}")
+            bucket_labels = ",".join(labels + ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{{{bucket_labels}}} {values[-1]:g}")
+            suffix = "{" + ",".join(labels) + "}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {values[-2]}")
+            lines.append(f"{self.name}_count{suffix} {values[-1]:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics served by the /metrics endpoint"""
+
+    def __init__(self):
+        self._metrics: List[Histogram] = []
+
+    def register(self, metric: Histogram) -> Histogram:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render every registered metric in Prometheus text format"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and pipeline histograms
+registry = MetricsRegistry()
+stage_latency = registry.register(Histogram(
+    "qi_rag_stage_duration_seconds",
+    "Latency of RAG pipeline stages",
+    labelnames=("stage", "tenant")
+))
+time_to_first_token = registry.register(Histogram(
+    "qi_rag_time_to_first_token_seconds",
+    "Time from request to the first generated token",
+    labelnames=("provider", "tenant")
+))
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class StreamMetricsRecorder:
+    """Keeps a bounded history of stream metrics and summarizes it"""
+
+    def __init__(self, max_history: int = 1000):
+        self._history: Deque[StreamMetrics] = deque(maxlen=max_history)
+
+    def record(self, metrics: StreamMetrics):
+        """Record a finished generation"""
+        self._history.append(metrics)
+        if metrics.time_to_first_token_ms is not None:
+            time_to_first_token.observe(
+                metrics.time_to_first_token_ms / 1000,
+                provider=metrics.provider,
+                tenant=metrics.client_id
+            )
+        logger.info(
+            f"Stream {metrics.request_id} ({metrics.provider}): "
+            f"ttft={metrics.time_to_first_token_ms}ms tokens={metrics.tokens} "
+            f"tps={metrics.tokens_per_second}"
+        )
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get the most recent generations, newest first"""
+        return [m.to_dict() for m in list(self._history)[-limit:][::-1]]
+
+    def summary(self) -> Dict[str, Any]:
+        """Summarize recorded generations per provider"""
+        providers: Dict[str, Dict[str, Any]] = {}
+        for metrics in self._history:
+            bucket = providers.setdefault(metrics.provider, {"ttft": [], "tps": [], "count": 0, "errors": 0})
+            bucket["count"] += 1
+            if metrics.error:
+                bucket["errors"] += 1
+            if metrics.time_to_first_token_ms is not None:
+                bucket["ttft"].append(metrics.time_to_first_token_ms)
+            if metrics.tokens_per_second is not None:
+                bucket["tps"].append(metrics.tokens_per_second)
+
+        return {
+            provider: {
+                "requests": bucket["count"],
+                "errors": bucket["errors"],
+                "ttft_ms_p50": _percentile(bucket["ttft"], 50),
+                "ttft_ms_p95": _percentile(bucket["ttft"], 95),
+                "tokens_per_second_avg": (
+                    sum(bucket["tps"]) / len(bucket["tps"]) if bucket["tps"] else None
+                ),
+            }
+            for provider, bucket in providers.items()
+        }
+
+
+# Global recorder for streamed generations
+stream_metrics = StreamMetricsRecorder()
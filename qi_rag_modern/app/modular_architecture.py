@@ -9,6 +9,7 @@ import asyncio
 import json
 import logging
 import os
+import uuid
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Union, Callable
@@ -16,6 +17,7 @@ from dataclasses import dataclass, field
 from enum import Enum
 
 from .config import Settings
+from .state_backend import StateBackend, create_state_backend
 
 logger = logging.getLogger(__name__)
 
@@ -54,10 +56,11 @@ class AppInstance:
 class ModularArchitecture:
     """Modular architecture manager for QiLife-Eos"""
     
-    def __init__(self):
+    def __init__(self, state_backend: Optional[StateBackend] = None):
         self.settings = Settings()
         self.apps: Dict[str, MiniAppManifest] = {}
-        self.instances: Dict[str, AppInstance] = {}
+        # App instances live in the state backend so every worker sees the same registry
+        self.state = state_backend or create_state_backend()
         self.component_registry: Dict[str, Callable] = {}
         self.api_registry: Dict[str, Callable] = {}
         
@@ -134,7 +137,7 @@ class ModularArchitecture:
             raise ValueError(f"Mini-app '{app_name}' not found")
         
         manifest = self.apps[app_name]
-        instance_id = f"{app_name}_{tenant_id}_{datetime.now().timestamp()}"
+        instance_id = f"{app_name}_{tenant_id}_{uuid.uuid4().hex[:12]}"
         
         instance = AppInstance(
             manifest=manifest,
@@ -143,38 +146,81 @@ class ModularArchitecture:
             config=config or {}
         )
         
-        self.instances[instance_id] = instance
+        self._save_instance(instance)
         logger.info(f"Created app instance: {instance_id}")
         
         return instance
     
+    def _save_instance(self, instance: AppInstance):
+        """Store an app instance in the state backend"""
+        self.state.set(f"instance:{instance.tenant_id}:{instance.instance_id}", {
+            "app_name": instance.manifest.name,
+            "instance_id": instance.instance_id,
+            "tenant_id": instance.tenant_id,
+            "config": instance.config,
+            "status": instance.status,
+            "created_at": instance.created_at.isoformat(),
+            "last_accessed": instance.last_accessed.isoformat()
+        })
+        self.state.set(f"instance_tenant:{instance.instance_id}", instance.tenant_id)
+    
+    def _load_instance(self, data: Dict) -> Optional[AppInstance]:
+        """Rebuild an app instance from its stored form"""
+        manifest = self.apps.get(data["app_name"])
+        if manifest is None:
+            logger.warning(f"Instance {data['instance_id']} refers to unknown mini-app: {data['app_name']}")
+            return None
+        return AppInstance(
+            manifest=manifest,
+            instance_id=data["instance_id"],
+            tenant_id=data["tenant_id"],
+            config=data["config"],
+            status=data["status"],
+            created_at=datetime.fromisoformat(data["created_at"]),
+            last_accessed=datetime.fromisoformat(data["last_accessed"])
+        )
+    
+    def _instance_key(self, instance_id: str) -> Optional[str]:
+        tenant_id = self.state.get(f"instance_tenant:{instance_id}")
+        return f"instance:{tenant_id}:{instance_id}" if tenant_id is not None else None
+    
+    def _all_instances(self, prefix: str = "instance:") -> List[AppInstance]:
+        instances = (self._load_instance(data) for data in self.state.items(prefix).values())
+        return [instance for instance in instances if instance is not None]
+    
     def get_app_instance(self, instance_id: str) -> Optional[AppInstance]:
         """Get an app instance by ID"""
-        return self.instances.get(instance_id)
+        key = self._instance_key(instance_id)
+        data = self.state.get(key) if key else None
+        return self._load_instance(data) if data else None
     
     def get_tenant_instances(self, tenant_id: str) -> List[AppInstance]:
         """Get all instances for a tenant"""
         return [
-            instance for instance in self.instances.values()
+            instance for instance in self._all_instances(f"instance:{tenant_id}:")
             if instance.tenant_id == tenant_id
         ]
     
     def update_app_config(self, instance_id: str, config: Dict) -> bool:
         """Update configuration for an app instance"""
-        if instance_id not in self.instances:
+        instance = self.get_app_instance(instance_id)
+        if instance is None:
             return False
         
-        self.instances[instance_id].config.update(config)
-        self.instances[instance_id].last_accessed = datetime.now()
+        instance.config.update(config)
+        instance.last_accessed = datetime.now()
+        self._save_instance(instance)
         logger.info(f"Updated config for instance: {instance_id}")
         return True
     
     def remove_app_instance(self, instance_id: str) -> bool:
         """Remove an app instance"""
-        if instance_id not in self.instances:
+        key = self._instance_key(instance_id)
+        if key is None or self.state.get(key) is None:
             return False
         
-        del self.instances[instance_id]
+        self.state.delete(key)
+        self.state.delete(f"instance_tenant:{instance_id}")
         logger.info(f"Removed app instance: {instance_id}")
         return True
     
@@ -293,11 +339,12 @@ class ModularArchitecture:
     
     def get_app_statistics(self) -> Dict:
         """Get statistics about the modular architecture"""
-        total_instances = len(self.instances)
+        instances = self._all_instances()
+        total_instances = len(instances)
         instances_by_app = {}
         instances_by_tenant = {}
         
-        for instance in self.instances.values():
+        for instance in instances:
             # Count by app
             app_name = instance.manifest.name
             instances_by_app[app_name] = instances_by_app.get(app_name, 0) + 1
@@ -357,4 +404,21 @@ class MiniAppManager:
         return self.manifest.mode in [AppMode.ORCHESTRATED, AppMode.HYBRID]
 
 # Global modular architecture instance
-modular_arch = ModularArchitecture()
+_modular_arch: Optional[ModularArchitecture] = None
+
+def get_modular_arch(state_backend: Optional[StateBackend] = None) -> ModularArchitecture:
+    """Get the global instance, loading mini-apps on first use
+
+    The first call decides the state backend; pass the container's so instances
+    share its store instead of opening another one.
+    """
+    global _modular_arch
+    if _modular_arch is None:
+        _modular_arch = ModularArchitecture(state_backend)
+    return _modular_arch
+
+def __getattr__(name: str):
+    # Keep `modular_arch` importable without building it at import time
+    if name == "modular_arch":
+        return get_modular_arch()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
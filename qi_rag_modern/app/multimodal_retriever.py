@@ -8,46 +8,58 @@ from __future__ import annotations
 import asyncio
 import logging
 import uuid
-from typing import Dict, List, Optional, Any, Union
+from typing import AsyncGenerator, Dict, List, Optional, Any, Tuple, Union
 from pathlib import Path
 
 from langchain.retrievers.multi_vector import MultiVectorRetriever
 from langchain.storage import InMemoryStore
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
 from langchain.schema import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 
 from .config import Settings
+from .providers import create_chat_model, create_embeddings, uses_remote_models
+from .metrics import StreamMetrics, stream_metrics
 
 logger = logging.getLogger(__name__)
 
 class MultimodalRetriever:
     """Multi-vector retriever for handling multimodal content"""
     
-    def __init__(self, client_id: str):
-        self.settings = Settings()
+    def __init__(
+        self,
+        client_id: str,
+        settings: Optional[Settings] = None,
+        embedding_model: Optional[Any] = None,
+        text_llm: Optional[Any] = None,
+        chroma_client: Optional[Any] = None,
+        docstore: Optional[Any] = None,
+        use_gemini: Optional[bool] = None
+    ):
+        self.settings = settings or Settings()
         self.client_id = client_id
         
         # Initialize embedding model
-        self.embedding_model = OpenAIEmbeddings(
-            openai_api_key=self.settings.openai_api_key,
-            model="text-embedding-3-small"
-        )
+        self.embedding_model = embedding_model or create_embeddings(self.settings)
+        
+        # Multimodal LLM, initialized on first use (skipped with offline providers)
+        self._multimodal_llm = None
+        self._multimodal_llm_loaded = not (uses_remote_models() if use_gemini is None else use_gemini)
         
-        # Initialize multimodal LLM
-        self.multimodal_llm = None
-        self._initialize_multimodal_llm()
+        # Text LLM used when Gemini is unavailable
+        self.text_llm = text_llm or create_chat_model(self.settings)
         
-        # Initialize vector store and document store
+        # Initialize vector store and document store. Both are process-local unless a
+        # persistent client and docstore are passed in (multi-worker deployments)
         self.vectorstore = Chroma(
+            client=chroma_client,
             collection_name=f"client-{client_id}-multimodal",
             embedding_function=self.embedding_model,
         )
         
-        self.docstore = InMemoryStore()
+        self.docstore = docstore if docstore is not None else InMemoryStore()
         
         # Create multi-vector retriever
         self.retriever = MultiVectorRetriever(
@@ -55,9 +67,14 @@ class MultimodalRetriever:
             docstore=self.docstore,
             id_key="doc_id",
         )
-        
-        # Initialize multimodal LLM for final response generation
-        self._initialize_multimodal_llm()
+    
+    @property
+    def multimodal_llm(self):
+        """Multimodal LLM (Gemini), or None if unavailable"""
+        if not self._multimodal_llm_loaded:
+            self._multimodal_llm_loaded = True
+            self._initialize_multimodal_llm()
+        return self._multimodal_llm
     
     def _initialize_multimodal_llm(self):
         """Initialize multimodal LLM for final response generation"""
@@ -65,7 +82,7 @@ class MultimodalRetriever:
             # Try to initialize Google Gemini for multimodal responses
             import google.generativeai as genai
             genai.configure(api_key=self.settings.gemini_api_key)
-            self.multimodal_llm = genai.GenerativeModel('gemini-pro-vision')
+            self._multimodal_llm = genai.GenerativeModel('gemini-pro-vision')
             logger.info("Multimodal LLM (Gemini) initialized successfully")
         except ImportError:
             logger.warning("Google Gemini not available for multimodal LLM")
@@ -273,6 +290,71 @@ class MultimodalRetriever:
             logger.error(f"Error retrieving documents: {e}")
             raise
     
+    def _build_multimodal_prompt(
+        self, 
+        query: str, 
+        retrieved_docs: List[Document]
+    ) -> Tuple[str, List[str]]:
+        """Build the multimodal prompt and collect image paths from retrieved documents"""
+        text_content = []
+        image_paths = []
+        
+        for doc in retrieved_docs:
+            doc_type = doc.metadata.get("type", "text")
+            
+            if doc_type == "text":
+                text_content.append(doc.page_content)
+            elif doc_type == "image":
+                image_paths.append(doc.page_content)
+                if "image_summary" in doc.metadata:
+                    text_content.append(f"Image: {doc.metadata['image_summary']}")
+            elif doc_type == "video":
+                if "video_summary" in doc.metadata:
+                    text_content.append(f"Video: {doc.metadata['video_summary']}")
+            elif doc_type == "audio":
+                if "audio_transcript" in doc.metadata:
+                    text_content.append(f"Audio: {doc.metadata['audio_transcript']}")
+        
+        # Combine text content
+        combined_text = "\n\n".join(text_content)
+        
+        prompt = f"""You are a helpful AI assistant with access to multimodal content.
+
+Context from retrieved documents:
+{combined_text}
+
+User Question: {query}
+
+Please provide a comprehensive answer based on the available text, image, video, and audio content. If the content includes images, videos, or audio files, reference them appropriately in your response."""
+        
+        return prompt, image_paths
+    
+    def _build_text_prompt(self, query: str, retrieved_docs: List[Document]) -> str:
+        """Build the prompt used by the text-only fallback"""
+        context = "\n\n".join([doc.page_content for doc in retrieved_docs])
+        return f"""Based on the following context, answer the user's question:
+
+Context:
+{context}
+
+Question: {query}
+
+Answer:"""
+    
+    def _load_images(self, image_paths: List[str]) -> List[Any]:
+        """Load images for the multimodal LLM"""
+        if not image_paths:
+            return []
+        
+        from PIL import Image
+        images = []
+        for img_path in image_paths[:3]:  # Limit to 3 images for performance
+            try:
+                images.append(Image.open(img_path))
+            except Exception as e:
+                logger.warning(f"Could not load image {img_path}: {e}")
+        return images
+    
     async def generate_multimodal_response(
         self, 
         query: str, 
@@ -284,58 +366,13 @@ class MultimodalRetriever:
                 # Fallback to text-only response
                 return await self._generate_text_response(query, retrieved_docs)
             
-            # Prepare multimodal content
-            text_content = []
-            image_paths = []
-            video_paths = []
-            audio_paths = []
+            prompt, image_paths = self._build_multimodal_prompt(query, retrieved_docs)
+            images = self._load_images(image_paths)
             
-            for doc in retrieved_docs:
-                doc_type = doc.metadata.get("type", "text")
-                
-                if doc_type == "text":
-                    text_content.append(doc.page_content)
-                elif doc_type == "image":
-                    image_paths.append(doc.page_content)
-                    if "image_summary" in doc.metadata:
-                        text_content.append(f"Image: {doc.metadata['image_summary']}")
-                elif doc_type == "video":
-                    video_paths.append(doc.page_content)
-                    if "video_summary" in doc.metadata:
-                        text_content.append(f"Video: {doc.metadata['video_summary']}")
-                elif doc_type == "audio":
-                    audio_paths.append(doc.page_content)
-                    if "audio_transcript" in doc.metadata:
-                        text_content.append(f"Audio: {doc.metadata['audio_transcript']}")
-            
-            # Combine text content
-            combined_text = "\n\n".join(text_content)
-            
-            # Create multimodal prompt
-            prompt = f"""You are a helpful AI assistant with access to multimodal content.
-
-Context from retrieved documents:
-{combined_text}
-
-User Question: {query}
-
-Please provide a comprehensive answer based on the available text, image, video, and audio content. If the content includes images, videos, or audio files, reference them appropriately in your response."""
-
             # Generate response
-            if image_paths and self.multimodal_llm:
-                # Load and include images in the response
-                from PIL import Image
-                images = []
-                for img_path in image_paths[:3]:  # Limit to 3 images for performance
-                    try:
-                        img = Image.open(img_path)
-                        images.append(img)
-                    except Exception as e:
-                        logger.warning(f"Could not load image {img_path}: {e}")
-                
-                if images:
-                    response = self.multimodal_llm.generate_content([prompt, *images])
-                    return response.text
+            if images:
+                response = self.multimodal_llm.generate_content([prompt, *images])
+                return response.text
             
             # Text-only response
             response = self.multimodal_llm.generate_content(prompt)
@@ -353,26 +390,94 @@ Please provide a comprehensive answer based on the available text, image, video,
     ) -> str:
         """Generate a text-only response as fallback"""
         try:
-            # Combine document content
-            context = "\n\n".join([doc.page_content for doc in retrieved_docs])
-            
-            # Simple prompt for text response
-            prompt = f"""Based on the following context, answer the user's question:
-
-Context:
-{context}
-
-Question: {query}
-
-Answer:"""
-            
-            # For now, return a simple response
-            # In a full implementation, you'd use a text LLM here
-            return f"Based on the retrieved documents, here's what I found:\n\n{context[:500]}..."
+            prompt = self._build_text_prompt(query, retrieved_docs)
+            response = await self.text_llm.ainvoke(prompt)
+            return response.content
             
         except Exception as e:
             logger.error(f"Error generating text response: {e}")
-            return "I'm sorry, I couldn't generate a response at this time."
+            if not retrieved_docs:
+                return "I'm sorry, I couldn't generate a response at this time."
+            # Without an LLM, return the most relevant context verbatim
+            context = "\n\n".join([doc.page_content for doc in retrieved_docs])
+            return f"Based on the retrieved documents, here's what I found:\n\n{context[:500]}..."
+    
+    async def _stream_gemini_response(
+        self, 
+        query: str, 
+        retrieved_docs: List[Document]
+    ) -> AsyncGenerator[str, None]:
+        """Stream text from Gemini as it is generated"""
+        prompt, image_paths = self._build_multimodal_prompt(query, retrieved_docs)
+        images = self._load_images(image_paths)
+        contents = [prompt, *images] if images else prompt
+        
+        response = await self.multimodal_llm.generate_content_async(contents, stream=True)
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety metadata) are skipped
+                continue
+            if text:
+                yield text
+    
+    async def _stream_text_response(
+        self, 
+        query: str, 
+        retrieved_docs: List[Document]
+    ) -> AsyncGenerator[str, None]:
+        """Stream text from the OpenAI text LLM as it is generated"""
+        prompt = self._build_text_prompt(query, retrieved_docs)
+        async for chunk in self.text_llm.astream(prompt):
+            if chunk.content:
+                yield chunk.content
+    
+    async def stream_multimodal_response(
+        self, 
+        query: str, 
+        retrieved_docs: List[Document]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream a multimodal response token by token
+        
+        Uses Gemini when available and falls back to the OpenAI text LLM if Gemini
+        is unavailable or fails before producing its first token. Time-to-first-token
+        and tokens per second are recorded for every request.
+        """
+        providers = []
+        if self.multimodal_llm:
+            providers.append(("gemini", self._stream_gemini_response))
+        providers.append(("openai", self._stream_text_response))
+        
+        for position, (provider, stream_fn) in enumerate(providers):
+            metrics = StreamMetrics(provider=provider, client_id=self.client_id)
+            try:
+                async for text in stream_fn(query, retrieved_docs):
+                    metrics.record_chunk(text)
+                    yield {
+                        "type": "content",
+                        "content": text
+                    }
+            except Exception as e:
+                has_fallback = position < len(providers) - 1
+                if metrics.first_token_at is None and has_fallback:
+                    logger.warning(f"Streaming with {provider} failed before first token, falling back: {e}")
+                    continue
+                
+                logger.error(f"Error streaming multimodal response: {e}")
+                metrics.finish(error=str(e))
+                stream_metrics.record(metrics)
+                yield {"type": "error", "error": str(e)}
+                return
+            
+            metrics.finish()
+            stream_metrics.record(metrics)
+            yield {
+                "type": "metrics",
+                "metrics": metrics.to_dict()
+            }
+            yield {"type": "done"}
+            return
     
     async def create_multimodal_rag_chain(self):
         """Create a multimodal RAG chain"""
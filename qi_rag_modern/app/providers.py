@@ -0,0 +1,198 @@
+"""
+Model Providers
+Builds the embedding and chat models selected by configuration, including local
+stand-ins (hashing embeddings, a simulated LLM) for offline load testing
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from .config import Settings
+
+logger = logging.getLogger(__name__)
+
+# "openai" or "hashing"
+EMBEDDINGS_PROVIDER = os.getenv("QI_RAG_EMBEDDINGS_PROVIDER", "openai")
+# "openai" or "simulated"
+LLM_PROVIDER = os.getenv("QI_RAG_LLM_PROVIDER", "openai")
+
+HASHING_DIM = int(os.getenv("QI_RAG_HASHING_DIM", "384"))
+SIM_EMBED_LATENCY_MS = float(os.getenv("QI_RAG_SIM_EMBED_MS", "0"))
+SIM_FIRST_TOKEN_MS = float(os.getenv("QI_RAG_SIM_FIRST_TOKEN_MS", "300"))
+SIM_TOKEN_MS = float(os.getenv("QI_RAG_SIM_TOKEN_MS", "20"))
+SIM_OUTPUT_TOKENS = int(os.getenv("QI_RAG_SIM_OUTPUT_TOKENS", "64"))
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _shared_hashing_embedder(dim: int) -> Any:
+    """The hashing embedder of the repository-level shared.benchmarking harness"""
+    try:
+        from shared.benchmarking import HashingEmbedder
+    except ImportError:
+        sys.path.append(str(Path(__file__).resolve().parents[2]))
+        from shared.benchmarking import HashingEmbedder
+    return HashingEmbedder(dim=dim)
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings, no model or network needed
+
+    The vectors come from the benchmark harness's hashing embedder (each token
+    hashed to a signed dimension, L2 normalized); this adds the LangChain
+    interface and simulated latency.
+    """
+
+    def __init__(self, dim: int = HASHING_DIM, latency_ms: float = SIM_EMBED_LATENCY_MS):
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self._hasher = _shared_hashing_embedder(dim)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._hasher.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return self._hasher.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class SimulatedChatModel(BaseChatModel):
+    """Chat model that streams a deterministic answer with configurable latency
+
+    The answer is built from words of the prompt, so its length and content are
+    repeatable, and tokens arrive after `first_token_latency_ms` and then every
+    `token_latency_ms`, like a remote model would. `max_tokens` passed through
+    `bind()` or the call limits the output.
+    """
+
+    first_token_latency_ms: float = SIM_FIRST_TOKEN_MS
+    token_latency_ms: float = SIM_TOKEN_MS
+    output_tokens: int = SIM_OUTPUT_TOKENS
+
+    @property
+    def _llm_type(self) -> str:
+        return "simulated"
+
+    def _tokens(self, messages: List[BaseMessage], max_tokens: Optional[int]) -> List[str]:
+        prompt = " ".join(str(message.content) for message in messages)
+        words = _TOKEN_RE.findall(prompt) or ["simulated"]
+        count = min(self.output_tokens, max_tokens) if max_tokens else self.output_tokens
+        return ["Simulated"] + [f" {words[i % len(words)]}" for i in range(max(0, count - 1))]
+
+    def _delays(self, count: int) -> Iterator[float]:
+        for i in range(count):
+            yield (self.first_token_latency_ms if i == 0 else self.token_latency_ms) / 1000
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._tokens(messages, kwargs.get("max_tokens"))
+        time.sleep(sum(self._delays(len(tokens))))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._tokens(messages, kwargs.get("max_tokens"))
+        await asyncio.sleep(sum(self._delays(len(tokens))))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        tokens = self._tokens(messages, kwargs.get("max_tokens"))
+        for token, delay in zip(tokens, self._delays(len(tokens))):
+            time.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = self._tokens(messages, kwargs.get("max_tokens"))
+        for token, delay in zip(tokens, self._delays(len(tokens))):
+            await asyncio.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def create_embeddings(settings: Optional[Settings] = None, provider: Optional[str] = None) -> Embeddings:
+    """Create the embedding model selected by QI_RAG_EMBEDDINGS_PROVIDER"""
+    provider = (provider or EMBEDDINGS_PROVIDER).lower()
+    if provider == "hashing":
+        logger.info("Using hashing embeddings (offline stand-in)")
+        return HashingEmbeddings()
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        settings = settings or Settings()
+        return OpenAIEmbeddings(
+            openai_api_key=settings.openai_api_key,
+            model="text-embedding-3-small"
+        )
+    raise ValueError(f"Unsupported embeddings provider: {provider}")
+
+
+def create_chat_model(settings: Optional[Settings] = None, provider: Optional[str] = None) -> BaseChatModel:
+    """Create the chat model selected by QI_RAG_LLM_PROVIDER"""
+    provider = (provider or LLM_PROVIDER).lower()
+    if provider == "simulated":
+        logger.info("Using simulated chat model (offline stand-in)")
+        return SimulatedChatModel()
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
+        settings = settings or Settings()
+        return ChatOpenAI(
+            openai_api_key=settings.openai_api_key,
+            model="gpt-3.5-turbo",
+            temperature=0.1,
+            streaming=True
+        )
+    raise ValueError(f"Unsupported LLM provider: {provider}")
+
+
+def uses_remote_models() -> bool:
+    """Whether remote multimodal models (Gemini) should be used"""
+    return LLM_PROVIDER.lower() != "simulated"
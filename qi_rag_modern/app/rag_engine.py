@@ -7,18 +7,17 @@ Includes UMAP, t-SNE, and PCA dimensionality reduction
 from __future__ import annotations
 
 import asyncio
+import copy
 import logging
+import time
 from typing import AsyncGenerator, Dict, List, Optional, Any, Tuple
 
 import numpy as np
-from sklearn.decomposition import PCA
-from sklearn.manifold import TSNE
-from sklearn.preprocessing import StandardScaler
 
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_core.runnables import RunnableLambda
 from langchain_chroma import Chroma
 from langchain_community.retrievers import BM25Retriever
 from langchain.retrievers import EnsembleRetriever
@@ -26,37 +25,46 @@ from langchain.schema import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from .config import Settings
+from .context_packing import CONTEXT_TOKEN_BUDGET, pack_context
+from .metrics import StreamMetrics, stream_metrics
+from .providers import create_chat_model, create_embeddings
+from .state_backend import StateBackend, create_state_backend
+from .tracing import observe_stage, span
 
 logger = logging.getLogger(__name__)
 
 class RAGEngine:
     """Modern RAG engine with hybrid search and advanced 3D visualization capabilities"""
     
-    def __init__(self):
-        self.settings = Settings()
-        self.embeddings = OpenAIEmbeddings(
-            openai_api_key=self.settings.openai_api_key,
-            model="text-embedding-3-small"
-        )
-        self.llm = ChatOpenAI(
-            openai_api_key=self.settings.openai_api_key,
-            model="gpt-3.5-turbo",
-            temperature=0.1,
-            streaming=True
-        )
+    def __init__(
+        self,
+        settings: Optional[Settings] = None,
+        embeddings: Optional[Any] = None,
+        llm: Optional[Any] = None,
+        chroma_client: Optional[Any] = None,
+        state_backend: Optional[StateBackend] = None,
+        context_token_budget: int = CONTEXT_TOKEN_BUDGET
+    ):
+        self.settings = settings or Settings()
+        self.embeddings = embeddings or create_embeddings(self.settings)
+        self.llm = llm or create_chat_model(self.settings)
+        self.context_token_budget = context_token_budget
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
             length_function=len,
         )
         
-        # Initialize ChromaDB client
-        self.chroma_client = None
-        self._initialize_chroma()
+        # Initialize ChromaDB client unless a shared one was provided
+        self.chroma_client = chroma_client
+        if self.chroma_client is None:
+            self._initialize_chroma()
         
-        # Cache for retrievers and visualizations
-        self._retriever_cache: Dict[str, Any] = {}
-        self._viz_cache: Dict[str, Dict] = {}
+        # Visualizations are cached in the (possibly shared) state backend. Retrievers
+        # hold BM25 indexes and cannot be serialized, so each worker keeps its own and
+        # rebuilds it when the client's corpus version in the backend changes
+        self.state = state_backend or create_state_backend()
+        self._retriever_cache: Dict[str, Tuple[int, Any]] = {}
         
         # Color palette for document types
         self.color_palette = {
@@ -92,6 +100,10 @@ class RAGEngine:
     
     def _create_hybrid_retriever(self, client_id: str) -> EnsembleRetriever:
         """Create hybrid retriever combining BM25 and ChromaDB"""
+        with span("retriever_build", tenant=client_id):
+            return self._build_hybrid_retriever(client_id)
+
+    def _build_hybrid_retriever(self, client_id: str) -> EnsembleRetriever:
         collection_name = self._get_collection_name(client_id)
         
         # Create ChromaDB vector store
@@ -103,7 +115,8 @@ class RAGEngine:
         
         # Get all documents from ChromaDB for BM25
         try:
-            all_docs = vectorstore.get()
+            with span("corpus_load", tenant=client_id):
+                all_docs = vectorstore.get()
             documents = []
             
             if all_docs and 'documents' in all_docs:
@@ -115,7 +128,8 @@ class RAGEngine:
                     ))
             
             # Create BM25 retriever
-            bm25_retriever = BM25Retriever.from_documents(documents)
+            with span("bm25_build", tenant=client_id):
+                bm25_retriever = BM25Retriever.from_documents(documents)
             bm25_retriever.k = 10  # Number of documents to retrieve
             
             # Create ChromaDB retriever
@@ -136,16 +150,44 @@ class RAGEngine:
             # Fallback to ChromaDB only
             return vectorstore.as_retriever(search_kwargs={"k": 10})
     
+    def _corpus_version(self, client_id: str) -> int:
+        """Get the client's corpus version, bumped whenever its documents change"""
+        return self.state.get(f"corpus_version:{client_id}") or 0
+
+    def _invalidate_client(self, client_id: str):
+        """Invalidate cached retrievers and visualizations for a client in all workers"""
+        self.state.incr(f"corpus_version:{client_id}")
+        self.state.delete_prefix(f"viz:{client_id}:")
+        self._retriever_cache.pop(client_id, None)
+
     def _get_retriever(self, client_id: str) -> Any:
         """Get or create retriever for a client"""
-        if client_id not in self._retriever_cache:
-            self._retriever_cache[client_id] = self._create_hybrid_retriever(client_id)
-        return self._retriever_cache[client_id]
+        version = self._corpus_version(client_id)
+        cached = self._retriever_cache.get(client_id)
+        if cached is None or cached[0] != version:
+            cached = (version, self._create_hybrid_retriever(client_id))
+            self._retriever_cache[client_id] = cached
+        return cached[1]
+    
+    def _pack_context(self, documents: List[Document], client_id: str) -> List[Document]:
+        with span("context_packing", tenant=client_id):
+            return pack_context(documents, self.context_token_budget)
     
-    def _create_rag_chain(self, client_id: str):
+    def _create_rag_chain(self, client_id: str, max_tokens: Optional[int] = None):
         """Create RAG chain for a client"""
         retriever = self._get_retriever(client_id)
         
+        # Retrieval (timed separately from generation) followed by context packing
+        def retrieve(inputs: Dict) -> List[Document]:
+            with span("retrieval", tenant=client_id):
+                documents = retriever.invoke(inputs["input"])
+            return self._pack_context(documents, client_id)
+        
+        async def aretrieve(inputs: Dict) -> List[Document]:
+            with span("retrieval", tenant=client_id):
+                documents = await retriever.ainvoke(inputs["input"])
+            return self._pack_context(documents, client_id)
+        
         # Create prompt template
         prompt = ChatPromptTemplate.from_template("""
 You are a helpful AI assistant with access to the following context documents.
@@ -161,13 +203,13 @@ Answer:""")
         
         # Create document chain
         document_chain = create_stuff_documents_chain(
-            llm=self.llm,
+            llm=self.llm.bind(max_tokens=max_tokens) if max_tokens else self.llm,
             prompt=prompt
         )
         
         # Create retrieval chain
         retrieval_chain = create_retrieval_chain(
-            retriever=retriever,
+            retriever=RunnableLambda(retrieve, afunc=aretrieve),
             combine_docs_chain=document_chain
         )
         
@@ -180,10 +222,16 @@ Answer:""")
         **kwargs
     ) -> np.ndarray:
         """Perform dimensionality reduction using various algorithms"""
+        # scikit-learn and UMAP are only needed for visualization, so load them here
+        from sklearn.decomposition import PCA
+        from sklearn.manifold import TSNE
+        from sklearn.preprocessing import StandardScaler
+        
         # Standardize embeddings for better results
         scaler = StandardScaler()
         embeddings_scaled = scaler.fit_transform(embeddings)
         
+        reducer = None
         if method.lower() == "umap":
             try:
                 import umap
@@ -199,18 +247,19 @@ Answer:""")
                 logger.warning("UMAP not available, falling back to t-SNE")
                 method = "tsne"
         
-        if method.lower() == "tsne":
-            reducer = TSNE(
-                n_components=3,
-                random_state=42,
-                perplexity=min(30, len(embeddings) - 1),
-                metric='cosine',
-                **kwargs
-            )
-        elif method.lower() == "pca":
-            reducer = PCA(n_components=3, random_state=42)
-        else:
-            raise ValueError(f"Unsupported dimensionality reduction method: {method}")
+        if reducer is None:
+            if method.lower() == "tsne":
+                reducer = TSNE(
+                    n_components=3,
+                    random_state=42,
+                    perplexity=min(30, len(embeddings) - 1),
+                    metric='cosine',
+                    **kwargs
+                )
+            elif method.lower() == "pca":
+                reducer = PCA(n_components=3, random_state=42)
+            else:
+                raise ValueError(f"Unsupported dimensionality reduction method: {method}")
         
         coords_3d = reducer.fit_transform(embeddings_scaled)
         return coords_3d
@@ -271,9 +320,11 @@ Answer:""")
         """Get advanced 3D visualization data for documents"""
         try:
             # Check cache first
-            cache_key = f"{client_id}_{method}"
-            if use_cache and cache_key in self._viz_cache:
-                return self._viz_cache[cache_key]
+            cache_key = f"viz:{client_id}:{method}"
+            if use_cache:
+                cached = self.state.get(cache_key)
+                if cached is not None:
+                    return cached
             
             collection_name = self._get_collection_name(client_id)
             collection = self.chroma_client.get_collection(collection_name)
@@ -361,9 +412,9 @@ Answer:""")
             for cluster_id, cluster_info in cluster_data.items():
                 count = cluster_info["count"]
                 center = [
-                    cluster_info["center"][0] / count,
-                    cluster_info["center"][1] / count,
-                    cluster_info["center"][2] / count
+                    float(cluster_info["center"][0] / count),
+                    float(cluster_info["center"][1] / count),
+                    float(cluster_info["center"][2] / count)
                 ]
                 clusters.append({
                     "id": cluster_id,
@@ -413,7 +464,7 @@ Answer:""")
             
             # Cache the result
             if use_cache:
-                self._viz_cache[cache_key] = result
+                self.state.set(cache_key, result)
             
             return result
             
@@ -452,8 +503,8 @@ Answer:""")
     ) -> Dict[str, Any]:
         """Get visualization data highlighting relevant documents for a query"""
         try:
-            # Get all visualization data
-            viz_data = await self.get_3d_visualization_data(client_id, method)
+            # Get all visualization data (copied, the cached entry must not be modified)
+            viz_data = copy.deepcopy(await self.get_3d_visualization_data(client_id, method))
             
             # Get relevant documents for the query
             retriever = self._get_retriever(client_id)
@@ -505,8 +556,8 @@ Answer:""")
     ) -> Dict[str, Any]:
         """Get AR-optimized visualization data"""
         try:
-            # Get base visualization data
-            viz_data = await self.get_3d_visualization_data(client_id, method)
+            # Get base visualization data (copied, the cached entry must not be modified)
+            viz_data = copy.deepcopy(await self.get_3d_visualization_data(client_id, method))
             
             # Optimize for AR display
             ar_data = {
@@ -567,19 +618,18 @@ Answer:""")
     ) -> Dict[str, Any]:
         """Chat with RAG system"""
         try:
-            chain = self._create_rag_chain(client_id)
+            with span("chain_setup", tenant=client_id):
+                chain = self._create_rag_chain(client_id, max_tokens=max_tokens)
             
             # Get response
-            response = await chain.ainvoke({
-                "input": message
-            })
-            
-            # Get sources from retriever
-            retriever = self._get_retriever(client_id)
-            docs = await retriever.aget_relevant_documents(message)
+            with span("rag_chain", tenant=client_id):
+                response = await chain.ainvoke({
+                    "input": message
+                })
             
+            # Sources are the packed documents the answer was generated from
             sources = []
-            for doc in docs[:5]:  # Top 5 sources
+            for doc in response.get("context", [])[:5]:  # Top 5 sources
                 sources.append({
                     "content": doc.page_content[:200] + "...",
                     "metadata": doc.metadata
@@ -606,19 +656,26 @@ Answer:""")
         max_tokens: int = 1000
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """Stream chat response"""
+        metrics = StreamMetrics(provider="openai-rag", client_id=client_id)
         try:
-            chain = self._create_rag_chain(client_id)
+            with span("chain_setup", tenant=client_id):
+                chain = self._create_rag_chain(client_id, max_tokens=max_tokens)
             
             # Stream response
+            context_at = None
             async for chunk in chain.astream({
                 "input": message
             }):
                 if "answer" in chunk:
+                    if metrics.first_token_at is None and context_at is not None:
+                        observe_stage("llm_first_token", time.perf_counter() - context_at, tenant=client_id)
+                    metrics.record_chunk(chunk["answer"])
                     yield {
                         "type": "content",
                         "content": chunk["answer"]
                     }
                 elif "context" in chunk:
+                    context_at = time.perf_counter()
                     # Send sources info
                     docs = chunk["context"]
                     sources = []
@@ -632,10 +689,19 @@ Answer:""")
                         "sources": sources
                     }
             
+            metrics.finish()
+            stream_metrics.record(metrics)
+            observe_stage("stream_total", metrics.total_time_ms / 1000, tenant=client_id)
+            yield {
+                "type": "metrics",
+                "metrics": metrics.to_dict()
+            }
             yield {"type": "done"}
             
         except Exception as e:
             logger.error(f"Stream chat error: {e}")
+            metrics.finish(error=str(e))
+            stream_metrics.record(metrics)
             yield {"type": "error", "error": str(e)}
     
     async def add_documents(
@@ -648,7 +714,8 @@ Answer:""")
             collection_name = self._get_collection_name(client_id)
             
             # Split documents
-            split_docs = self.text_splitter.split_documents(documents)
+            with span("split", tenant=client_id):
+                split_docs = self.text_splitter.split_documents(documents)
             
             # Add to ChromaDB
             vectorstore = Chroma(
@@ -657,17 +724,12 @@ Answer:""")
                 embedding_function=self.embeddings,
             )
             
-            # Add documents
-            vectorstore.add_documents(split_docs)
-            
-            # Clear caches for this client
-            if client_id in self._retriever_cache:
-                del self._retriever_cache[client_id]
+            # Add documents (embedding + upsert)
+            with span("embed_upsert", tenant=client_id):
+                vectorstore.add_documents(split_docs)
             
-            # Clear visualization cache
-            cache_keys_to_remove = [k for k in self._viz_cache.keys() if k.startswith(f"{client_id}_")]
-            for key in cache_keys_to_remove:
-                del self._viz_cache[key]
+            # Invalidate caches for this client
+            self._invalidate_client(client_id)
             
             logger.info(f"Added {len(split_docs)} chunks for client {client_id}")
             return len(split_docs)
@@ -684,14 +746,8 @@ Answer:""")
             # Delete collection
             self.chroma_client.delete_collection(collection_name)
             
-            # Clear caches
-            if client_id in self._retriever_cache:
-                del self._retriever_cache[client_id]
-            
-            # Clear visualization cache
-            cache_keys_to_remove = [k for k in self._viz_cache.keys() if k.startswith(f"{client_id}_")]
-            for key in cache_keys_to_remove:
-                del self._viz_cache[key]
+            # Invalidate caches for this client
+            self._invalidate_client(client_id)
             
             logger.info(f"Deleted documents for client {client_id}")
             return True
@@ -713,8 +769,6 @@ Answer:""")
     def clear_cache(self, client_id: Optional[str] = None):
         """Clear visualization cache"""
         if client_id:
-            cache_keys_to_remove = [k for k in self._viz_cache.keys() if k.startswith(f"{client_id}_")]
-            for key in cache_keys_to_remove:
-                del self._viz_cache[key]
+            self.state.delete_prefix(f"viz:{client_id}:")
         else:
-            self._viz_cache.clear()
+            self.state.delete_prefix("viz:")
@@ -0,0 +1,202 @@
+"""
+Pluggable State Backends
+Key-value storage for caches and registries, in process memory or shared across
+worker processes on one host through SQLite
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATE_BACKEND = os.getenv("QI_RAG_STATE_BACKEND", "memory")
+STATE_PATH = os.getenv("QI_RAG_STATE_PATH", "./qi_rag_state.sqlite3")
+# Multimodal document store directory used with a shared backend
+DOCSTORE_PATH = os.getenv("QI_RAG_DOCSTORE_PATH", "./multimodal_docstore")
+
+
+def _json_default(obj: Any) -> Any:
+    # numpy arrays and scalars, without importing numpy; anything else is an error
+    # rather than a string that would come back as a different type
+    if hasattr(obj, "tolist") and hasattr(obj, "dtype"):
+        return obj.tolist()
+    raise TypeError(f"State values must be JSON-serializable, got {type(obj).__name__}")
+
+
+class StateBackend(ABC):
+    """Key-value store for JSON-serializable values"""
+
+    #: Whether state is visible to other worker processes
+    shared: bool = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Get a value, or None if missing or expired"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a value, optionally expiring after ttl seconds"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Delete a value"""
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str):
+        """Delete every value whose key starts with prefix"""
+
+    @abstractmethod
+    def items(self, prefix: str = "") -> Dict[str, Any]:
+        """Get all live values whose key starts with prefix"""
+
+    @abstractmethod
+    def incr(self, key: str, amount: int = 1) -> int:
+        """Atomically increment an integer counter and return the new value"""
+
+
+class InMemoryStateBackend(StateBackend):
+    """Process-local state (single worker deployments)"""
+
+    shared = False
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] < time.time():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._live(key)
+        return entry[0] if entry else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def items(self, prefix: str = "") -> Dict[str, Any]:
+        with self._lock:
+            keys = [k for k in self._data if k.startswith(prefix)]
+            return {k: entry[0] for k in keys if (entry := self._live(k))}
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            entry = self._live(key)
+            value = (entry[0] if entry else 0) + amount
+            self._data[key] = (value, None)
+            return value
+
+
+class SQLiteStateBackend(StateBackend):
+    """State shared by all worker processes on one host through a SQLite file"""
+
+    shared = True
+
+    def __init__(self, path: str = STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL
+            )
+            """
+        )
+
+    @staticmethod
+    def _prefix_range(prefix: str) -> Tuple[str, str]:
+        # Keys in [prefix, prefix + U+10FFFF) start with prefix; this uses the primary key index
+        return prefix, prefix + "\U0010ffff"
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)",
+                (key, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, default=_json_default), expires_at),
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix: str):
+        low, high = self._prefix_range(prefix)
+        with self._lock:
+            self._conn.execute("DELETE FROM state WHERE key >= ? AND key < ?", (low, high))
+
+    def items(self, prefix: str = "") -> Dict[str, Any]:
+        low, high = self._prefix_range(prefix)
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT key, value FROM state
+                WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at >= ?)
+                """,
+                (low, high, time.time()),
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+                value = (json.loads(row[0]) if row else 0) + amount
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, NULL)",
+                    (key, json.dumps(value)),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return value
+
+
+def create_state_backend(kind: Optional[str] = None, path: Optional[str] = None) -> StateBackend:
+    """Create the state backend selected by QI_RAG_STATE_BACKEND ("memory" or "sqlite")"""
+    kind = (kind or STATE_BACKEND).lower()
+    if kind == "memory":
+        return InMemoryStateBackend()
+    if kind == "sqlite":
+        logger.info(f"Using shared SQLite state backend at {path or STATE_PATH}")
+        return SQLiteStateBackend(path or STATE_PATH)
+    raise ValueError(f"Unsupported state backend: {kind}")
@@ -0,0 +1,204 @@
+"""
+Server-Sent Events Streaming
+Relays LLM chunk streams to clients as SSE frames with keep-alives, chunk batching,
+backpressure and cancellation of the upstream generation on client disconnect
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Seconds of silence after which a keep-alive comment is sent
+HEARTBEAT_INTERVAL = float(os.getenv("QI_RAG_SSE_HEARTBEAT_SECONDS", "15"))
+# Content is flushed once this many characters are buffered...
+FLUSH_CHARS = int(os.getenv("QI_RAG_SSE_FLUSH_CHARS", "64"))
+# ...or once the oldest buffered chunk is this old
+FLUSH_INTERVAL = float(os.getenv("QI_RAG_SSE_FLUSH_MS", "50")) / 1000
+# Upstream chunks buffered before the producer is paused
+MAX_PENDING_CHUNKS = int(os.getenv("QI_RAG_SSE_MAX_PENDING", "256"))
+# Reconnection delay suggested to EventSource clients
+RETRY_MS = 3000
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx)
+}
+
+_END = object()
+
+
+def format_sse(data: Any, event_id: Optional[int] = None, event: Optional[str] = None) -> str:
+    """Format a single SSE event; dicts are JSON encoded"""
+    payload = data if isinstance(data, str) else json.dumps(data)
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    for line in payload.split("\n"):
+        lines.append(f"data: {line}")
+    return "\n".join(lines) + "\n\n"
+
+
+class StreamRelay:
+    """Pumps an upstream chunk generator to a client
+
+    The upstream generator runs in its own task and feeds a bounded queue, so a slow
+    client pauses generation instead of buffering unboundedly. Consecutive content
+    chunks are coalesced into a single frame, keep-alives are emitted during silence
+    and the upstream generation is cancelled as soon as the client goes away.
+    """
+
+    def __init__(
+        self,
+        source: AsyncGenerator[Dict[str, Any], None],
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+        flush_chars: int = FLUSH_CHARS,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_pending: int = MAX_PENDING_CHUNKS
+    ):
+        self.source = source
+        self.is_disconnected = is_disconnected
+        self.heartbeat_interval = heartbeat_interval
+        self.flush_chars = flush_chars
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.cancelled = False
+
+    async def _produce(self):
+        """Read the upstream generator into the queue"""
+        try:
+            async for chunk in self.source:
+                await self._queue.put(chunk)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Upstream stream error: {e}")
+            await self._queue.put({"type": "error", "error": str(e)})
+        finally:
+            await self.source.aclose()
+        await self._queue.put(_END)
+
+    async def _client_gone(self) -> bool:
+        if self.is_disconnected is None:
+            return False
+        try:
+            return await self.is_disconnected()
+        except Exception:
+            return True
+
+    async def batches(self) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """Yield batches of chunks to write; an empty batch is a keep-alive"""
+        loop = asyncio.get_running_loop()
+        producer = asyncio.create_task(self._produce())
+        buffer: List[str] = []
+        buffered_chars = 0
+        buffer_started = 0.0
+        last_sent = loop.time()
+
+        def flush() -> List[Dict[str, Any]]:
+            nonlocal buffer, buffered_chars
+            if not buffer:
+                return []
+            batch = [{"type": "content", "content": "".join(buffer)}]
+            buffer, buffered_chars = [], 0
+            return batch
+
+        try:
+            while True:
+                now = loop.time()
+                if buffer:
+                    timeout = max(0.0, buffer_started + self.flush_interval - now)
+                else:
+                    timeout = max(0.0, last_sent + self.heartbeat_interval - now)
+
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    if await self._client_gone():
+                        self.cancelled = True
+                        logger.info("Client disconnected, cancelling generation")
+                        return
+                    # Either the flush deadline or the heartbeat deadline passed
+                    yield flush()
+                    last_sent = loop.time()
+                    continue
+
+                if item is _END:
+                    batch = flush()
+                    if batch:
+                        yield batch
+                    return
+
+                if item.get("type") == "content":
+                    if not buffer:
+                        buffer_started = loop.time()
+                    buffer.append(item.get("content", ""))
+                    buffered_chars += len(item.get("content", ""))
+                    if buffered_chars < self.flush_chars:
+                        continue
+                    batch = flush()
+                else:
+                    batch = flush() + [item]
+
+                if await self._client_gone():
+                    self.cancelled = True
+                    logger.info("Client disconnected, cancelling generation")
+                    return
+                yield batch
+                last_sent = loop.time()
+        finally:
+            if not producer.done():
+                producer.cancel()
+            try:
+                await producer
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+async def sse_frames(relay: StreamRelay) -> AsyncGenerator[str, None]:
+    """Render relay batches as SSE text, one write per batch"""
+    event_id = 0
+    yield f"retry: {RETRY_MS}\n\n"
+    async for batch in relay.batches():
+        if not batch:
+            yield ": keep-alive\n\n"
+            continue
+        with span("serialization"):
+            frames = []
+            for chunk in batch:
+                event_id += 1
+                frames.append(format_sse(chunk, event_id=event_id))
+            payload = "".join(frames)
+        yield payload
+    if not relay.cancelled:
+        yield format_sse("[DONE]")
+
+
+def sse_response(
+    source: AsyncGenerator[Dict[str, Any], None],
+    request: Optional[Request] = None
+) -> StreamingResponse:
+    """Build a text/event-stream response for an upstream chunk generator"""
+    relay = StreamRelay(
+        source,
+        is_disconnected=request.is_disconnected if request is not None else None
+    )
+    return StreamingResponse(
+        sse_frames(relay),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
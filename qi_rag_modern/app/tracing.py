@@ -0,0 +1,170 @@
+"""
+Request Tracing for the RAG Pipeline
+Times pipeline stages as spans grouped under a per-request trace id and feeds
+them into the per-stage latency histograms
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from .metrics import stage_latency
+
+logger = logging.getLogger(__name__)
+
+TRACE_HEADER = "X-Trace-ID"
+# Client-supplied trace ids are only kept (as the trace's parent id) when they look like ids
+_TRACE_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+@dataclass
+class Span:
+    """A timed stage within a trace"""
+    stage: str
+    tenant: Optional[str]
+    offset_ms: float
+    duration_ms: float
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.stage,
+            "tenant": self.tenant,
+            "offset_ms": round(self.offset_ms, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "error": self.error,
+        }
+
+
+@dataclass
+class Trace:
+    """All spans recorded while handling one request or job"""
+    trace_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    tenant: Optional[str] = None
+    # Caller-supplied id (X-Trace-ID header, job id) linking the trace to outside work
+    parent_id: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    _started: float = field(default_factory=time.perf_counter)
+    spans: List[Span] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "tenant": self.tenant,
+            "parent_id": self.parent_id,
+            "started_at": self.started_at,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+class TraceRecorder:
+    """Keeps the most recent traces for inspection"""
+
+    def __init__(self, max_history: int = 500):
+        self.max_history = max_history
+        self._traces: OrderedDict[str, Trace] = OrderedDict()
+
+    def record(self, trace: Trace):
+        self._traces[trace.trace_id] = trace
+        self._traces.move_to_end(trace.trace_id)
+        while len(self._traces) > self.max_history:
+            self._traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        return self._traces.get(trace_id)
+
+    def recent(self, tenant: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get the most recent traces with at least one span, newest first"""
+        result = []
+        for trace in reversed(list(self._traces.values())):
+            if not trace.spans or (tenant is not None and trace.tenant != tenant):
+                continue
+            result.append(trace.to_dict())
+            if len(result) >= limit:
+                break
+        return result
+
+
+# Global trace history
+traces = TraceRecorder()
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("qi_rag_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    """Get the trace of the request being handled, if any"""
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(parent_id: Optional[str] = None) -> Iterator[Trace]:
+    """Start a trace; spans opened in this context (and tasks it spawns) join it
+
+    The trace id is always generated here, so callers cannot overwrite another
+    request's trace; an id they supply is kept as the parent id.
+    """
+    trace = Trace(parent_id=parent_id)
+    token = _current_trace.set(trace)
+    traces.record(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def observe_stage(stage: str, seconds: float, tenant: Optional[str] = None, error: Optional[str] = None):
+    """Record a stage duration measured elsewhere"""
+    trace = _current_trace.get()
+    if trace is not None:
+        if tenant is None:
+            tenant = trace.tenant
+        elif trace.tenant is None:
+            trace.tenant = tenant
+        end = time.perf_counter()
+        trace.spans.append(Span(
+            stage=stage,
+            tenant=tenant,
+            offset_ms=(end - seconds - trace._started) * 1000,
+            duration_ms=seconds * 1000,
+            error=error
+        ))
+    stage_latency.observe(seconds, stage=stage, tenant=tenant)
+    logger.debug(
+        f"[{trace.trace_id if trace else '-'}] {stage} tenant={tenant} took {seconds * 1000:.1f}ms"
+    )
+
+
+@contextmanager
+def span(stage: str, tenant: Optional[str] = None) -> Iterator[None]:
+    """Time a pipeline stage"""
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - start, tenant=tenant, error=error)
+
+
+async def trace_middleware(request, call_next):
+    """Run each HTTP request in its own trace and return the trace id in a header
+
+    An incoming X-Trace-ID is recorded as the trace's parent id, not reused.
+    """
+    parent_id = request.headers.get(TRACE_HEADER)
+    if parent_id and not _TRACE_ID_PATTERN.match(parent_id):
+        parent_id = None
+    with start_trace(parent_id) as trace:
+        response = await call_next(request)
+    response.headers[TRACE_HEADER] = trace.trace_id
+    return response
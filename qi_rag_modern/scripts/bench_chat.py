@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""Load test the streaming chat pipeline with offline model stand-ins.
+
+Usage:
+    python scripts/bench_chat.py [--chunks 1k] [--requests 200] [--concurrency 16]
+
+A synthetic corpus is ingested with hashing embeddings, then concurrent
+``RAGEngine.stream_chat`` sessions run against the simulated chat model
+(latency set by QI_RAG_SIM_FIRST_TOKEN_MS / QI_RAG_SIM_TOKEN_MS or the flags
+below).  Reports time-to-first-token and total latency percentiles and the
+achieved request rate, without any API key or network access.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+# The benchmark harness lives in the repository-level ``shared`` package
+sys.path.insert(0, str(PROJECT_ROOT.parent))
+
+# Settings want a key even though nothing here calls OpenAI
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-unused")
+
+import chromadb
+from langchain.schema import Document
+
+from app.providers import HashingEmbeddings, SimulatedChatModel
+from app.rag_engine import RAGEngine
+from app.state_backend import InMemoryStateBackend
+from shared.benchmarking import (
+    Stopwatch,
+    SyntheticCorpus,
+    compare_reports,
+    latency_summary,
+    memory_snapshot,
+    parse_sizes,
+    write_report,
+)
+
+
+async def run(args: argparse.Namespace, n_chunks: int) -> Dict:
+    corpus = SyntheticCorpus(n_chunks=n_chunks, seed=args.seed)
+    engine = RAGEngine(
+        embeddings=HashingEmbeddings(),
+        llm=SimulatedChatModel(
+            first_token_latency_ms=args.first_token_ms,
+            token_latency_ms=args.token_ms,
+            output_tokens=args.output_tokens,
+        ),
+        chroma_client=chromadb.EphemeralClient(),
+        state_backend=InMemoryStateBackend(),
+    )
+    client_id = f"bench-chat-{n_chunks}"
+    documents = [
+        Document(page_content=text, metadata={"doc_id": doc_id, "file_type": "txt"})
+        for doc_id, chunks in corpus.iter_documents()
+        for text in chunks
+    ]
+    with Stopwatch() as ingest:
+        for start in range(0, len(documents), 1000):
+            await engine.add_documents(documents[start:start + 1000], client_id)
+    print(f"[{n_chunks} chunks] ingested in {ingest.elapsed:.1f}s")
+
+    questions = [question for question, _ in corpus.queries(args.requests)]
+    ttft: List[float] = []
+    totals: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def session(question: str) -> None:
+        nonlocal errors
+        async with semaphore:
+            async for chunk in engine.stream_chat(question, client_id):
+                if chunk["type"] == "metrics":
+                    metrics = chunk["metrics"]
+                    if metrics["time_to_first_token_ms"] is not None:
+                        ttft.append(metrics["time_to_first_token_ms"] / 1000)
+                    totals.append(metrics["total_time_ms"] / 1000)
+                elif chunk["type"] == "error":
+                    errors += 1
+
+    # Build the retriever once so the first sessions don't all race to do it
+    engine._get_retriever(client_id)
+    with Stopwatch() as wall:
+        await asyncio.gather(*(session(question) for question in questions))
+
+    await engine.delete_documents(client_id)
+    return {
+        "chunks": n_chunks,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "errors": errors,
+        "requests_per_second": args.requests / wall.elapsed if wall.elapsed else None,
+        "time_to_first_token": latency_summary(ttft),
+        "query_latency": latency_summary(totals),
+        "memory": memory_snapshot(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test RAGEngine.stream_chat with offline providers.")
+    parser.add_argument("--chunks", type=parse_sizes, default=parse_sizes("1k"), help="Corpus sizes in chunks, e.g. 1k,100k")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--first-token-ms", type=float, default=float(os.getenv("QI_RAG_SIM_FIRST_TOKEN_MS", "300")))
+    parser.add_argument("--token-ms", type=float, default=float(os.getenv("QI_RAG_SIM_TOKEN_MS", "20")))
+    parser.add_argument("--output-tokens", type=int, default=int(os.getenv("QI_RAG_SIM_OUTPUT_TOKENS", "64")))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Report path (default: bench_results/<name>-<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    results = [asyncio.run(run(args, n_chunks)) for n_chunks in args.chunks]
+    config = {key: value for key, value in vars(args).items() if key not in {"output", "compare"}}
+    output = write_report("qi_rag_modern-chat", config, results, args.output)
+
+    for result in results:
+        ttft, total = result["time_to_first_token"], result["query_latency"]
+        print(
+            f"{result['chunks']:>9} chunks | {result['requests_per_second']:.1f} req/s at concurrency "
+            f"{result['concurrency']} | ttft p50 {ttft['p50_ms']:.0f}ms p95 {ttft['p95_ms']:.0f}ms | "
+            f"total p50 {total['p50_ms']:.0f}ms p99 {total['p99_ms']:.0f}ms | errors {result['errors']}"
+        )
+    print(f"Report written to {output}")
+
+    if args.compare:
+        print(f"Compared with {args.compare}:")
+        for line in compare_reports(json.loads(args.compare.read_text()), json.loads(output.read_text())):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""Benchmark ingestion and hybrid retrieval of the RAG engine.
+
+Usage:
+    python scripts/bench_retrieval.py [--sizes 1k,100k,1M] [--queries 200] [--output report.json]
+
+For each corpus size a synthetic corpus is ingested through
+``RAGEngine.add_documents`` into an in-process ChromaDB, the BM25 + vector
+ensemble retriever is built and queried.  Embeddings come from a deterministic
+hashing embedder, so no API key or network access is needed.  The report
+contains ingest throughput, retriever build time, p50/p95/p99 query latency,
+memory use and recall@k, and can be compared with an earlier run through
+``--compare``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+# The benchmark harness lives in the repository-level ``shared`` package
+sys.path.insert(0, str(PROJECT_ROOT.parent))
+
+# Settings want a key even though nothing here calls OpenAI
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-unused")
+
+import chromadb
+from langchain.schema import Document
+
+from app.providers import SimulatedChatModel
+from app.rag_engine import RAGEngine
+from app.state_backend import InMemoryStateBackend
+from shared.benchmarking import (
+    HashingEmbedder,
+    Stopwatch,
+    SyntheticCorpus,
+    compare_reports,
+    latency_summary,
+    memory_snapshot,
+    parse_sizes,
+    recall_at_k,
+    write_report,
+)
+
+
+async def run_size(args: argparse.Namespace, n_chunks: int) -> Dict:
+    corpus = SyntheticCorpus(
+        n_chunks=n_chunks,
+        chunks_per_doc=args.chunks_per_doc,
+        words_per_chunk=args.words_per_chunk,
+        seed=args.seed,
+    )
+    engine = RAGEngine(
+        embeddings=HashingEmbedder(dim=args.dim),
+        llm=SimulatedChatModel(),
+        chroma_client=chromadb.EphemeralClient(),
+        state_backend=InMemoryStateBackend(),
+    )
+    client_id = f"bench-{n_chunks}"
+    memory_before = memory_snapshot()
+
+    print(f"[{n_chunks} chunks] ingesting {corpus.n_documents} documents")
+    batch: List[Document] = []
+    with Stopwatch() as ingest:
+        for doc_id, chunks in corpus.iter_documents():
+            for index, text in enumerate(chunks):
+                batch.append(Document(
+                    page_content=text,
+                    metadata={
+                        "chunk_id": doc_id * corpus.chunks_per_doc + index,
+                        "doc_id": doc_id,
+                        "file_type": "txt",
+                    },
+                ))
+            if len(batch) >= args.batch_size:
+                await engine.add_documents(batch, client_id)
+                batch = []
+        if batch:
+            await engine.add_documents(batch, client_id)
+    print(f"[{n_chunks} chunks] ingested in {ingest.elapsed:.1f}s")
+    memory_after_ingest = memory_snapshot()
+
+    # Loads the whole collection and builds the BM25 index
+    with Stopwatch() as build:
+        retriever = engine._get_retriever(client_id)
+
+    latencies: List[float] = []
+    ranked: List[List[int]] = []
+    expected: List[int] = []
+    for question, chunk_id in corpus.queries(args.queries):
+        with Stopwatch() as query:
+            docs = await retriever.ainvoke(question)
+        latencies.append(query.elapsed)
+        ranked.append([doc.metadata.get("chunk_id") for doc in docs])
+        expected.append(chunk_id)
+    memory_after_queries = memory_snapshot()
+
+    await engine.delete_documents(client_id)
+    return {
+        "chunks": n_chunks,
+        "documents": corpus.n_documents,
+        "ingest": {
+            "seconds": ingest.elapsed,
+            "chunks_per_second": n_chunks / ingest.elapsed if ingest.elapsed else None,
+        },
+        "retriever_build_seconds": build.elapsed,
+        "query_latency": latency_summary(latencies),
+        "quality": recall_at_k(ranked, expected, args.k),
+        "memory": {"before": memory_before, "after_ingest": memory_after_ingest, "after_queries": memory_after_queries},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark RAGEngine ingestion and hybrid retrieval.")
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes("1k"), help="Corpus sizes in chunks, e.g. 1k,100k,1M")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries per corpus size")
+    parser.add_argument("--k", type=lambda v: [int(k) for k in v.split(",")], default=[1, 5, 10], help="Cut-offs for recall@k")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Chunks per add_documents call")
+    parser.add_argument("--chunks-per-doc", type=int, default=10)
+    parser.add_argument("--words-per-chunk", type=int, default=48)
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Report path (default: bench_results/<name>-<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    results = [asyncio.run(run_size(args, n_chunks)) for n_chunks in args.sizes]
+    config = {key: value for key, value in vars(args).items() if key not in {"output", "compare"}}
+    output = write_report("qi_rag_modern-retrieval", config, results, args.output)
+
+    for result in results:
+        latency = result["query_latency"]
+        print(
+            f"{result['chunks']:>9} chunks | ingest {result['ingest']['chunks_per_second']:.0f} chunks/s | "
+            f"build {result['retriever_build_seconds']:.2f}s | "
+            f"p50 {latency['p50_ms']:.1f}ms p95 {latency['p95_ms']:.1f}ms p99 {latency['p99_ms']:.1f}ms | "
+            + " ".join(f"{key}={value:.3f}" for key, value in result["quality"].items())
+        )
+    print(f"Report written to {output}")
+
+    if args.compare:
+        print(f"Compared with {args.compare}:")
+        for line in compare_reports(json.loads(args.compare.read_text()), json.loads(output.read_text())):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
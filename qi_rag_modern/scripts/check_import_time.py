@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""Measure the cold import time of the API and fail if it exceeds a budget.
+
+Usage:
+    python scripts/check_import_time.py [--budget 1.5] [--runs 5]
+
+Each run imports ``app.main`` in a fresh interpreter.  The check fails when the
+median import time exceeds the budget, or when any module that should only be
+loaded on first use of a feature (scikit-learn, OpenCV, pandas, ...) is
+imported eagerly.  Exits with status 1 on failure so it can gate CI.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that must not be imported just by importing app.main
+LAZY_MODULES = [
+    "sklearn",
+    "umap",
+    "cv2",
+    "pandas",
+    "PIL",
+    "google.generativeai",
+    "langchain_community.document_loaders",
+    "chromadb",
+]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def measure_once() -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE % (LAZY_MODULES,)],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing app.main failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check app.main cold import time against a budget.")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=float(os.getenv("QI_RAG_IMPORT_BUDGET_SECONDS", "1.5")),
+        help="Maximum median import time in seconds",
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh-interpreter runs")
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.runs)]
+    median = statistics.median(r["seconds"] for r in runs)
+    loaded = sorted({name for r in runs for name in r["loaded"]})
+
+    print(f"app.main import: median {median:.3f}s over {args.runs} runs (budget {args.budget:.3f}s)")
+    failed = False
+    if median > args.budget:
+        print(f"FAIL: import time exceeds budget by {median - args.budget:.3f}s")
+        failed = True
+    if loaded:
+        print(f"FAIL: modules loaded eagerly: {', '.join(loaded)}")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Behaviour checks for the durable ingestion job queue.
+
+Covers claiming (priority and per-tenant fairness), retries with backoff,
+re-claiming jobs whose lease expired, failing non-retryable errors at once and
+not re-running a job whose completion could not be recorded straight away.
+Runs against a temporary SQLite file; no other service is needed.
+
+Usage:
+    python test_job_queue.py
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.job_queue import JobQueue, JobStatus
+
+
+async def _succeed(job):
+    return {"chunks_processed": 1}
+
+
+def make_queue(tmp, handler=_succeed, **kwargs):
+    kwargs.setdefault("poll_interval", 0.02)
+    return JobQueue(handler, db_path=str(Path(tmp) / "jobs.sqlite3"), **kwargs)
+
+
+async def run_until(queue, done, timeout=5.0):
+    """Run the workers until ``done()`` holds; returns whether it did."""
+    await queue.start()
+    try:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if await done():
+                return True
+            await asyncio.sleep(0.02)
+        return False
+    finally:
+        await queue.stop()
+
+
+def test_claim_order():
+    print("Testing claim order...")
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, per_tenant_concurrency=1)
+
+        async def enqueue():
+            low = await queue.enqueue("bulk", {"n": 1}, priority=0)
+            high = await queue.enqueue("bulk", {"n": 2}, priority=5)
+            other = await queue.enqueue("other", {"n": 3}, priority=0)
+            return low, high, other
+
+        low, high, other = asyncio.run(enqueue())
+        first = queue._claim_next()
+        assert first.job_id == high.job_id, "highest priority is claimed first"
+        assert first.status == JobStatus.RUNNING and first.attempts == 1
+        second = queue._claim_next()
+        assert second.job_id == other.job_id, "a tenant at its concurrency limit is skipped"
+        assert queue._claim_next() is None, "nothing claimable while both tenants are busy"
+        queue._complete(first, {})
+        assert queue._claim_next().job_id == low.job_id
+    print("✅ claims follow priority and per-tenant limits")
+
+
+def test_retry_then_success():
+    print("Testing retries...")
+    attempts = []
+
+    async def flaky(job):
+        attempts.append(job.attempts)
+        if len(attempts) < 3:
+            raise RuntimeError("temporary outage")
+        return {"chunks_processed": 4}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, handler=flaky, max_attempts=3, retry_backoff=0.01)
+
+        async def scenario():
+            job = await queue.enqueue("tenant", {})
+
+            async def done():
+                return (await queue.get_job(job.job_id)).status == JobStatus.SUCCEEDED
+
+            assert await run_until(queue, done), "job did not succeed"
+            return await queue.get_job(job.job_id)
+
+        job = asyncio.run(scenario())
+        assert attempts == [1, 2, 3], attempts
+        assert job.attempts == 3 and job.result == {"chunks_processed": 4} and job.error is None
+    print("✅ retryable errors are retried until the job succeeds")
+
+
+def test_retries_exhausted():
+    print("Testing exhausted retries...")
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, max_attempts=2, retry_backoff=60)
+        asyncio.run(queue.enqueue("tenant", {}))
+        job = queue._claim_next()
+        queue._fail(job, "boom")
+        assert queue._get(job.job_id).status == JobStatus.QUEUED
+        assert queue._claim_next() is None, "a retried job waits for its backoff"
+        queue._conn.execute("UPDATE ingest_jobs SET available_at = 0")
+        job = queue._claim_next()
+        assert job.attempts == 2
+        queue._fail(job, "boom")
+        stored = queue._get(job.job_id)
+        assert stored.status == JobStatus.FAILED and stored.error == "boom"
+    print("✅ jobs fail for good once max_attempts is used up")
+
+
+def test_non_retryable_error():
+    print("Testing non-retryable errors...")
+    calls = []
+
+    async def missing(job):
+        calls.append(job.job_id)
+        raise FileNotFoundError("upload.pdf")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, handler=missing, max_attempts=3, retry_backoff=0.01)
+
+        async def scenario():
+            job = await queue.enqueue("tenant", {})
+
+            async def done():
+                return (await queue.get_job(job.job_id)).status == JobStatus.FAILED
+
+            assert await run_until(queue, done), "job was not failed"
+            return await queue.get_job(job.job_id)
+
+        job = asyncio.run(scenario())
+        assert len(calls) == 1 and job.attempts == 1, "a non-retryable error must not be retried"
+    print("✅ non-retryable errors fail the job at once")
+
+
+def test_lease_expiry():
+    print("Testing lease expiry...")
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, lease_seconds=0.1)
+        asyncio.run(queue.enqueue("tenant", {}))
+        job = queue._claim_next()
+        assert queue._claim_next() is None, "a leased job is not handed out twice"
+        # The worker died: its lease is never renewed
+        time.sleep(0.2)
+        again = queue._claim_next()
+        assert again is not None and again.job_id == job.job_id and again.attempts == 2
+    print("✅ jobs whose lease expired are claimed again")
+
+
+def test_completion_write_retried():
+    print("Testing completion write failures...")
+    calls = []
+
+    async def handler(job):
+        calls.append(job.job_id)
+        return {"chunks_processed": 1}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, handler=handler)
+        complete, failures = queue._complete, [2]
+
+        def flaky_complete(job, result):
+            if failures[0]:
+                failures[0] -= 1
+                raise RuntimeError("database is locked")
+            complete(job, result)
+
+        queue._complete = flaky_complete
+
+        async def scenario():
+            job = await queue.enqueue("tenant", {})
+
+            async def done():
+                return (await queue.get_job(job.job_id)).status == JobStatus.SUCCEEDED
+
+            assert await run_until(queue, done), "completion was never recorded"
+            return await queue.get_job(job.job_id)
+
+        job = asyncio.run(scenario())
+        assert len(calls) == 1 and job.attempts == 1, "a finished job must not run again"
+    print("✅ a failed completion write is retried without re-running the job")
+
+
+def test_metrics_window():
+    print("Testing metrics window...")
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        assert queue._metrics(60)["window_seconds"] == 60
+        for window in (0, -1):
+            try:
+                queue._metrics(window)
+            except ValueError:
+                continue
+            raise AssertionError(f"window_seconds={window} accepted")
+    print("✅ metrics reject non-positive windows")
+
+
+if __name__ == "__main__":
+    test_claim_order()
+    test_retry_then_success()
+    test_retries_exhausted()
+    test_non_retryable_error()
+    test_lease_expiry()
+    test_completion_write_retried()
+    test_metrics_window()
@@ -0,0 +1,248 @@
+"""Helpers for offline retrieval benchmarks.
+
+The benchmark scripts of the RAG miniapps share this harness: a synthetic
+corpus that can be regenerated chunk by chunk from a seed (so even a million
+chunks never have to be held in memory), deterministic hashing embeddings
+that need no model download or network access, and the statistics written
+to the JSON reports (latency percentiles, memory, recall@k).
+
+Reports from two runs can be compared with :func:`compare_reports`.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import platform
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_SYLLABLES = [
+    "ka", "lo", "mi", "ra", "te", "su", "ven", "dor", "pli", "qua", "zen", "tor",
+    "ba", "ne", "shi", "gal", "mo", "rin", "fe", "ux", "dra", "pe", "lum", "cor",
+]
+_TOKEN_RE = re.compile(r"\w+")
+
+
+@dataclass
+class SyntheticCorpus:
+    """Deterministic corpus of pseudo-word chunks grouped into documents.
+
+    Word frequencies follow a Zipf distribution, so chunks share common words
+    the way natural text does while rarer words keep them distinguishable.
+    Chunk ``i`` always has the same text for a given seed, which is what lets
+    queries be generated (with their ground truth) without storing the corpus.
+    """
+
+    n_chunks: int
+    chunks_per_doc: int = 10
+    words_per_chunk: int = 48
+    vocab_size: int = 20000
+    seed: int = 0
+
+    def __post_init__(self) -> None:
+        rng = random.Random(self.seed)
+        vocab = set()
+        while len(vocab) < self.vocab_size:
+            vocab.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+        self.vocab: List[str] = sorted(vocab)
+        rng.shuffle(self.vocab)
+        self._cum_weights = list(accumulate(1.0 / (rank + 1) for rank in range(self.vocab_size)))
+
+    @property
+    def n_documents(self) -> int:
+        return math.ceil(self.n_chunks / self.chunks_per_doc)
+
+    def chunk_words(self, chunk_id: int) -> List[str]:
+        rng = random.Random(self.seed * 1_000_003 + chunk_id)
+        return rng.choices(self.vocab, cum_weights=self._cum_weights, k=self.words_per_chunk)
+
+    def chunk_text(self, chunk_id: int) -> str:
+        return " ".join(self.chunk_words(chunk_id))
+
+    def iter_documents(self) -> Iterator[Tuple[int, List[str]]]:
+        """Yield ``(doc_id, chunk_texts)``; chunk ids are ``doc_id * chunks_per_doc + index``."""
+        for doc_id in range(self.n_documents):
+            first = doc_id * self.chunks_per_doc
+            last = min(first + self.chunks_per_doc, self.n_chunks)
+            yield doc_id, [self.chunk_text(chunk_id) for chunk_id in range(first, last)]
+
+    def queries(self, n: int, words: int = 8) -> List[Tuple[str, int]]:
+        """Generate ``(query, source_chunk_id)`` pairs from words of random chunks."""
+        rng = random.Random(self.seed + 7919)
+        result = []
+        for _ in range(n):
+            chunk_id = rng.randrange(self.n_chunks)
+            chunk_words = list(dict.fromkeys(self.chunk_words(chunk_id)))
+            result.append((" ".join(rng.sample(chunk_words, min(words, len(chunk_words)))), chunk_id))
+        return result
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embeddings from hashed tokens.
+
+    Each token is hashed to a dimension and a sign; the summed vector is L2
+    normalised, so cosine similarity tracks token overlap.  Exposes both the
+    SentenceTransformer ``encode`` API and the LangChain ``embed_documents`` /
+    ``embed_query`` API.
+    """
+
+    def __init__(self, dim: int = 384) -> None:
+        self.dim = dim
+        self._cache: Dict[str, Tuple[int, float]] = {}
+
+    def _slot(self, token: str) -> Tuple[int, float]:
+        slot = self._cache.get(token)
+        if slot is None:
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            slot = (value % self.dim, 1.0 if value >> 63 else -1.0)
+            self._cache[token] = slot
+        return slot
+
+    def encode(self, texts: Sequence[str], **_: object) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in _TOKEN_RE.findall(text.lower()):
+                index, sign = self._slot(token)
+                vectors[row, index] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+
+def latency_summary(samples: Sequence[float]) -> Dict[str, Optional[float]]:
+    """Summarise latencies given in seconds as milliseconds."""
+    if not samples:
+        return {"count": 0, "mean_ms": None, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    values = np.asarray(samples, dtype=float) * 1000
+    return {
+        "count": int(values.size),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def memory_snapshot() -> Dict[str, Optional[float]]:
+    """Return current and peak resident memory of this process in MiB."""
+    rss = peak = None
+    try:
+        with open("/proc/self/statm") as fh:
+            rss = int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        peak = peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+    except ImportError:
+        pass
+    return {"rss_mib": rss, "peak_rss_mib": peak}
+
+
+def recall_at_k(ranked: Sequence[Sequence[int]], expected: Sequence[int], ks: Sequence[int]) -> Dict[str, float]:
+    """Fraction of queries whose expected chunk is among the first ``k`` results."""
+    if not expected:
+        return {f"recall@{k}": 0.0 for k in ks}
+    return {
+        f"recall@{k}": sum(1 for ids, want in zip(ranked, expected) if want in ids[:k]) / len(expected)
+        for k in ks
+    }
+
+
+class Stopwatch:
+    """Context manager measuring elapsed wall time in seconds."""
+
+    def __enter__(self) -> "Stopwatch":
+        self.elapsed = 0.0
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.elapsed = time.perf_counter() - self._start
+
+
+def parse_sizes(value: str) -> List[int]:
+    """Parse a comma separated list of sizes such as ``1k,100k,1M``."""
+    sizes = []
+    for part in value.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        factor = 1
+        if part[-1] in "km":
+            factor = 1000 if part[-1] == "k" else 1_000_000
+            part = part[:-1]
+        sizes.append(int(float(part) * factor))
+    return sizes
+
+
+def write_report(name: str, config: Dict, results: List[Dict], output: Optional[Path] = None) -> Path:
+    """Write a benchmark report as JSON and return its path.
+
+    Without an explicit ``output`` the report goes to
+    ``bench_results/<name>-<timestamp>.json`` in the working directory.
+    """
+    now = datetime.now(timezone.utc)
+    if output is None:
+        output = Path("bench_results") / f"{name}-{now.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        "benchmark": name,
+        "timestamp": now.isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": config,
+        "results": results,
+    }
+    output.write_text(json.dumps(report, indent=2))
+    return output
+
+
+def compare_reports(baseline: Dict, current: Dict) -> List[str]:
+    """Describe per-size changes in latency, throughput and recall between two reports."""
+    lines = []
+    previous = {result["chunks"]: result for result in baseline.get("results", [])}
+    for result in current.get("results", []):
+        old = previous.get(result["chunks"])
+        if old is None:
+            continue
+        lines.append(f"{result['chunks']} chunks:")
+        for section, key in [
+            ("ingest", "chunks_per_second"),
+            ("query_latency", "p50_ms"),
+            ("query_latency", "p95_ms"),
+            ("query_latency", "p99_ms"),
+        ]:
+            before, after = old.get(section, {}).get(key), result.get(section, {}).get(key)
+            if before and after is not None:
+                lines.append(f"  {section}.{key}: {before:.2f} -> {after:.2f} ({(after - before) / before:+.1%})")
+        for key, after in result.get("quality", {}).items():
+            before = old.get("quality", {}).get(key)
+            if before is not None:
+                lines.append(f"  {key}: {before:.3f} -> {after:.3f} ({after - before:+.3f})")
+    return lines